@@ -1,21 +1,27 @@
 """Main Analytics Endpoints for business intelligence and reporting."""
 import logging
+import random
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func, and_, or_
 from sqlalchemy.orm import Session
+import numpy as np
 from app.config.database import get_supabase_client
+from app.services.business.order_frame import load_order_frame
 
 from app.core.dependencies import get_current_business
 from app.models import (
-    Business, Order, User, MenuItem, Table, 
+    Business, User, MenuItem, Table, 
     Appointment, ServiceProvider, WaitlistEntry, Message
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# History loaded before the analysed period to tell new customers from returning ones
+ACQUISITION_LOOKBACK_DAYS = 365
+
 # ====================
 # SALES ANALYTICS
 # ====================
@@ -43,30 +49,19 @@ async def get_sales_analytics(
         else:
             end_dt = datetime.now() + timedelta(days=1)
         
-        # Query sales data
-        orders_query = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_dt,
-            Order.created_at <= end_dt,
-            Order.status.in_(["completed", "confirmed"])
-        )
+        # Load the window once; every breakdown below is computed on the frame
+        frame = await load_order_frame(supabase, business_id, start_dt, end_dt)
+        orders = frame.where(statuses=["completed", "confirmed"])
         
-        total_revenue = orders_query.with_entities(func.sum(Order.total_amount)).scalar() or 0
-        total_orders = orders_query.count()
+        total_revenue = orders.total()
+        total_orders = len(orders)
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
         
         # Daily revenue trend
-        daily_revenue = orders_query.with_entities(
-            func.date(Order.created_at).label('date'),
-            func.sum(Order.total_amount).label('revenue'),
-            func.count(Order.id).label('order_count')
-        ).group_by(func.date(Order.created_at)).order_by('date').all()
+        daily_revenue = orders.bucket("day")
         
         # Payment method distribution
-        payment_methods = orders_query.with_entities(
-            Order.payment_method,
-            func.count(Order.id).label('count')
-        ).group_by(Order.payment_method).all()
+        payment_methods = orders.count_by("payment_method")
         
         return {
             "type": "sales_analytics",
@@ -80,18 +75,21 @@ async def get_sales_analytics(
                 "average_order_value": round(avg_order_value, 2),
                 "revenue_trend": [
                     {
-                        "date": str(row.date),
-                        "revenue": round(row.revenue, 2),
-                        "order_count": row.order_count
+                        "date": row["period"],
+                        "revenue": round(row["revenue"], 2),
+                        "order_count": row["count"]
                     } for row in daily_revenue
                 ]
             },
             "payment_methods": [
                 {
-                    "method": row.payment_method.value if row.payment_method else "unknown",
-                    "count": row.count
-                } for row in payment_methods
-            ]
+                    "method": method,
+                    "count": count
+                } for method, count in payment_methods.items()
+            ],
+            "order_value_percentiles": {
+                key: round(value, 2) for key, value in orders.percentiles().items()
+            }
         }
     except Exception as e:
         logger.error(f"Error in get_sales_analytics: {str(e)}")
@@ -112,60 +110,28 @@ async def get_revenue_trends(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30*months)
         
-        # Base query
-        orders_query = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date,
-            Order.status.in_(["completed", "confirmed"])
-        )
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
+        orders = frame.where(statuses=["completed", "confirmed"])
         
-        if period == "daily":
-            # Group by day
-            revenue_data = orders_query.with_entities(
-                func.date(Order.created_at).label('period'),
-                func.sum(Order.total_amount).label('revenue'),
-                func.count(Order.id).label('order_count')
-            ).group_by(func.date(Order.created_at)).order_by('period').all()
-        elif period == "weekly":
-            # Group by week
-            revenue_data = orders_query.with_entities(
-                func.year(Order.created_at).label('year'),
-                func.week(Order.created_at).label('week'),
-                func.sum(Order.total_amount).label('revenue'),
-                func.count(Order.id).label('order_count')
-            ).group_by(func.year(Order.created_at), func.week(Order.created_at)).order_by('year', 'week').all()
-        else:  # monthly
-            # Group by month
-            revenue_data = orders_query.with_entities(
-                func.year(Order.created_at).label('year'),
-                func.month(Order.created_at).label('month'),
-                func.sum(Order.total_amount).label('revenue'),
-                func.count(Order.id).label('order_count')
-            ).group_by(func.year(Order.created_at), func.month(Order.created_at)).order_by('year', 'month').all()
+        # Group by day, ISO week or month
+        unit = {"daily": "day", "weekly": "week"}.get(period, "month")
+        revenue_data = orders.bucket(unit)
         
         # Calculate growth rates
         trends = []
         for i, row in enumerate(revenue_data):
-            revenue = round(row.revenue, 2) if row.revenue else 0
-            order_count = row.order_count if row.order_count else 0
+            revenue = round(row["revenue"], 2)
             
             # Calculate growth rate
             growth_rate = 0
-            if i > 0 and revenue_data[i-1].revenue and revenue_data[i-1].revenue > 0:
-                growth_rate = ((revenue - revenue_data[i-1].revenue) / revenue_data[i-1].revenue) * 100
-            
-            if period == "daily":
-                period_label = str(row.period)
-            elif period == "weekly":
-                period_label = f"{row.year}-W{row.week}"
-            else:  # monthly
-                period_label = f"{row.year}-{row.month:02d}"
+            previous = revenue_data[i-1]["revenue"] if i > 0 else 0
+            if previous > 0:
+                growth_rate = ((row["revenue"] - previous) / previous) * 100
             
             trends.append({
-                "period": period_label,
+                "period": row["period"],
                 "revenue": revenue,
-                "order_count": order_count,
+                "order_count": row["count"],
                 "growth_rate": round(growth_rate, 2)
             })
         
@@ -202,19 +168,11 @@ async def get_transaction_volume(
             end_dt = datetime.now() + timedelta(days=1)
         
         # Order volume
-        orders_query = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_dt,
-            Order.created_at <= end_dt
-        )
-        
-        total_orders = orders_query.count()
+        frame = await load_order_frame(supabase, business_id, start_dt, end_dt)
+        total_orders = len(frame)
         
         # Order types
-        order_types = orders_query.with_entities(
-            Order.order_type,
-            func.count(Order.id).label('count')
-        ).group_by(Order.order_type).all()
+        order_types = frame.count_by("order_type")
         
         # Appointment volume
         appointments_query = db.query(Appointment).filter(
@@ -250,9 +208,9 @@ async def get_transaction_volume(
                 "total": total_orders,
                 "by_type": [
                     {
-                        "type": row.order_type,
-                        "count": row.count
-                    } for row in order_types
+                        "type": order_type,
+                        "count": count
+                    } for order_type, count in order_types.items()
                 ]
             },
             "appointments": {
@@ -287,69 +245,27 @@ async def get_average_transaction_value(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30*months)
         
-        # Base query
-        orders_query = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date,
-            Order.status.in_(["completed", "confirmed"])
-        )
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
+        orders = frame.where(statuses=["completed", "confirmed"])
         
-        if period == "daily":
-            # Group by day
-            avg_value_data = orders_query.with_entities(
-                func.date(Order.created_at).label('period'),
-                func.avg(Order.total_amount).label('avg_value'),
-                func.count(Order.id).label('order_count')
-            ).group_by(func.date(Order.created_at)).order_by('period').all()
-        elif period == "weekly":
-            # Group by week
-            avg_value_data = orders_query.with_entities(
-                func.year(Order.created_at).label('year'),
-                func.week(Order.created_at).label('week'),
-                func.avg(Order.total_amount).label('avg_value'),
-                func.count(Order.id).label('order_count')
-            ).group_by(func.year(Order.created_at), func.week(Order.created_at)).order_by('year', 'week').all()
-        else:  # monthly
-            # Group by month
-            avg_value_data = orders_query.with_entities(
-                func.year(Order.created_at).label('year'),
-                func.month(Order.created_at).label('month'),
-                func.avg(Order.total_amount).label('avg_value'),
-                func.count(Order.id).label('order_count')
-            ).group_by(func.year(Order.created_at), func.month(Order.created_at)).order_by('year', 'month').all()
-        
-        # Calculate trends
-        trends = []
-        overall_avg = 0
-        total_orders = 0
+        # Group by day, ISO week or month
+        unit = {"daily": "day", "weekly": "week"}.get(period, "month")
         
-        for row in avg_value_data:
-            avg_value = round(row.avg_value, 2) if row.avg_value else 0
-            order_count = row.order_count if row.order_count else 0
-            
-            if period == "daily":
-                period_label = str(row.period)
-            elif period == "weekly":
-                period_label = f"{row.year}-W{row.week}"
-            else:  # monthly
-                period_label = f"{row.year}-{row.month:02d}"
-            
-            trends.append({
-                "period": period_label,
-                "average_value": avg_value,
-                "order_count": order_count
-            })
-            
-            overall_avg += avg_value * order_count
-            total_orders += order_count
+        trends = [
+            {
+                "period": row["period"],
+                "average_value": round(row["revenue"] / row["count"], 2),
+                "order_count": row["count"]
+            } for row in orders.bucket(unit)
+        ]
         
-        overall_avg = round(overall_avg / total_orders, 2) if total_orders > 0 else 0
+        overall_avg = round(orders.average(), 2)
         
         return {
             "type": "average_transaction_value",
             "period_type": period,
             "overall_average": overall_avg,
+            "median_value": round(orders.percentiles((50,))["p50"], 2),
             "data": trends
         }
     except Exception as e:
@@ -379,32 +295,24 @@ async def get_payment_methods_distribution(
         else:
             end_dt = datetime.now() + timedelta(days=1)
         
-        # Query orders with payment methods
-        orders_query = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_dt,
-            Order.created_at <= end_dt,
-            Order.status.in_(["completed", "confirmed"]),
-            Order.payment_method.isnot(None)
-        )
+        # Completed orders that recorded a payment method
+        frame = await load_order_frame(supabase, business_id, start_dt, end_dt)
+        orders = frame.where(statuses=["completed", "confirmed"])
+        payment_methods = orders.group_by("payment_method")
+        payment_methods.pop("unknown", None)
         
-        total_orders = orders_query.count()
-        
-        # Payment method distribution
-        payment_methods = orders_query.with_entities(
-            Order.payment_method,
-            func.count(Order.id).label('count')
-        ).group_by(Order.payment_method).all()
+        total_orders = sum(entry["count"] for entry in payment_methods.values())
         
         # Calculate percentages
         distribution = []
-        for row in payment_methods:
-            count = row.count
+        for method, entry in payment_methods.items():
+            count = entry["count"]
             percentage = (count / total_orders * 100) if total_orders > 0 else 0
             
             distribution.append({
-                "method": row.payment_method.value if row.payment_method else "unknown",
+                "method": method,
                 "count": count,
+                "revenue": round(entry["revenue"], 2),
                 "percentage": round(percentage, 2)
             })
         
@@ -451,64 +359,24 @@ async def get_customer_behavior(
         else:
             end_dt = datetime.now() + timedelta(days=1)
         
-        # Get customers who made orders in this period
-        customers_query = db.query(Order.customer_id).filter(
-            Order.business_id == business_id,
-            Order.customer_id.isnot(None),
-            Order.created_at >= start_dt,
-            Order.created_at <= end_dt
-        ).distinct()
-        
-        customer_ids = [row.customer_id for row in customers_query.all()]
+        # Orders placed by identified customers in this period
+        frame = await load_order_frame(supabase, business_id, start_dt, end_dt)
+        orders = frame.where(customers_only=True)
         
-        # Visit frequency analysis
-        visit_frequency = {}
+        # Visit frequency per customer, segmented in one pass
+        visit_counts = orders.customer_stats()["orders"]
         customer_segments = {
-            "new": 0,
-            "regular": 0,
-            "frequent": 0,
-            "vip": 0
+            "new": int(np.count_nonzero(visit_counts == 1)),
+            "regular": int(np.count_nonzero((visit_counts > 1) & (visit_counts <= 3))),
+            "frequent": int(np.count_nonzero((visit_counts > 3) & (visit_counts <= 10))),
+            "vip": int(np.count_nonzero(visit_counts > 10))
         }
         
-        for customer_id in customer_ids:
-            # Count visits in period
-            visit_count = db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.customer_id == customer_id,
-                Order.created_at >= start_dt,
-                Order.created_at <= end_dt
-            ).count()
-            
-            visit_frequency[customer_id] = visit_count
-            
-            # Segment customers
-            if visit_count == 1:
-                customer_segments["new"] += 1
-            elif visit_count <= 3:
-                customer_segments["regular"] += 1
-            elif visit_count <= 10:
-                customer_segments["frequent"] += 1
-            else:
-                customer_segments["vip"] += 1
-        
         # Preferred order types
-        order_types = db.query(Order.order_type, func.count(Order.id).label('count')).filter(
-            Order.business_id == business_id,
-            Order.customer_id.isnot(None),
-            Order.created_at >= start_dt,
-            Order.created_at <= end_dt
-        ).group_by(Order.order_type).order_by(func.count(Order.id).desc()).all()
+        order_types = sorted(orders.count_by("order_type").items(), key=lambda item: item[1], reverse=True)
         
         # Preferred time slots (hourly)
-        time_slots = db.query(
-            func.hour(Order.created_at).label('hour'),
-            func.count(Order.id).label('count')
-        ).filter(
-            Order.business_id == business_id,
-            Order.customer_id.isnot(None),
-            Order.created_at >= start_dt,
-            Order.created_at <= end_dt
-        ).group_by(func.hour(Order.created_at)).order_by('hour').all()
+        time_slots = orders.bucket("hour_of_day")
         
         return {
             "type": "customer_behavior",
@@ -519,14 +387,14 @@ async def get_customer_behavior(
             "customer_segments": customer_segments,
             "order_type_preferences": [
                 {
-                    "type": row.order_type,
-                    "count": row.count
-                } for row in order_types
+                    "type": order_type,
+                    "count": count
+                } for order_type, count in order_types
             ],
             "time_slot_preferences": [
                 {
-                    "hour": row.hour,
-                    "count": row.count
+                    "hour": row["period"],
+                    "count": row["count"]
                 } for row in time_slots
             ]
         }
@@ -548,52 +416,24 @@ async def get_customer_retention(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30*months)
         
-        # Get all customers who made orders in the period
-        all_customers = db.query(Order.customer_id).filter(
-            Order.business_id == business_id,
-            Order.customer_id.isnot(None),
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).distinct().count()
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
+        orders = frame.where(customers_only=True)
+        all_customers = orders.unique_customers()
         
-        # Get customers who made orders in both first and last quarters
+        # Customers who ordered in both the first and the second half of the period
         first_quarter_end = start_date + timedelta(days=30*months//2)
-        last_quarter_start = first_quarter_end
-        
-        first_quarter_customers = set([
-            row.customer_id for row in db.query(Order.customer_id).filter(
-                Order.business_id == business_id,
-                Order.customer_id.isnot(None),
-                Order.created_at >= start_date,
-                Order.created_at <= first_quarter_end
-            ).distinct().all()
-        ])
-        
-        last_quarter_customers = set([
-            row.customer_id for row in db.query(Order.customer_id).filter(
-                Order.business_id == business_id,
-                Order.customer_id.isnot(None),
-                Order.created_at >= last_quarter_start,
-                Order.created_at <= end_date
-            ).distinct().all()
-        ])
+        first_quarter_customers = orders.where(end=first_quarter_end).customer_ids()
+        last_quarter_customers = orders.where(start=first_quarter_end).customer_ids()
         
         # Calculate retention rate
         retained_customers = len(first_quarter_customers.intersection(last_quarter_customers))
         retention_rate = (retained_customers / len(first_quarter_customers) * 100) if len(first_quarter_customers) > 0 else 0
         
-        # Identify loyal customers (5+ visits)
-        loyal_customers_query = db.query(
-            Order.customer_id,
-            func.count(Order.id).label('visit_count')
-        ).filter(
-            Order.business_id == business_id,
-            Order.customer_id.isnot(None),
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).group_by(Order.customer_id).having(func.count(Order.id) >= 5).all()
-        
-        loyal_customers_count = len(loyal_customers_query)
+        # Identify loyal customers (5+ visits), most frequent first
+        customers = orders.customer_stats()
+        loyal = np.flatnonzero(customers["orders"] >= 5)
+        loyal = loyal[np.argsort(-customers["orders"][loyal], kind="stable")]
+        loyal_customers_count = int(loyal.size)
         
         return {
             "type": "customer_retention",
@@ -611,9 +451,9 @@ async def get_customer_retention(
             },
             "loyal_customers_list": [
                 {
-                    "customer_id": row.customer_id,
-                    "visit_count": row.visit_count
-                } for row in loyal_customers_query[:10]  # Top 10
+                    "customer_id": customers["customer"][index],
+                    "visit_count": int(customers["orders"][index])
+                } for index in loyal[:10]  # Top 10
             ]
         }
     except Exception as e:
@@ -634,53 +474,40 @@ async def get_customer_lifetime_value(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30*months)
         
-        # Calculate CLV for each customer
-        customer_clv_query = db.query(
-            Order.customer_id,
-            func.count(Order.id).label('order_count'),
-            func.sum(Order.total_amount).label('total_spent'),
-            func.avg(Order.total_amount).label('avg_order_value'),
-            func.min(Order.created_at).label('first_order'),
-            func.max(Order.created_at).label('last_order')
-        ).filter(
-            Order.business_id == business_id,
-            Order.customer_id.isnot(None),
-            Order.created_at >= start_date,
-            Order.created_at <= end_date,
-            Order.status.in_(["completed", "confirmed"])
-        ).group_by(Order.customer_id).all()
-        
-        # Process CLV data
-        clv_data = []
-        total_clv = 0
-        
-        for row in customer_clv_query:
-            # Calculate customer lifespan in months
-            lifespan = (row.last_order - row.first_order).days / 30
-            lifespan = max(lifespan, 1)  # Minimum 1 month
-            
-            # Calculate purchase frequency
-            purchase_frequency = row.order_count / lifespan
-            
-            # Simple CLV formula: Average Order Value × Purchase Frequency × Customer Lifespan
-            # For this example, we'll use a fixed lifespan of 24 months
-            clv = (row.total_spent / row.order_count if row.order_count > 0 else 0) * purchase_frequency * 24
-            
-            clv_data.append({
-                "customer_id": row.customer_id,
-                "order_count": row.order_count,
-                "total_spent": round(row.total_spent, 2) if row.total_spent else 0,
-                "avg_order_value": round(row.avg_order_value, 2) if row.avg_order_value else 0,
-                "customer_lifespan_months": round(lifespan, 2),
-                "purchase_frequency": round(purchase_frequency, 2),
-                "clv": round(clv, 2)
-            })
-            
-            total_clv += clv
-        
-        # Segment customers by CLV
-        clv_data.sort(key=lambda x: x['clv'], reverse=True)
+        # Per-customer totals over completed orders
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
+        customers = frame.where(statuses=["completed", "confirmed"], customers_only=True).customer_stats()
+        
+        order_count = customers["orders"]
+        total_spent = customers["revenue"]
+        avg_order_value = np.divide(total_spent, order_count, out=np.zeros_like(total_spent), where=order_count > 0)
+        
+        # Customer lifespan in months (minimum 1 month)
+        lifespan_days = (customers["last"] - customers["first"]).astype("timedelta64[D]").astype(np.float64)
+        lifespan = np.maximum(lifespan_days / 30, 1)
+        
+        # Purchase frequency per month
+        purchase_frequency = order_count / lifespan
+        
+        # Simple CLV formula: Average Order Value × Purchase Frequency × Customer Lifespan
+        # For this example, we'll use a fixed lifespan of 24 months
+        clv = avg_order_value * purchase_frequency * 24
+        total_clv = float(clv.sum())
+        
+        clv_data = [
+            {
+                "customer_id": customers["customer"][i],
+                "order_count": int(order_count[i]),
+                "total_spent": round(float(total_spent[i]), 2),
+                "avg_order_value": round(float(avg_order_value[i]), 2),
+                "customer_lifespan_months": round(float(lifespan[i]), 2),
+                "purchase_frequency": round(float(purchase_frequency[i]), 2),
+                "clv": round(float(clv[i]), 2)
+            }
+            for i in np.argsort(-clv, kind="stable")
+        ]
         
+        # Segment customers by CLV (already sorted, highest first)
         high_value = [c for c in clv_data if c['clv'] >= 500]
         medium_value = [c for c in clv_data if 100 <= c['clv'] < 500]
         low_value = [c for c in clv_data if c['clv'] < 100]
@@ -735,6 +562,13 @@ async def get_customer_acquisition(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30*months)
         
+        # A year of history before the period decides who counts as returning
+        frame = await load_order_frame(
+            supabase, business_id, start_date - timedelta(days=ACQUISITION_LOOKBACK_DAYS), end_date
+        )
+        orders = frame.where(customers_only=True)
+        first_orders = orders.first_orders()
+        
         # Monthly breakdown
         monthly_data = []
         
@@ -742,32 +576,21 @@ async def get_customer_acquisition(
             month_start = start_date + timedelta(days=30*i)
             month_end = month_start + timedelta(days=30)
             
-            # Get all customers in this month
-            month_customers = db.query(Order.customer_id).filter(
-                Order.business_id == business_id,
-                Order.customer_id.isnot(None),
-                Order.created_at >= month_start,
-                Order.created_at <= month_end
-            ).distinct().all()
+            # Customers with an order this month
+            month_customers = np.unique(orders.where(start=month_start, end=month_end).codes["customer"])
             
-            month_customer_ids = [row.customer_id for row in month_customers]
-            
-            # Get customers who had orders before this month (returning)
-            returning_customers = db.query(Order.customer_id).filter(
-                Order.business_id == business_id,
-                Order.customer_id.in_(month_customer_ids),
-                Order.created_at < month_start
-            ).distinct().count()
+            # Returning customers had an order before this month
+            returning_customers = int(np.count_nonzero(first_orders[month_customers] < np.datetime64(month_start, "us")))
             
             # New customers are those who didn't have orders before
-            new_customers = len(month_customer_ids) - returning_customers
+            new_customers = int(month_customers.size) - returning_customers
             
             monthly_data.append({
                 "month": month_start.strftime("%Y-%m"),
                 "new_customers": new_customers,
                 "returning_customers": returning_customers,
-                "total_customers": len(month_customer_ids),
-                "acquisition_rate": round((new_customers / len(month_customer_ids) * 100) if len(month_customer_ids) > 0 else 0, 2)
+                "total_customers": int(month_customers.size),
+                "acquisition_rate": round((new_customers / month_customers.size * 100) if month_customers.size > 0 else 0, 2)
             })
         
         # Overall metrics
@@ -874,17 +697,11 @@ async def get_peak_hours(
         start_date = end_date - timedelta(days=days)
         
         # Hourly order counts
-        hourly_orders = db.query(
-            func.hour(Order.created_at).label('hour'),
-            func.count(Order.id).label('order_count')
-        ).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).group_by(func.hour(Order.created_at)).order_by('hour').all()
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
+        hourly_orders = frame.bucket("hour_of_day")
         
         # Peak hours (top 5 busiest hours)
-        peak_hours = sorted(hourly_orders, key=lambda x: x.order_count, reverse=True)[:5]
+        peak_hours = sorted(hourly_orders, key=lambda x: x["count"], reverse=True)[:5]
         
         return {
             "type": "peak_hours",
@@ -895,14 +712,14 @@ async def get_peak_hours(
             },
             "hourly_distribution": [
                 {
-                    "hour": row.hour,
-                    "order_count": row.order_count
+                    "hour": row["period"],
+                    "order_count": row["count"]
                 } for row in hourly_orders
             ],
             "peak_hours": [
                 {
-                    "hour": row.hour,
-                    "order_count": row.order_count
+                    "hour": row["period"],
+                    "order_count": row["count"]
                 } for row in peak_hours
             ]
         }
@@ -924,41 +741,19 @@ async def get_service_performance(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Average preparation time (difference between created and completed)
-        completed_orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.status == "completed",
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).all()
-        
-        prep_times = []
-        for order in completed_orders:
-            if order.created_at and order.updated_at:
-                prep_time = (order.updated_at - order.created_at).total_seconds() / 60  # in minutes
-                prep_times.append(prep_time)
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
         
-        avg_prep_time = sum(prep_times) / len(prep_times) if prep_times else 0
+        # Preparation time (created to last update) of completed orders, in minutes
+        completed_orders = frame.where(statuses=["completed"])
+        prep_times = completed_orders.durations()
+        prep_times = prep_times[~np.isnan(prep_times)]
+        avg_prep_time = float(prep_times.mean()) if prep_times.size else 0
         
         # Order status distribution
-        status_distribution = db.query(
-            Order.status,
-            func.count(Order.id).label('count')
-        ).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).group_by(Order.status).all()
+        status_distribution = frame.count_by("status")
         
         # Orders per day trend
-        daily_orders = db.query(
-            func.date(Order.created_at).label('date'),
-            func.count(Order.id).label('order_count')
-        ).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).group_by(func.date(Order.created_at)).order_by('date').all()
+        daily_orders = frame.bucket("day")
         
         return {
             "type": "service_performance",
@@ -969,18 +764,21 @@ async def get_service_performance(
             },
             "metrics": {
                 "average_preparation_time_minutes": round(avg_prep_time, 2),
+                "preparation_time_percentiles": {
+                    key: round(value, 2) for key, value in completed_orders.percentiles(values=prep_times).items()
+                },
                 "total_orders": len(completed_orders),
                 "status_distribution": [
                     {
-                        "status": row.status,
-                        "count": row.count
-                    } for row in status_distribution
+                        "status": order_status,
+                        "count": count
+                    } for order_status, count in status_distribution.items()
                 ]
             },
             "daily_trend": [
                 {
-                    "date": row.date.strftime("%Y-%m-%d"),
-                    "order_count": row.order_count
+                    "date": row["period"],
+                    "order_count": row["count"]
                 } for row in daily_orders
             ]
         }
@@ -1131,27 +929,20 @@ async def get_capacity_utilization(
         total_capacity = 200  # Total capacity (e.g., seats, tables, etc.)
         
         # Get daily order counts
-        daily_orders = db.query(
-            func.date(Order.created_at).label('date'),
-            func.count(Order.id).label('order_count')
-        ).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date
-        ).group_by(func.date(Order.created_at)).order_by('date').all()
+        frame = await load_order_frame(supabase, business_id, start_date, end_date)
+        daily_orders = frame.bucket("day")
         
         # Calculate utilization rates
-        utilization_data = []
-        total_utilization = 0
-        
-        for row in daily_orders:
-            utilization_rate = (row.order_count / total_capacity * 100) if total_capacity > 0 else 0
-            utilization_data.append({
-                "date": row.date.strftime("%Y-%m-%d"),
-                "orders": row.order_count,
-                "utilization_rate": round(utilization_rate, 2)
-            })
-            total_utilization += utilization_rate
+        utilization_data = [
+            {
+                "date": row["period"],
+                "orders": row["count"],
+                "utilization_rate": round((row["count"] / total_capacity * 100) if total_capacity > 0 else 0, 2)
+            } for row in daily_orders
+        ]
+        total_utilization = (
+            sum(row["count"] for row in daily_orders) / total_capacity * 100 if total_capacity > 0 else 0
+        )
         
         # Average utilization
         avg_utilization = total_utilization / len(utilization_data) if utilization_data else 0
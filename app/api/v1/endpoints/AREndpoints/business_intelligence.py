@@ -7,13 +7,15 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import random
 import json
 from supabase import create_client, Client
+import calendar
+import numpy as np
 from app.config.database import get_supabase_client
+from app.services.business.order_frame import load_order_frame
 from app.core.dependencies import get_current_business
-from app.models.order import Order
 from app.models.business import Business
 from app.models.user import User
 
@@ -48,14 +50,10 @@ async def get_profitability_analysis(
             start_date = end_date.replace(day=1)
         
         # Get orders for the period
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
+        orders = await load_order_frame(supabase, business_id, start_date, end_date + timedelta(days=1))
         
         # Calculate revenue
-        total_revenue = sum(order.total_amount for order in orders)
+        total_revenue = orders.total()
         total_orders = len(orders)
         
         # Simulate cost calculations
@@ -132,14 +130,10 @@ async def get_cost_analysis(
         end_date = end_date.replace(day=1) - timedelta(days=1)  # Last day of current month
         
         # Get orders for current month
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
+        orders = await load_order_frame(supabase, business_id, start_date, end_date + timedelta(days=1))
         
         # Calculate revenue
-        total_revenue = sum(order.total_amount for order in orders)
+        total_revenue = orders.total()
         
         # Simulate detailed cost breakdown
         cost_breakdown = {
@@ -214,61 +208,36 @@ async def get_seasonal_trends(
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=730)  # 2 years
         
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
-        
-        # Group orders by month
-        monthly_data = {}
-        for order in orders:
-            month_key = order.created_at.strftime("%Y-%m")
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    "orders": [],
-                    "revenue": 0
-                }
-            monthly_data[month_key]["orders"].append(order)
-            monthly_data[month_key]["revenue"] += order.total_amount
+        orders = await load_order_frame(supabase, business_id, start_date, end_date + timedelta(days=1))
         
         # Calculate seasonal metrics
-        seasonal_data = []
-        for month_key, data in monthly_data.items():
-            orders_count = len(data["orders"])
-            revenue = data["revenue"]
-            avg_order_value = revenue / orders_count if orders_count > 0 else 0
-            
-            seasonal_data.append({
-                "month": month_key,
+        monthly = orders.bucket("month")
+        seasonal_data = [
+            {
+                "month": row["period"],
                 "metrics": {
-                    "revenue": round(revenue, 2),
-                    "orders": orders_count,
-                    "avg_order_value": round(avg_order_value, 2)
+                    "revenue": round(row["revenue"], 2),
+                    "orders": row["count"],
+                    "avg_order_value": round(row["revenue"] / row["count"], 2)
                 }
-            })
+            }
+            for row in monthly
+        ]
         
         # Identify seasonal patterns
-        # Group by month of year for seasonal analysis
+        # Group the monthly buckets ("YYYY-MM") by month of year; each bucket is one year of that month
         monthly_patterns = {}
-        for order in orders:
-            month_of_year = order.created_at.strftime("%m")
-            if month_of_year not in monthly_patterns:
-                monthly_patterns[month_of_year] = {
-                    "revenue": 0,
-                    "orders": 0,
-                    "count": 0
-                }
-            monthly_patterns[month_of_year]["revenue"] += order.total_amount
-            monthly_patterns[month_of_year]["orders"] += 1
-            monthly_patterns[month_of_year]["count"] += 1
+        for row in monthly:
+            pattern = monthly_patterns.setdefault(row["period"][5:7], {"revenue": 0.0, "orders": 0, "years": 0})
+            pattern["revenue"] += row["revenue"]
+            pattern["orders"] += row["count"]
+            pattern["years"] += 1
         
-        # Calculate averages
         seasonal_averages = [
             {
                 "month": month,
-                "avg_revenue": round(data["revenue"] / data["count"], 2),
-                "avg_orders": round(data["orders"] / data["count"], 2)
+                "avg_revenue": round(data["revenue"] / data["orders"], 2),
+                "avg_orders": round(data["orders"] / data["years"], 2)
             }
             for month, data in sorted(monthly_patterns.items())
         ]
@@ -318,21 +287,18 @@ async def get_competitive_position(
         end_date = end_date.replace(day=1) - timedelta(days=1)  # Last day of current month
         
         # Get orders for current month
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
+        orders = await load_order_frame(supabase, business_id, start_date, end_date + timedelta(days=1))
         
         # Calculate business metrics
-        total_revenue = sum(order.total_amount for order in orders)
+        total_revenue = orders.total()
         total_orders = len(orders)
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
         
         # Customer metrics
-        unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
-        repeat_customers = len([order for order in orders if order.customer_id and 
-                              len([o for o in orders if o.customer_id == order.customer_id]) > 1])
+        customer_orders = orders.customer_stats()["orders"]
+        unique_customers = int(customer_orders.size)
+        # Orders placed by customers with more than one order
+        repeat_customers = int(customer_orders[customer_orders > 1].sum())
         repeat_rate = (repeat_customers / unique_customers * 100) if unique_customers > 0 else 0
         
         # Simulate market benchmarks (in a real implementation, this would come from market data)
@@ -430,46 +396,21 @@ async def get_growth_metrics(
                 start_date = start_date.replace(month=start_date.month - 1)
         
         # Get orders for the period
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
-        
-        # Group orders by month
-        monthly_data = {}
-        for order in orders:
-            month_key = order.created_at.strftime("%Y-%m")
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    "orders": [],
-                    "revenue": 0
-                }
-            monthly_data[month_key]["orders"].append(order)
-            monthly_data[month_key]["revenue"] += order.total_amount
+        orders = await load_order_frame(supabase, business_id, start_date, end_date + timedelta(days=1))
         
         # Calculate growth metrics
-        growth_data = []
-        sorted_months = sorted(monthly_data.keys())
-        
-        for month_key in sorted_months:
-            data = monthly_data[month_key]
-            orders_count = len(data["orders"])
-            revenue = data["revenue"]
-            avg_order_value = revenue / orders_count if orders_count > 0 else 0
-            
-            # Customer metrics
-            unique_customers = len(set(order.customer_id for order in data["orders"] if order.customer_id))
-            
-            growth_data.append({
+        growth_data = [
+            {
                 "month": month_key,
                 "metrics": {
-                    "revenue": round(revenue, 2),
-                    "orders": orders_count,
-                    "customers": unique_customers,
-                    "avg_order_value": round(avg_order_value, 2)
+                    "revenue": round(month_orders.total(), 2),
+                    "orders": len(month_orders),
+                    "customers": month_orders.unique_customers(),
+                    "avg_order_value": round(month_orders.average(), 2)
                 }
-            })
+            }
+            for month_key, month_orders in orders.split("month")
+        ]
         
         # Calculate growth rates
         if len(growth_data) >= 2:
@@ -562,20 +503,16 @@ async def get_predictive_modeling(
         
         # Get orders for the past 90 days
         start_date = current_date - timedelta(days=90)
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= current_date + timedelta(days=1)
-        ).all()
+        orders = await load_order_frame(supabase, business_id, start_date, current_date + timedelta(days=1))
         
         # Calculate historical metrics
-        total_revenue = sum(order.total_amount for order in orders)
+        total_revenue = orders.total()
         total_orders = len(orders)
         avg_daily_orders = total_orders / 90 if total_orders > 0 else 0
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
         
         # Customer metrics
-        unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
+        unique_customers = orders.unique_customers()
         
         # Simulate AI-powered predictions
         # In a real implementation, this would use ML models
@@ -679,70 +616,47 @@ async def get_anomaly_detection(
         start_date = end_date - timedelta(days=days)
         
         # Get orders for the period
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
-        
-        # Group orders by day
-        daily_data = {}
-        for order in orders:
-            day_key = order.created_at.date()
-            if day_key not in daily_data:
-                daily_data[day_key] = {
-                    "orders": [],
-                    "revenue": 0
-                }
-            daily_data[day_key]["orders"].append(order)
-            daily_data[day_key]["revenue"] += order.total_amount
+        orders = await load_order_frame(supabase, business_id, start_date, end_date + timedelta(days=1))
         
         # Calculate daily metrics
-        daily_metrics = []
-        for day_key, data in daily_data.items():
-            orders_count = len(data["orders"])
-            revenue = data["revenue"]
-            avg_order_value = revenue / orders_count if orders_count > 0 else 0
-            
-            daily_metrics.append({
-                "date": day_key.strftime("%Y-%m-%d"),
-                "orders": orders_count,
-                "revenue": round(revenue, 2),
-                "avg_order_value": round(avg_order_value, 2)
-            })
+        daily_metrics = [
+            {
+                "date": row["period"],
+                "orders": row["count"],
+                "revenue": round(row["revenue"], 2),
+                "avg_order_value": round(row["revenue"] / row["count"], 2)
+            }
+            for row in orders.bucket("day")
+        ]
         
         # Calculate averages and standard deviations
         if daily_metrics:
-            avg_orders = sum(d["orders"] for d in daily_metrics) / len(daily_metrics)
-            avg_revenue = sum(d["revenue"] for d in daily_metrics) / len(daily_metrics)
+            daily_orders = np.array([d["orders"] for d in daily_metrics], dtype=np.float64)
+            daily_revenue = np.array([d["revenue"] for d in daily_metrics], dtype=np.float64)
+            avg_orders, avg_revenue = float(daily_orders.mean()), float(daily_revenue.mean())
+            std_orders, std_revenue = float(daily_orders.std()), float(daily_revenue.std())
             
-            # Calculate standard deviations
-            orders_variance = sum((d["orders"] - avg_orders) ** 2 for d in daily_metrics) / len(daily_metrics)
-            revenue_variance = sum((d["revenue"] - avg_revenue) ** 2 for d in daily_metrics) / len(daily_metrics)
-            
-            std_orders = orders_variance ** 0.5
-            std_revenue = revenue_variance ** 0.5
+            orders_z_scores = np.abs(daily_orders - avg_orders) / std_orders if std_orders > 0 else np.zeros_like(daily_orders)
+            revenue_z_scores = np.abs(daily_revenue - avg_revenue) / std_revenue if std_revenue > 0 else np.zeros_like(daily_revenue)
             
             # Detect anomalies (values more than 2 standard deviations from mean)
             anomalies = []
-            for day in daily_metrics:
-                orders_z_score = abs(day["orders"] - avg_orders) / std_orders if std_orders > 0 else 0
-                revenue_z_score = abs(day["revenue"] - avg_revenue) / std_revenue if std_revenue > 0 else 0
+            for index in np.flatnonzero((orders_z_scores > 2) | (revenue_z_scores > 2)):
+                day = daily_metrics[index]
+                orders_z_score, revenue_z_score = float(orders_z_scores[index]), float(revenue_z_scores[index])
+                anomaly_type = []
+                if orders_z_score > 2:
+                    anomaly_type.append(f"orders (z-score: {round(orders_z_score, 2)})")
+                if revenue_z_score > 2:
+                    anomaly_type.append(f"revenue (z-score: {round(revenue_z_score, 2)})")
                 
-                if orders_z_score > 2 or revenue_z_score > 2:
-                    anomaly_type = []
-                    if orders_z_score > 2:
-                        anomaly_type.append(f"orders (z-score: {round(orders_z_score, 2)})")
-                    if revenue_z_score > 2:
-                        anomaly_type.append(f"revenue (z-score: {round(revenue_z_score, 2)})")
-                    
-                    anomalies.append({
-                        "date": day["date"],
-                        "type": ", ".join(anomaly_type),
-                        "orders": day["orders"],
-                        "revenue": day["revenue"],
-                        "avg_order_value": day["avg_order_value"]
-                    })
+                anomalies.append({
+                    "date": day["date"],
+                    "type": ", ".join(anomaly_type),
+                    "orders": day["orders"],
+                    "revenue": day["revenue"],
+                    "avg_order_value": day["avg_order_value"]
+                })
             
             # Calculate anomaly severity
             severity = "low" if len(anomalies) <= 2 else "medium" if len(anomalies) <= 5 else "high"
@@ -794,42 +708,29 @@ async def get_demand_forecasting(
         
         # Get orders for the past 90 days for trend analysis
         historical_start = current_date - timedelta(days=90)
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= historical_start,
-            Order.created_at <= current_date + timedelta(days=1)
-        ).all()
-        
-        # Group by day for trend analysis
-        daily_orders = {}
-        for order in orders:
-            day_key = order.created_at.date()
-            if day_key not in daily_orders:
-                daily_orders[day_key] = 0
-            daily_orders[day_key] += 1
+        orders = await load_order_frame(supabase, business_id, historical_start, current_date + timedelta(days=1))
+        
+        # Orders per day over the history, oldest first (days without orders count as 0)
+        day_keys = orders.time_keys("day")
+        first_day = (historical_start - date(1970, 1, 1)).days
+        daily_orders = np.bincount(day_keys - first_day, minlength=91)[:91]
         
         # Calculate trend factors
-        if daily_orders:
+        if len(orders):
             # Calculate average orders for different time periods
-            last_7_days = [daily_orders.get(current_date - timedelta(days=i), 0) for i in range(7)]
-            last_30_days = [daily_orders.get(current_date - timedelta(days=i), 0) for i in range(30)]
-            
-            avg_7_days = sum(last_7_days) / len(last_7_days) if last_7_days else 0
-            avg_30_days = sum(last_30_days) / len(last_30_days) if last_30_days else 0
+            avg_7_days = float(daily_orders[-7:].mean())
+            avg_30_days = float(daily_orders[-30:].mean())
             
             # Trend calculation (positive = increasing, negative = decreasing)
             trend = (avg_7_days - avg_30_days) / avg_30_days * 100 if avg_30_days > 0 else 0
             
-            # Simulate day-of-week patterns
-            day_patterns = {}
-            for order in orders:
-                day_of_week = order.created_at.strftime("%A")  # Monday, Tuesday, etc.
-                if day_of_week not in day_patterns:
-                    day_patterns[day_of_week] = []
-                day_patterns[day_of_week].append(1)  # Count orders
-            
-            # Calculate average orders by day of week
-            avg_by_day = {day: sum(counts) / len(counts) for day, counts in day_patterns.items()}
+            # Average orders per day of week: orders on that weekday / occurrences of it in the history
+            weekday_orders = np.bincount(orders.time_keys("weekday"), minlength=7)
+            weekday_days = np.bincount((np.arange(first_day, first_day + 91) + 3) % 7, minlength=7)
+            avg_by_day = {
+                calendar.day_name[weekday]: float(weekday_orders[weekday] / weekday_days[weekday])
+                for weekday in range(7) if weekday_orders[weekday]
+            }
             
             # Find peak and low days
             peak_day = max(avg_by_day, key=avg_by_day.get) if avg_by_day else "Unknown"
@@ -919,40 +820,26 @@ async def get_optimization_recommendations(
         
         # Get orders for the past 30 days
         start_date = current_date - timedelta(days=30)
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= current_date + timedelta(days=1)
-        ).all()
+        orders = await load_order_frame(supabase, business_id, start_date, current_date + timedelta(days=1))
         
         # Calculate key metrics
-        total_revenue = sum(order.total_amount for order in orders)
+        total_revenue = orders.total()
         total_orders = len(orders)
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
         
         # Customer metrics
-        unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
-        repeat_customers = len([order for order in orders if order.customer_id and 
-                              len([o for o in orders if o.customer_id == order.customer_id]) > 1])
+        customer_orders = orders.customer_stats()["orders"]
+        unique_customers = int(customer_orders.size)
+        # Orders placed by customers with more than one order
+        repeat_customers = int(customer_orders[customer_orders > 1].sum())
         repeat_rate = (repeat_customers / unique_customers * 100) if unique_customers > 0 else 0
         
         # Time-based analysis
-        peak_hours = {}
-        for order in orders:
-            hour = order.created_at.hour
-            if hour not in peak_hours:
-                peak_hours[hour] = 0
-            peak_hours[hour] += 1
-        
-        busiest_hour = max(peak_hours, key=peak_hours.get) if peak_hours else 0
+        peak_hours = orders.bucket("hour_of_day")
+        busiest_hour = max(peak_hours, key=lambda row: row["count"])["period"] if peak_hours else 0
         
         # Payment method analysis
-        payment_methods = {}
-        for order in orders:
-            method = getattr(order, 'payment_method', 'unknown')
-            if method not in payment_methods:
-                payment_methods[method] = 0
-            payment_methods[method] += 1
+        payment_methods = orders.count_by("payment_method")
         
         preferred_payment = max(payment_methods, key=payment_methods.get) if payment_methods else "unknown"
         
@@ -1069,17 +956,13 @@ async def get_scenario_planning(
         
         # Get orders for the past 90 days
         start_date = current_date - timedelta(days=90)
-        orders = db.query(Order).filter(
-            Order.business_id == business_id,
-            Order.created_at >= start_date,
-            Order.created_at <= current_date + timedelta(days=1)
-        ).all()
+        orders = await load_order_frame(supabase, business_id, start_date, current_date + timedelta(days=1))
         
         # Calculate baseline metrics
-        total_revenue = sum(order.total_amount for order in orders)
+        total_revenue = orders.total()
         total_orders = len(orders)
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-        unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
+        unique_customers = orders.unique_customers()
         
         # Define scenarios
         scenarios = {
@@ -69,6 +69,72 @@ async def get_messages_analytics(
     )
 
 
+@router.get("/orders/{business_id}/rows", response_model=Dict[str, Any])
+async def get_order_rows(
+    business_id: int,
+    period: str = Query("7d", description="Time period: 1d, 7d, 30d"),
+    status_filter: Optional[str] = Query(None, description="Filter by order status"),
+    start_date: Optional[str] = Query(None, description="Start date (ISO format)"),
+    end_date: Optional[str] = Query(None, description="End date (ISO format)"),
+    limit: int = Query(100, ge=1, le=1000, description="Rows per page"),
+    offset: int = Query(0, ge=0, description="Rows to skip (next_offset of the previous page)"),
+    current_business: Business = Depends(get_current_business),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Get the raw order rows of an analytics window, newest first, one page at a time."""
+
+    # Verify business access
+    if current_business.id != business_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this business analytics"
+        )
+
+    analytics_service = AnalyticsService()
+    return await analytics_service.get_orders_page(
+        business_id=business_id,
+        period=period,
+        status_filter=status_filter,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        offset=offset
+    )
+
+
+@router.get("/messages/{business_id}/rows", response_model=Dict[str, Any])
+async def get_message_rows(
+    business_id: int,
+    period: str = Query("7d", description="Time period: 1d, 7d, 30d"),
+    session_id: Optional[str] = Query(None, description="Filter by session ID"),
+    start_date: Optional[str] = Query(None, description="Start date (ISO format)"),
+    end_date: Optional[str] = Query(None, description="End date (ISO format)"),
+    limit: int = Query(100, ge=1, le=1000, description="Rows per page"),
+    offset: int = Query(0, ge=0, description="Rows to skip (next_offset of the previous page)"),
+    current_business: Business = Depends(get_current_business),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """Get the raw message rows of an analytics window, newest first, one page at a time."""
+
+    # Verify business access
+    if current_business.id != business_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this business analytics"
+        )
+
+    analytics_service = AnalyticsService()
+    return await analytics_service.get_messages_page(
+        business_id=business_id,
+        period=period,
+        session_id=session_id,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        offset=offset
+    )
+
+
 @router.get("/combined/{business_id}", response_model=Dict[str, Any])
 async def get_combined_analytics(
     business_id: int,
@@ -253,17 +319,17 @@ async def export_orders_data(
         )
 
     analytics_service = AnalyticsService()
-    orders_analytics = await analytics_service.get_orders_analytics(business_id, period)
+    orders = await analytics_service.export_orders(business_id, period)
 
     return {
         "export_info": {
             "business_id": business_id,
             "period": period,
             "format": format,
-            "total_records": len(orders_analytics["orders"]),
+            "total_records": len(orders),
             "generated_at": datetime.utcnow().isoformat()
         },
-        "data": orders_analytics["orders"]
+        "data": orders
     }
 
 
@@ -285,15 +351,15 @@ async def export_messages_data(
         )
 
     analytics_service = AnalyticsService()
-    messages_analytics = await analytics_service.get_messages_analytics(business_id, period)
+    messages = await analytics_service.export_messages(business_id, period)
 
     return {
         "export_info": {
             "business_id": business_id,
             "period": period,
             "format": format,
-            "total_records": len(messages_analytics["messages"]),
+            "total_records": len(messages),
             "generated_at": datetime.utcnow().isoformat()
         },
-        "data": messages_analytics["messages"]
+        "data": messages
     }
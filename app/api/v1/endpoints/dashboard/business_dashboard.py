@@ -1,15 +1,21 @@
 """Business dashboard endpoints for AI integration."""
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.dependencies import get_current_business, get_current_user
 from app.models import Business, Order, Message, User
 from app.models.order import OrderStatus
-from app.services.websocket.connection_manager import manager
+from app.services.websocket.gateway import SESSION, gateway, topic
 from app.core.supabase_auth import refresh_jwks_cache
+from app.core.auth_cache import invalidate_business
 from app.services.analytics_service import AnalyticsService
+from app.services.business.live_orders import get_active_orders, get_changes_since
+from app.services.business.order_rollups import get_order_summary
+from app.tasks.embedding_tasks import schedule_business_reindex_async
 
 router = APIRouter()
 
@@ -67,22 +73,19 @@ async def get_dashboard_overview(
 
     # Get today's date
     today = datetime.utcnow().date()
-    today_start = datetime.combine(today, datetime.min.time()).isoformat()
-    today_end = datetime.combine(today, datetime.max.time()).isoformat()
-
-    # Today's orders using Supabase
-    orders_response = supabase.table('orders').select('*').eq('business_id', business_id).gte('created_at', today_start).lte('created_at', today_end).execute()
-    today_orders = orders_response.data if orders_response.data else []
+    today_start = datetime.combine(today, datetime.min.time())
+    today_end = today_start + timedelta(days=1)
 
-    # Calculate statistics
-    total_orders = len(today_orders)
-    total_revenue = sum(order.get('total_amount', 0) for order in today_orders)
-    pending_orders = len([o for o in today_orders if o.get('status') == OrderStatus.PENDING])
-    completed_orders = len([o for o in today_orders if o.get('status') == OrderStatus.DELIVERED])
+    # Today's totals from the hourly order rollups
+    today_summary = await get_order_summary(supabase, business_id, today_start, today_end)
+    total_orders = today_summary["total_orders"]
+    total_revenue = today_summary["total_revenue"]
+    pending_orders = today_summary["status_counts"].get(OrderStatus.PENDING.value, 0)
+    completed_orders = today_summary["status_counts"].get(OrderStatus.DELIVERED.value, 0)
 
     # Active conversations using Supabase
     one_hour_ago = (datetime.utcnow() - timedelta(hours=1)).isoformat()
-    messages_response = supabase.table('messages').select('session_id').eq('business_id', business_id).gte('created_at', one_hour_ago).execute()
+    messages_response = await execute_async(supabase.table('messages').select('session_id').eq('business_id', business_id).gte('created_at', one_hour_ago))
     active_sessions = set()
     if messages_response.data:
         active_sessions = {msg['session_id'] for msg in messages_response.data}
@@ -90,7 +93,7 @@ async def get_dashboard_overview(
 
     # Recent orders (last 7 days) using Supabase
     seven_days_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-    recent_orders_response = supabase.table('orders').select('*').eq('business_id', business_id).gte('created_at', seven_days_ago).order('created_at', desc=True).limit(10).execute()
+    recent_orders_response = await execute_async(supabase.table('orders').select('*').eq('business_id', business_id).gte('created_at', seven_days_ago).order('created_at', desc=True).limit(10))
     recent_orders = recent_orders_response.data if recent_orders_response.data else []
 
     return {
@@ -188,7 +191,7 @@ async def update_business_config(
 
     if update_data:
         # Update using Supabase
-        update_response = supabase.table('businesses').update(update_data).eq('id', business_id).execute()
+        update_response = await execute_async(supabase.table('businesses').update(update_data).eq('id', business_id))
 
         if not update_response.data:
             raise HTTPException(
@@ -196,6 +199,10 @@ async def update_business_config(
                 detail="Failed to update business configuration"
             )
 
+        invalidate_business(business_id)
+        if "description" in update_data:
+            await schedule_business_reindex_async([business_id])
+
     return {
         "status": "success",
         "message": f"Successfully updated {', '.join(updated_fields) if updated_fields else 'no'} fields",
@@ -216,22 +223,19 @@ async def get_dashboard_overview(
 ) -> Any:
     """Get dashboard overview statistics."""
     today = datetime.utcnow().date()
-    today_start = datetime.combine(today, datetime.min.time()).isoformat()
-    today_end = datetime.combine(today, datetime.max.time()).isoformat()
+    today_start = datetime.combine(today, datetime.min.time())
+    today_end = today_start + timedelta(days=1)
 
-    # Today's orders using Supabase
-    orders_response = supabase.table('orders').select('*').eq('business_id', business.id).gte('created_at', today_start).lte('created_at', today_end).execute()
-    today_orders = orders_response.data if orders_response.data else []
-
-    # Calculate statistics
-    total_orders = len(today_orders)
-    total_revenue = sum(order.get('total_amount', 0) for order in today_orders)
-    pending_orders = len([o for o in today_orders if o.get('status') == OrderStatus.PENDING])
-    completed_orders = len([o for o in today_orders if o.get('status') == OrderStatus.DELIVERED])
+    # Today's totals from the hourly order rollups
+    today_summary = await get_order_summary(supabase, business.id, today_start, today_end)
+    total_orders = today_summary["total_orders"]
+    total_revenue = today_summary["total_revenue"]
+    pending_orders = today_summary["status_counts"].get(OrderStatus.PENDING.value, 0)
+    completed_orders = today_summary["status_counts"].get(OrderStatus.DELIVERED.value, 0)
 
     # Active conversations using Supabase
     one_hour_ago = (datetime.utcnow() - timedelta(hours=1)).isoformat()
-    messages_response = supabase.table('messages').select('session_id').eq('business_id', business.id).gte('created_at', one_hour_ago).execute()
+    messages_response = await execute_async(supabase.table('messages').select('session_id').eq('business_id', business.id).gte('created_at', one_hour_ago))
     active_sessions = set()
     if messages_response.data:
         active_sessions = {msg['session_id'] for msg in messages_response.data}
@@ -261,7 +265,7 @@ async def get_active_conversations(
 
     # Get recent messages grouped by session using Supabase
     # We'll get all messages for the business and group them by session_id
-    messages_response = supabase.table('messages').select('*').eq('business_id', business.id).order('created_at', desc=True).limit(limit * 2).execute()
+    messages_response = await execute_async(supabase.table('messages').select('*').eq('business_id', business.id).order('created_at', desc=True).limit(limit * 2))
     messages = messages_response.data if messages_response.data else []
 
     # Group messages by session_id and get the latest message for each session
@@ -281,7 +285,7 @@ async def get_active_conversations(
         session_id = conv.get('session_id')
 
         # Get message count for this session using Supabase
-        count_response = supabase.table('messages').select('*', count='exact').eq('session_id', session_id).execute()
+        count_response = await execute_async(supabase.table('messages').select('*', count='exact').eq('session_id', session_id))
         message_count = count_response.count if hasattr(count_response, 'count') else len(count_response.data or [])
 
         # Calculate time difference
@@ -319,7 +323,7 @@ async def takeover_conversation(
     """Take over a conversation from the bot."""
 
     # Verify session belongs to business using Supabase
-    messages_response = supabase.table('messages').select('*').eq('session_id', session_id).eq('business_id', business.id).limit(1).execute()
+    messages_response = await execute_async(supabase.table('messages').select('*').eq('session_id', session_id).eq('business_id', business.id).limit(1))
 
     if not messages_response.data:
         raise HTTPException(
@@ -329,7 +333,7 @@ async def takeover_conversation(
 
     # Mark conversation as human-controlled
     # In production, store this in Redis or database
-    await manager.send_to_session(
+    await gateway.send_to_session(
         session_id,
         {
             "type": "takeover",
@@ -352,14 +356,15 @@ async def dashboard_websocket(
     supabase = Depends(get_supabase_client)
 ):
     """WebSocket for live dashboard updates."""
-    await manager.connect(websocket, f"dashboard_{session_id}")
+    await gateway.connect(websocket, [topic(SESSION, session_id)])
 
     try:
         while True:
             # Keep connection alive and send updates
             await websocket.receive_text()
+            gateway.touch(websocket)
     except Exception:
-        manager.disconnect(f"dashboard_{session_id}")
+        gateway.disconnect(websocket)
 
 
 @router.get("/orders/live")
@@ -369,16 +374,8 @@ async def get_live_orders(
     current_user: User = Depends(get_current_user)
 ) -> List[Dict[str, Any]]:
     """Get live order feed."""
-    active_statuses = [
-        OrderStatus.PENDING,
-        OrderStatus.CONFIRMED,
-        OrderStatus.PREPARING,
-        OrderStatus.READY
-    ]
-
-    # Query orders using Supabase with status filter
-    orders_response = supabase.table('orders').select('*').eq('business_id', business.id).in_('status', active_statuses).order('created_at', desc=True).execute()
-    orders = orders_response.data if orders_response.data else []
+    # Served from the in-memory live order view (kept current by order writes)
+    orders = await get_active_orders(business.id, supabase)
 
     return [
         {
@@ -395,10 +392,29 @@ async def get_live_orders(
     ]
 
 
+@router.get("/orders/live/changes")
+async def get_live_order_changes(
+    cursor: Optional[str] = None,
+    supabase = Depends(get_supabase_client),
+    business: Business = Depends(get_current_business),
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """
+    Incremental live order feed.
+
+    Pass the ``cursor`` from the previous response to receive only the orders
+    added/changed (``upserts``) and the ids that left the feed (``removed``).
+    ``full: true`` means the response is a complete snapshot in ``orders``
+    (first call, or too much changed since the cursor). Cursors are valid on
+    every worker; upserts may repeat an order the client already has.
+    """
+    return await get_changes_since(business.id, supabase, cursor)
+
+
 @router.post("/test-refresh-jwks")
 async def test_refresh_jwks():
     """Test endpoint to manually refresh JWKS cache."""
-    success = refresh_jwks_cache()
+    success = await refresh_jwks_cache()
     return {"success": success, "message": "JWKS cache refreshed" if success else "Failed to refresh JWKS cache"}
 
 
@@ -443,45 +459,35 @@ async def get_realtime_analytics(
 
     analytics_service = AnalyticsService()
 
-    # Get last hour analytics
-    orders_analytics = await analytics_service.get_orders_analytics(business_id, "1d")
-    messages_analytics = await analytics_service.get_messages_analytics(business_id, "1d")
-
-    # Calculate real-time metrics
+    # Aggregates for the last hour plus the latest rows, fetched concurrently
+    orders_analytics, messages_analytics, recent_orders, recent_messages, conversations = await asyncio.gather(
+        analytics_service.get_orders_analytics(business_id, "1h"),
+        analytics_service.get_messages_analytics(business_id, "1h", session_limit=0),
+        analytics_service.get_orders_page(business_id, "1h", limit=10),
+        analytics_service.get_messages_page(business_id, "1h", limit=20),
+        analytics_service.get_active_conversations(business_id, minutes=60)
+    )
     now = datetime.utcnow()
-    one_hour_ago = now - timedelta(hours=1)
-
-    # Filter for last hour only
-    recent_orders = [
-        order for order in orders_analytics["orders"]
-        if order.get('created_at') and
-        datetime.fromisoformat(order['created_at'].replace('Z', '+00:00')) > one_hour_ago
-    ]
-
-    recent_messages = [
-        msg for msg in messages_analytics["messages"]
-        if msg.get('created_at') and
-        datetime.fromisoformat(msg['created_at'].replace('Z', '+00:00')) > one_hour_ago
-    ]
 
     return {
         "business_id": business_id,
         "time_window": "last_hour",
         "generated_at": now.isoformat(),
         "orders": {
-            "count": len(recent_orders),
-            "revenue": sum(order.get('total_amount', 0) for order in recent_orders),
-            "orders": recent_orders[:10]  # Last 10 orders
+            "count": orders_analytics["total_orders"],
+            "revenue": orders_analytics["total_revenue"],
+            "orders": recent_orders["orders"]  # Last 10 orders
         },
         "messages": {
-            "count": len(recent_messages),
-            "active_sessions": len(set(msg.get('session_id') for msg in recent_messages if msg.get('session_id'))),
-            "messages": recent_messages[:20]  # Last 20 messages
+            "count": messages_analytics["total_messages"],
+            "active_sessions": messages_analytics["total_sessions"],
+            "conversations": conversations,
+            "messages": recent_messages["messages"]  # Last 20 messages
         },
         "performance": {
-            "orders_per_hour": len(recent_orders),
-            "messages_per_hour": len(recent_messages),
-            "revenue_per_hour": sum(order.get('total_amount', 0) for order in recent_orders)
+            "orders_per_hour": orders_analytics["total_orders"],
+            "messages_per_hour": messages_analytics["total_messages"],
+            "revenue_per_hour": orders_analytics["total_revenue"]
         }
     }
 
@@ -9,7 +9,7 @@ from typing import Dict, Any
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.services.ai.crewai_orchestrator import get_crewai_orchestrator
 
 router = APIRouter(tags=["Dedicated AI"])
@@ -33,10 +33,10 @@ async def dedicated_chat(
         # ✅ FIXED: Proper Supabase query instead of SQLAlchemy
         if business_identifier.isdigit():
             # Search by ID
-            business_response = supabase.table('businesses').select('*').eq('id', int(business_identifier)).execute()
+            business_response = await execute_async(supabase.table('businesses').select('*').eq('id', int(business_identifier)))
         else:
             # Search by slug
-            business_response = supabase.table('businesses').select('*').eq('slug', business_identifier).execute()
+            business_response = await execute_async(supabase.table('businesses').select('*').eq('slug', business_identifier))
         
         if not business_response.data:
             raise HTTPException(status_code=404, detail="Business not found")
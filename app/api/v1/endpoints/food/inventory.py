@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel, Field, field_validator
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.dependencies import get_current_business, get_current_user
 from app.models import Business, User
 from app.services.websocket.connection_manager import manager
@@ -89,7 +89,7 @@ async def get_food_inventory(
         if category_id:
             query = query.eq('category_id', category_id)
         
-        response = query.execute()
+        response = await execute_async(query)
         
         if not response.data:
             return []
@@ -130,7 +130,7 @@ async def update_food_inventory(
     """
     try:
         # Get current menu item
-        item_response = supabase.table('menu_items').select('*').eq('id', item_id).eq('business_id', business.id).execute()
+        item_response = await execute_async(supabase.table('menu_items').select('*').eq('id', item_id).eq('business_id', business.id))
         
         if not item_response.data:
             raise HTTPException(
@@ -157,7 +157,7 @@ async def update_food_inventory(
             update_dict['is_available'] = True
         
         # Update item
-        update_response = supabase.table('menu_items').update(update_dict).eq('id', item_id).eq('business_id', business.id).execute()
+        update_response = await execute_async(supabase.table('menu_items').update(update_dict).eq('id', item_id).eq('business_id', business.id))
         
         if not update_response.data:
             raise HTTPException(
@@ -211,7 +211,7 @@ async def get_food_low_stock(
     Get items needing reorder.
     """
     try:
-        response = supabase.table('menu_items').select('*').eq('business_id', business.id).filter('stock_quantity', 'lte', 'min_stock_threshold').execute()
+        response = await execute_async(supabase.table('menu_items').select('*').eq('business_id', business.id).filter('stock_quantity', 'lte', 'min_stock_threshold'))
         
         if not response.data:
             return []
@@ -247,7 +247,7 @@ async def create_reorder_request(
     """
     try:
         # Get menu item
-        item_response = supabase.table('menu_items').select('*').eq('id', reorder_request.item_id).eq('business_id', business.id).execute()
+        item_response = await execute_async(supabase.table('menu_items').select('*').eq('id', reorder_request.item_id).eq('business_id', business.id))
         
         if not item_response.data:
             raise HTTPException(
@@ -312,7 +312,7 @@ async def track_ingredient_usage(
             start_date = end_date - timedelta(days=7)
         
         # Get completed orders in the period
-        orders_response = supabase.table('orders').select('*').eq('business_id', business.id).gte('created_at', start_date.isoformat()).lte('created_at', end_date.isoformat()).in_('status', ['completed', 'delivered']).execute()
+        orders_response = await execute_async(supabase.table('orders').select('*').eq('business_id', business.id).gte('created_at', start_date.isoformat()).lte('created_at', end_date.isoformat()).in_('status', ['completed', 'delivered']))
         
         # Track usage by item
         usage_stats = {}
@@ -3,9 +3,10 @@ from typing import List, Optional, Dict, Any, Union, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
 from sqlalchemy import func
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.dependencies import get_current_business, get_current_user
 from app.models import Business, User, MenuItem, MenuCategory
+from app.tasks.embedding_tasks import schedule_menu_item_reindex_async
 
 router = APIRouter()
 
@@ -32,6 +33,9 @@ class MenuItemUpdate(BaseModel):
 class MenuItemAvailabilityUpdate(BaseModel):
     is_available: bool
 
+# Fields that feed the menu item search embedding
+EMBEDDED_FIELDS = {"name", "description", "is_available"}
+
 class MenuCategoryCreate(BaseModel):
     name: str
     description: Optional[str] = None
@@ -66,7 +70,7 @@ async def get_menu_items(
             query = query.or_(f"name.ilike.%{search}%,description.ilike.%{search}%")
 
         # Execute query and order by created_at desc
-        response = query.order("created_at", desc=True).execute()
+        response = await execute_async(query.order("created_at", desc=True))
 
         if response.data:
             return response.data
@@ -89,7 +93,7 @@ async def create_menu_item(
     """Create a new menu item."""
     try:
         # Verify category exists for this business
-        category_response = supabase.table("menu_categories").select("id").eq("id", item_data.category_id).eq("business_id", str(current_business.id)).execute()
+        category_response = await execute_async(supabase.table("menu_categories").select("id").eq("id", item_data.category_id).eq("business_id", str(current_business.id)))
 
         if not category_response.data:
             raise HTTPException(
@@ -111,9 +115,10 @@ async def create_menu_item(
         }
 
         # Insert the menu item
-        response = supabase.table("menu_items").insert(menu_item_data).execute()
+        response = await execute_async(supabase.table("menu_items").insert(menu_item_data))
 
         if response.data:
+            await schedule_menu_item_reindex_async([response.data[0]["id"]])
             return response.data[0]
         else:
             raise HTTPException(
@@ -140,7 +145,7 @@ async def update_menu_item(
     """Update a menu item (price, availability, etc.)."""
     try:
         # Verify menu item exists and belongs to this business
-        existing_item = supabase.table("menu_items").select("*").eq("id", item_id).eq("business_id", str(current_business.id)).execute()
+        existing_item = await execute_async(supabase.table("menu_items").select("*").eq("id", item_id).eq("business_id", str(current_business.id)))
 
         if not existing_item.data:
             raise HTTPException(
@@ -160,9 +165,11 @@ async def update_menu_item(
             return existing_item.data[0]
 
         # Update the menu item
-        response = supabase.table("menu_items").update(update_data).eq("id", item_id).eq("business_id", str(current_business.id)).execute()
+        response = await execute_async(supabase.table("menu_items").update(update_data).eq("id", item_id).eq("business_id", str(current_business.id)))
 
         if response.data:
+            if EMBEDDED_FIELDS.intersection(update_data):
+                await schedule_menu_item_reindex_async([item_id])
             return response.data[0]
         else:
             raise HTTPException(
@@ -188,7 +195,7 @@ async def delete_menu_item(
     """Remove a menu item."""
     try:
         # Verify menu item exists and belongs to this business
-        existing_item = supabase.table("menu_items").select("id").eq("id", item_id).eq("business_id", str(current_business.id)).execute()
+        existing_item = await execute_async(supabase.table("menu_items").select("id").eq("id", item_id).eq("business_id", str(current_business.id)))
 
         if not existing_item.data:
             raise HTTPException(
@@ -197,7 +204,8 @@ async def delete_menu_item(
             )
 
         # Delete the menu item
-        response = supabase.table("menu_items").delete().eq("id", item_id).eq("business_id", str(current_business.id)).execute()
+        response = await execute_async(supabase.table("menu_items").delete().eq("id", item_id).eq("business_id", str(current_business.id)))
+        await schedule_menu_item_reindex_async([item_id])
 
         return {
             "status": "success",
@@ -220,7 +228,7 @@ async def get_menu_categories(
 ) -> List[dict]:
     """Get all menu categories for the business."""
     try:
-        response = supabase.table("menu_categories").select("*").eq("business_id", str(current_business.id)).order("created_at", desc=True).execute()
+        response = await execute_async(supabase.table("menu_categories").select("*").eq("business_id", str(current_business.id)).order("created_at", desc=True))
 
         if response.data:
             return response.data
@@ -243,7 +251,7 @@ async def create_menu_category(
     """Create a new menu category."""
     try:
         # Check if category with same name already exists for this business
-        existing_response = supabase.table("menu_categories").select("id").eq("name", category_data.name).eq("business_id", str(current_business.id)).execute()
+        existing_response = await execute_async(supabase.table("menu_categories").select("id").eq("name", category_data.name).eq("business_id", str(current_business.id)))
 
         if existing_response.data:
             raise HTTPException(
@@ -261,7 +269,7 @@ async def create_menu_category(
         }
 
         # Insert the category
-        response = supabase.table("menu_categories").insert(category_data_dict).execute()
+        response = await execute_async(supabase.table("menu_categories").insert(category_data_dict))
 
         if response.data:
             return response.data[0]
@@ -290,7 +298,7 @@ async def update_menu_category(
     """Update a menu category."""
     try:
         # Verify category exists and belongs to this business
-        existing_category = supabase.table("menu_categories").select("*").eq("id", category_id).eq("business_id", str(current_business.id)).execute()
+        existing_category = await execute_async(supabase.table("menu_categories").select("*").eq("id", category_id).eq("business_id", str(current_business.id)))
 
         if not existing_category.data:
             raise HTTPException(
@@ -310,7 +318,7 @@ async def update_menu_category(
             return existing_category.data[0]
 
         # Update the category
-        response = supabase.table("menu_categories").update(update_data).eq("id", category_id).eq("business_id", str(current_business.id)).execute()
+        response = await execute_async(supabase.table("menu_categories").update(update_data).eq("id", category_id).eq("business_id", str(current_business.id)))
 
         if response.data:
             return response.data[0]
@@ -338,7 +346,7 @@ async def delete_menu_category(
     """Delete a menu category."""
     try:
         # Verify category exists and belongs to this business
-        existing_category = supabase.table("menu_categories").select("*").eq("id", category_id).eq("business_id", str(current_business.id)).execute()
+        existing_category = await execute_async(supabase.table("menu_categories").select("*").eq("id", category_id).eq("business_id", str(current_business.id)))
 
         if not existing_category.data:
             raise HTTPException(
@@ -347,7 +355,7 @@ async def delete_menu_category(
             )
 
         # Check if there are menu items in this category
-        items_count_response = supabase.table("menu_items").select("id", count="exact").eq("category_id", category_id).execute()
+        items_count_response = await execute_async(supabase.table("menu_items").select("id", count="exact").eq("category_id", category_id))
 
         if items_count_response.count and items_count_response.count > 0:
             raise HTTPException(
@@ -356,7 +364,7 @@ async def delete_menu_category(
             )
 
         # Delete the category
-        response = supabase.table("menu_categories").delete().eq("id", category_id).eq("business_id", str(current_business.id)).execute()
+        response = await execute_async(supabase.table("menu_categories").delete().eq("id", category_id).eq("business_id", str(current_business.id)))
 
         return {
             "status": "success",
@@ -382,7 +390,7 @@ async def toggle_item_availability(
     """Toggle item availability."""
     try:
         # Verify menu item exists and belongs to this business
-        existing_item = supabase.table("menu_items").select("*").eq("id", item_id).eq("business_id", str(current_business.id)).execute()
+        existing_item = await execute_async(supabase.table("menu_items").select("*").eq("id", item_id).eq("business_id", str(current_business.id)))
 
         if not existing_item.data:
             raise HTTPException(
@@ -392,9 +400,10 @@ async def toggle_item_availability(
 
         # Update availability
         update_data = {"is_available": availability_data.is_available}
-        response = supabase.table("menu_items").update(update_data).eq("id", item_id).eq("business_id", str(current_business.id)).execute()
+        response = await execute_async(supabase.table("menu_items").update(update_data).eq("id", item_id).eq("business_id", str(current_business.id)))
 
         if response.data:
+            await schedule_menu_item_reindex_async([item_id])
             return response.data[0]
         else:
             raise HTTPException(
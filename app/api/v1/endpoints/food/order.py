@@ -1,13 +1,15 @@
 """Food order management endpoints for AI integration."""
 from typing import Any, List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
 from pydantic import BaseModel, Field, field_validator
 from decimal import Decimal
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.dependencies import get_current_business, get_current_user
 from app.models import OrderStatus, Business, User, PaymentStatus, PaymentMethod
+from app.services.business.live_orders import record_order_change
+from app.services.business.order_rollups import get_order_summary
 from app.services.websocket.connection_manager import manager
 import logging
 
@@ -114,7 +116,7 @@ async def create_order(
         }
 
         # Create order in database
-        response = supabase.table('orders').insert(order_dict).execute()
+        response = await execute_async(supabase.table('orders').insert(order_dict))
 
         if not response.data:
             raise HTTPException(
@@ -123,6 +125,7 @@ async def create_order(
             )
 
         order = response.data[0]
+        await record_order_change(order)
 
         # Send WebSocket notification
         await manager.broadcast_to_business(
@@ -176,7 +179,7 @@ async def get_orders(
             query = query.eq('table_id', table_id)
 
         # Order by creation date (newest first)
-        response = query.order('created_at', desc=True).limit(limit).execute()
+        response = await execute_async(query.order('created_at', desc=True).limit(limit))
 
         return response.data if response.data else []
 
@@ -199,7 +202,7 @@ async def get_active_orders(
     try:
         active_statuses = ['pending', 'confirmed', 'preparing', 'ready']
 
-        response = supabase.table('orders').select('*').eq('business_id', business.id).in_('status', active_statuses).order('created_at', desc=True).execute()
+        response = await execute_async(supabase.table('orders').select('*').eq('business_id', business.id).in_('status', active_statuses).order('created_at', desc=True))
 
         return response.data if response.data else []
 
@@ -221,7 +224,7 @@ async def get_order(
     Get a specific order by ID.
     """
     try:
-        response = supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id).execute()
+        response = await execute_async(supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id))
 
         if not response.data:
             raise HTTPException(
@@ -255,7 +258,7 @@ async def update_order(
     """
     try:
         # Get current order
-        response = supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id).execute()
+        response = await execute_async(supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id))
 
         if not response.data:
             raise HTTPException(
@@ -291,7 +294,7 @@ async def update_order(
             })
 
         # Update order
-        update_response = supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business.id).execute()
+        update_response = await execute_async(supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business.id))
 
         if not update_response.data:
             raise HTTPException(
@@ -300,6 +303,7 @@ async def update_order(
             )
 
         updated_order = update_response.data[0]
+        await record_order_change(updated_order)
 
         # Send WebSocket notification if status changed
         if order_update.status and order_update.status.value != old_status:
@@ -343,7 +347,7 @@ async def cancel_order(
     """
     try:
         # Get current order
-        response = supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id).execute()
+        response = await execute_async(supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id))
 
         if not response.data:
             raise HTTPException(
@@ -369,7 +373,7 @@ async def cancel_order(
             'cancelled_at': datetime.utcnow().isoformat()
         }
 
-        update_response = supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business.id).execute()
+        update_response = await execute_async(supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business.id))
 
         if not update_response.data:
             raise HTTPException(
@@ -377,6 +381,8 @@ async def cancel_order(
                 detail="Failed to cancel order"
             )
 
+        await record_order_change(update_response.data[0])
+
         # Send WebSocket notification
         await manager.broadcast_to_business(
             business_id=business.id,
@@ -414,7 +420,7 @@ async def process_payment(
     """
     try:
         # Get current order
-        response = supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id).execute()
+        response = await execute_async(supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business.id))
 
         if not response.data:
             raise HTTPException(
@@ -448,7 +454,7 @@ async def process_payment(
             'updated_at': datetime.utcnow().isoformat()
         }
 
-        update_response = supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business.id).execute()
+        update_response = await execute_async(supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business.id))
 
         if not update_response.data:
             raise HTTPException(
@@ -457,6 +463,7 @@ async def process_payment(
             )
 
         updated_order = update_response.data[0]
+        await record_order_change(updated_order)
 
         # Send WebSocket notification
         await manager.broadcast_to_business(
@@ -493,29 +500,23 @@ async def get_order_stats(
     """
     try:
         # Calculate date range
-        start_date = datetime.now() - timedelta(days=days)
-
-        # Get orders for the period
-        response = supabase.table('orders').select('*').eq('business_id', business.id).gte('created_at', start_date.isoformat()).execute()
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
 
-        orders = response.data if response.data else []
+        # Aggregate from the hourly order rollups
+        summary = await get_order_summary(supabase, business.id, start_date, end_date)
 
         # Calculate statistics
-        total_orders = len(orders)
-        completed_orders = len([o for o in orders if o['status'] == 'completed'])
-        total_revenue = sum(o['total_amount'] for o in orders if o['status'] == 'completed')
+        total_orders = summary["total_orders"]
+        completed_orders = summary["status_counts"].get('completed', 0)
+        total_revenue = summary["status_revenue"].get('completed', 0)
         avg_order_value = total_revenue / completed_orders if completed_orders > 0 else 0
 
         # Order status breakdown
-        status_counts = {}
-        for order in orders:
-            status_counts[order['status']] = status_counts.get(order['status'], 0) + 1
+        status_counts = summary["status_counts"]
 
         # Daily order counts
-        daily_orders = {}
-        for order in orders:
-            date_key = order['created_at'][:10]  # YYYY-MM-DD
-            daily_orders[date_key] = daily_orders.get(date_key, 0) + 1
+        daily_orders = {day: entry["count"] for day, entry in summary["daily"].items()}
 
         return {
             "period_days": days,
@@ -7,7 +7,7 @@ import io
 import base64
 import json
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.dependencies import get_current_business, get_current_user
 from app.models import Business, User
 from app.services.utils.qr_generator import QRCodeGenerator
@@ -57,7 +57,7 @@ async def get_food_qr_codes(
     """
     try:
         # Get tables for this business
-        tables_response = supabase.table('tables').select('*').eq('business_id', business.id).execute()
+        tables_response = await execute_async(supabase.table('tables').select('*').eq('business_id', business.id))
         
         qr_codes = []
         qr_generator = QRCodeGenerator()
@@ -138,7 +138,7 @@ async def generate_food_qr_code(
                 )
             
             # Get table
-            table_response = supabase.table('tables').select('*').eq('id', qr_data.table_id).eq('business_id', business.id).execute()
+            table_response = await execute_async(supabase.table('tables').select('*').eq('id', qr_data.table_id).eq('business_id', business.id))
             
             if not table_response.data:
                 raise HTTPException(
@@ -248,7 +248,7 @@ async def bulk_generate_food_qr_codes(
         
         if type == QRCodeType.TABLE:
             # Get tables for this business
-            tables_response = supabase.table('tables').select('*').eq('business_id', business.id).limit(count).execute()
+            tables_response = await execute_async(supabase.table('tables').select('*').eq('business_id', business.id).limit(count))
             
             if tables_response.data:
                 for table in tables_response.data:
@@ -380,7 +380,7 @@ async def update_food_qr_code(
             table_id = int(qr_id.split("_")[1])
             
             # Get the table
-            table_response = supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id).execute()
+            table_response = await execute_async(supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id))
             
             if not table_response.data:
                 raise HTTPException(
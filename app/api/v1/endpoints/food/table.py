@@ -4,11 +4,12 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel, Field, field_validator
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.dependencies import get_current_business, get_current_user
 from app.models import TableStatus, Business, User, OrderStatus, PaymentStatus, PaymentMethod
 from app.schemas.table import TableResponse, TableUpdate, TableCreate
 from app.schemas.qr_codes import QRCodeCreate, QRCodeType
+from app.services.business.live_orders import record_order_change
 from app.services.utils.qr_generator import QRCodeGenerator
 from app.services.websocket.connection_manager import manager
 import io
@@ -59,7 +60,7 @@ async def create_table(
     """
     try:
         # Check if table number already exists for this business
-        existing_response = supabase.table('tables').select('*').eq('business_id', business.id).eq('table_number', table_data.table_number).execute()
+        existing_response = await execute_async(supabase.table('tables').select('*').eq('business_id', business.id).eq('table_number', table_data.table_number))
         
         if existing_response.data:
             raise HTTPException(
@@ -82,7 +83,7 @@ async def create_table(
         }
         
         # Insert table
-        response = supabase.table('tables').insert(table_dict).execute()
+        response = await execute_async(supabase.table('tables').insert(table_dict))
         
         if not response.data:
             raise HTTPException(
@@ -127,7 +128,7 @@ async def get_table_qr_code(
     """
     try:
         # Get table
-        table_response = supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id).execute()
+        table_response = await execute_async(supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id))
         
         if not table_response.data:
             raise HTTPException(
@@ -201,7 +202,7 @@ async def delete_table(
     """
     try:
         # Check if table exists and belongs to business
-        table_response = supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id).execute()
+        table_response = await execute_async(supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id))
         
         if not table_response.data:
             raise HTTPException(
@@ -219,7 +220,7 @@ async def delete_table(
             )
         
         # Check if table has active orders
-        orders_response = supabase.table('orders').select('*').eq('table_id', table_id).in_('status', ['pending', 'confirmed', 'preparing', 'ready']).execute()
+        orders_response = await execute_async(supabase.table('orders').select('*').eq('table_id', table_id).in_('status', ['pending', 'confirmed', 'preparing', 'ready']))
         
         if orders_response.data and len(orders_response.data) > 0:
             raise HTTPException(
@@ -228,7 +229,7 @@ async def delete_table(
             )
         
         # Delete table
-        delete_response = supabase.table('tables').delete().eq('id', table_id).eq('business_id', business.id).execute()
+        delete_response = await execute_async(supabase.table('tables').delete().eq('id', table_id).eq('business_id', business.id))
         
         if not delete_response.data:
             raise HTTPException(
@@ -281,7 +282,7 @@ async def get_food_tables(
             query = query.eq('section', section)
         
         # Order by table number
-        response = query.order('table_number').execute()
+        response = await execute_async(query.order('table_number'))
         
         if response.data:
             return response.data
@@ -306,7 +307,7 @@ async def update_table_status(
     """
     try:
         # Get current table
-        response = supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id).execute()
+        response = await execute_async(supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id))
         
         if not response.data:
             raise HTTPException(
@@ -318,10 +319,10 @@ async def update_table_status(
         old_status = table['status']
         
         # Update table status
-        update_response = supabase.table('tables').update({
+        update_response = await execute_async(supabase.table('tables').update({
             'status': status.value,
             'updated_at': datetime.utcnow().isoformat()
-        }).eq('id', table_id).eq('business_id', business.id).execute()
+        }).eq('id', table_id).eq('business_id', business.id))
         
         if not update_response.data:
             raise HTTPException(
@@ -367,7 +368,7 @@ async def assign_customer_to_table(
     """
     try:
         # Get table
-        table_response = supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id).execute()
+        table_response = await execute_async(supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id))
         
         if not table_response.data:
             raise HTTPException(
@@ -419,7 +420,7 @@ async def assign_customer_to_table(
             'updated_at': datetime.utcnow().isoformat()
         }
         
-        order_response = supabase.table('orders').insert(order_data).execute()
+        order_response = await execute_async(supabase.table('orders').insert(order_data))
         
         if not order_response.data:
             raise HTTPException(
@@ -428,12 +429,13 @@ async def assign_customer_to_table(
             )
         
         order = order_response.data[0]
+        await record_order_change(order)
         
         # Update table status to occupied
-        table_update_response = supabase.table('tables').update({
+        table_update_response = await execute_async(supabase.table('tables').update({
             'status': 'occupied',
             'updated_at': datetime.utcnow().isoformat()
-        }).eq('id', table_id).eq('business_id', business.id).execute()
+        }).eq('id', table_id).eq('business_id', business.id))
         
         if not table_update_response.data:
             raise HTTPException(
@@ -491,7 +493,7 @@ async def check_table_availability(
             query = query.gte('capacity', capacity)
         
         # Get all tables
-        response = query.order('table_number').execute()
+        response = await execute_async(query.order('table_number'))
         
         if not response.data:
             all_tables = []
@@ -546,7 +548,7 @@ async def update_table_layout(
                 continue
                 
             # Get table first to verify it exists
-            table_response = supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id).execute()
+            table_response = await execute_async(supabase.table('tables').select('*').eq('id', table_id).eq('business_id', business.id))
             
             if not table_response.data:
                 continue
@@ -562,7 +564,7 @@ async def update_table_layout(
                 update_data['capacity'] = table_data["capacity"]
             
             # Update table
-            update_response = supabase.table('tables').update(update_data).eq('id', table_id).eq('business_id', business.id).execute()
+            update_response = await execute_async(supabase.table('tables').update(update_data).eq('id', table_id).eq('business_id', business.id))
             
             if update_response.data:
                 updated_tables.append(update_response.data[0])
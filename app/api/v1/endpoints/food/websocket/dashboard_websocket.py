@@ -1,14 +1,18 @@
 """Dashboard WebSocket endpoints for real-time food service updates."""
 import json
 import logging
-from typing import Dict, Any
+import uuid
+from datetime import datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 from sqlalchemy.orm import Session
 
-from app.config.database import get_supabase_client as get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.core.supabase_auth import verify_supabase_token
 from app.models import Business, Order, Table
-from app.services.websocket.connection_manager import manager
+from app.services.business.live_orders import get_active_orders, get_changes_since, record_order_change
+from app.services.websocket.gateway import BUSINESS, DASHBOARD, gateway, topic
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -81,17 +85,15 @@ async def dashboard_websocket(
     
     try:
         # Verify business exists using Supabase
-        business_response = supabase.table('businesses').select('*').eq('id', business_id).execute()
+        business_response = await execute_async(supabase.table('businesses').select('*').eq('id', business_id))
         if not business_response.data:
             await websocket.close(code=4004, reason="Business not found")
             return
         
         business = business_response.data[0]
         
-        # Accept the WebSocket connection
-        session_id = f"dashboard_{business_id}"
-        await manager.connect(websocket, session_id)
-        manager.add_to_business(session_id, business_id)
+        # Accept the WebSocket connection (every open dashboard tab gets the same feeds)
+        await gateway.connect(websocket, [topic(BUSINESS, business_id), topic(DASHBOARD, business_id)])
     
         try:
             while True:
@@ -100,22 +102,46 @@ async def dashboard_websocket(
                 message = json.loads(data)
                 
                 # Handle different message types
-                if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                if await gateway.handle_heartbeat(websocket, message):
+                    continue
+                elif message.get("type") == "resume":
+                    # Reconnected: replay what was missed since the client's last event
+                    await gateway.resume(websocket, business_id, message.get("last_event_id"))
+                elif message.get("type") == "live_orders_sync":
+                    # Client sends its last cursor and receives only what changed since
+                    delta = await get_changes_since(business_id, supabase, message.get("cursor"))
+                    delta["type"] = "live_orders_delta"
+                    delta["since"] = message.get("cursor")
+                    await gateway.send_personal_message(delta, websocket)
                 elif message.get("type") == "dashboard_action":
                     # Process dashboard actions and broadcast to relevant clients
                     await handle_dashboard_action(message, business_id, supabase)
                 elif message.get("type") == "ai_chat":
-                    # Process AI chat messages
-                    response = await process_ai_chat_message(message, business_id, supabase)
-                    await websocket.send_json(response)
+                    # Runs on the gateway task pool; this loop keeps serving the socket
+                    request_id = str(message.get("request_id") or uuid.uuid4().hex)
+                    started = gateway.run_task(
+                        websocket,
+                        request_id,
+                        partial(run_ai_chat, websocket, message, request_id, business_id, supabase),
+                        on_cancel=partial(gateway.send_personal_message, {"type": "ai_chat_cancelled", "request_id": request_id}, websocket),
+                    )
+                    if not started:
+                        await gateway.send_personal_message({
+                            "type": "ai_chat_response",
+                            "request_id": request_id,
+                            "message": "Still working on your previous messages. Please wait a moment.",
+                            "success": False,
+                            "timestamp": message.get("timestamp")
+                        }, websocket)
+                elif message.get("type") == "ai_chat_cancel":
+                    gateway.cancel_task(websocket, str(message.get("request_id")))
                 
         except WebSocketDisconnect:
-            manager.disconnect(session_id)
+            gateway.disconnect(websocket)
             logger.info(f"Dashboard WebSocket disconnected for business {business_id}")
         except Exception as e:
             logger.error(f"Dashboard WebSocket error for business {business_id}: {str(e)}")
-            manager.disconnect(session_id)
+            gateway.disconnect(websocket)
     finally:
         pass
 
@@ -129,10 +155,14 @@ async def handle_dashboard_action(message: Dict[str, Any], business_id: int, sup
         new_status = message.get("status")
         
         # Update order status using Supabase
-        order_response = supabase.table('orders').update({'status': new_status}).eq('id', order_id).eq('business_id', business_id).execute()
+        order_response = await execute_async(supabase.table('orders').update({
+            'status': new_status,
+            'updated_at': datetime.utcnow().isoformat()
+        }).eq('id', order_id).eq('business_id', business_id))
         if order_response.data:
+            await record_order_change(order_response.data[0])
             # Broadcast order update
-            await manager.broadcast_to_business(business_id, {
+            await gateway.broadcast_to_business(business_id, {
                 "type": "order_update",
                 "order_id": order_id,
                 "status": new_status,
@@ -145,17 +175,31 @@ async def handle_dashboard_action(message: Dict[str, Any], business_id: int, sup
         new_status = message.get("status")
         
         # Update table status using Supabase
-        table_response = supabase.table('tables').update({'status': new_status}).eq('id', table_id).eq('business_id', business_id).execute()
+        table_response = await execute_async(supabase.table('tables').update({'status': new_status}).eq('id', table_id).eq('business_id', business_id))
         if table_response.data:
             # Broadcast table update
-            await manager.broadcast_to_business(business_id, {
+            await gateway.broadcast_to_business(business_id, {
                 "type": "table_update",
                 "table_id": table_id,
                 "status": new_status,
                 "timestamp": message.get("timestamp")
             })
 
-async def process_ai_chat_message(message: Dict[str, Any], business_id: int, supabase) -> Dict[str, Any]:
+async def run_ai_chat(websocket: WebSocket, message: Dict[str, Any], request_id: str, business_id: int, supabase):
+    """Answer an AI chat message, streaming ``ai_chat_token`` frames before the final ``ai_chat_response``."""
+    async def send_token(token: str):
+        await gateway.send_personal_message({"type": "ai_chat_token", "request_id": request_id, "token": token}, websocket)
+
+    response = await process_ai_chat_message(message, business_id, supabase, on_token=send_token)
+    response["request_id"] = request_id
+    await gateway.send_personal_message(response, websocket)
+
+async def process_ai_chat_message(
+    message: Dict[str, Any],
+    business_id: int,
+    supabase,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Dict[str, Any]:
     """Process AI chat messages and generate responses using Dashboard AI Handler."""
     from app.services.ai import DashboardAIHandler
     
@@ -166,12 +210,11 @@ async def process_ai_chat_message(message: Dict[str, Any], business_id: int, sup
         # Initialize dashboard AI handler with the provided session
         ai_handler = DashboardAIHandler(supabase)
         
-        # Get recent orders for context
-        recent_orders_response = supabase.table('orders').select('*').eq('business_id', business_id).order('created_at', desc=True).limit(5).execute()
-        recent_orders = recent_orders_response.data if recent_orders_response.data else []
+        # Most recent active orders for context, from the live order view
+        recent_orders = await get_active_orders(business_id, supabase, limit=5)
         
         # Get table status
-        tables_response = supabase.table('tables').select('*').eq('business_id', business_id).execute()
+        tables_response = await execute_async(supabase.table('tables').select('*').eq('business_id', business_id))
         tables = tables_response.data if tables_response.data else []
         
         # Process the message through the dashboard AI handler
@@ -183,7 +226,8 @@ async def process_ai_chat_message(message: Dict[str, Any], business_id: int, sup
             additional_context={
                 "recent_orders": recent_orders,
                 "tables": tables
-            }
+            },
+            on_token=on_token
         )
         
         return {
@@ -204,17 +248,17 @@ async def process_ai_chat_message(message: Dict[str, Any], business_id: int, sup
 # Additional helper functions for dashboard updates
 async def send_order_notification(order_id: int, business_id: int, message: str):
     """Send order notification to dashboard."""
-    await manager.broadcast({
+    await gateway.publish(topic(DASHBOARD, business_id), {
         "type": "order_notification",
         "order_id": order_id,
         "message": message
-    }, f"dashboard_{business_id}")
+    })
 
 async def send_inventory_alert(item_id: int, business_id: int, alert_type: str, message: str):
     """Send inventory alert to dashboard."""
-    await manager.broadcast({
+    await gateway.publish(topic(DASHBOARD, business_id), {
         "type": "inventory_alert",
         "item_id": item_id,
         "alert_type": alert_type,
         "message": message
-    }, f"dashboard_{business_id}")
+    })
@@ -1,12 +1,14 @@
 """Kitchen WebSocket endpoints for real-time food preparation updates."""
 import json
 import logging
+from datetime import datetime
 from typing import Dict, Any
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.models import Business, Order
-from app.services.websocket.connection_manager import manager
+from app.services.business.live_orders import record_order_change
+from app.services.websocket.gateway import KITCHEN, gateway, topic
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -25,13 +27,13 @@ async def kitchen_websocket(
     supabase = get_supabase_client()
     try:
         # Verify business exists
-        business_response = supabase.table('businesses').select('*').eq('id', business_id).single().execute()
+        business_response = await execute_async(supabase.table('businesses').select('*').eq('id', business_id).single())
         if not business_response.data:
             await websocket.close(code=4004, reason="Business not found")
             return
         
         # Accept the WebSocket connection
-        await manager.connect(websocket, f"kitchen_{business_id}")
+        await gateway.connect(websocket, [topic(KITCHEN, business_id)])
         
         try:
             while True:
@@ -40,8 +42,11 @@ async def kitchen_websocket(
                 message = json.loads(data)
                 
                 # Handle different message types
-                if message.get("type") == "ping":
-                    await manager.send_personal_message({"type": "pong"}, websocket)
+                if await gateway.handle_heartbeat(websocket, message):
+                    continue
+                elif message.get("type") == "resume":
+                    # Reconnected: replay what was missed since the client's last event
+                    await gateway.resume(websocket, business_id, message.get("last_event_id"))
                 elif message.get("type") == "kitchen_action":
                     # Process kitchen actions and broadcast to relevant clients
                     await handle_kitchen_action(message, business_id, supabase)
@@ -50,11 +55,11 @@ async def kitchen_websocket(
                     await handle_staff_notification(message, business_id)
                 
         except WebSocketDisconnect:
-            manager.disconnect(websocket)
+            gateway.disconnect(websocket)
             logger.info(f"Kitchen WebSocket disconnected for business {business_id}")
         except Exception as e:
             logger.error(f"Kitchen WebSocket error for business {business_id}: {str(e)}")
-            manager.disconnect(websocket)
+            gateway.disconnect(websocket)
     finally:
         # Supabase client doesn't need explicit closing
         pass
@@ -68,33 +73,38 @@ async def handle_kitchen_action(message: Dict[str, Any], business_id: int, supab
         order_id = message.get("order_id")
         new_status = message.get("status")
         
-        order_response = supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business_id).single().execute()
+        order_response = await execute_async(supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business_id).single())
         if order_response.data:
-            supabase.table('orders').update({'status': new_status}).eq('id', order_id).execute()
+            update_response = await execute_async(supabase.table('orders').update({
+                'status': new_status,
+                'updated_at': datetime.utcnow().isoformat()
+            }).eq('id', order_id))
+            if update_response.data:
+                await record_order_change(update_response.data[0])
             
-            # Broadcast order queue update
-            await manager.broadcast({
+            # Broadcast order queue update (merged with other flips of this order in the window)
+            await gateway.publish_coalesced(topic(KITCHEN, business_id), ("order_queue_update", order_id), {
                 "type": "order_queue_update",
                 "order_id": order_id,
                 "status": new_status,
                 "timestamp": message.get("timestamp")
-            }, f"kitchen_{business_id}")
+            })
     
     elif action == "preparation_time_update":
         # Update preparation time
         order_id = message.get("order_id")
         prep_time = message.get("prep_time")
         
-        order_response = supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business_id).single().execute()
+        order_response = await execute_async(supabase.table('orders').select('*').eq('id', order_id).eq('business_id', business_id).single())
         if order_response.data:
             # In a real implementation, you might store this in a separate field
             # For now, we'll just broadcast the update
-            await manager.broadcast({
+            await gateway.publish_coalesced(topic(KITCHEN, business_id), ("preparation_time_update", order_id), {
                 "type": "preparation_time_update",
                 "order_id": order_id,
                 "prep_time": prep_time,
                 "timestamp": message.get("timestamp")
-            }, f"kitchen_{business_id}")
+            })
 
 async def handle_staff_notification(message: Dict[str, Any], business_id: int):
     """Handle staff notifications."""
@@ -102,27 +112,27 @@ async def handle_staff_notification(message: Dict[str, Any], business_id: int):
     content = message.get("content")
     
     # Broadcast staff notification
-    await manager.broadcast({
+    await gateway.publish(topic(KITCHEN, business_id), {
         "type": "staff_notification",
         "notification_type": notification_type,
         "content": content,
         "timestamp": message.get("timestamp")
-    }, f"kitchen_{business_id}")
+    })
 
 # Additional helper functions for kitchen updates
 async def send_order_to_kitchen(order_id: int, business_id: int, order_details: Dict[str, Any]):
     """Send new order to kitchen display."""
-    await manager.broadcast({
+    await gateway.publish(topic(KITCHEN, business_id), {
         "type": "new_order",
         "order_id": order_id,
         "order_details": order_details
-    }, f"kitchen_{business_id}")
+    })
 
 async def send_preparation_update(order_id: int, business_id: int, status: str, message: str):
     """Send preparation status update."""
-    await manager.broadcast({
+    await gateway.publish_coalesced(topic(KITCHEN, business_id), ("preparation_update", order_id), {
         "type": "preparation_update",
         "order_id": order_id,
         "status": status,
         "message": message
-    }, f"kitchen_{business_id}")
+    })
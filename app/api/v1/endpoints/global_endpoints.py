@@ -10,7 +10,7 @@ from typing import Dict, Any, Union
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 # GlobalAIHandler removed during CrewAI integration - using CrewAI orchestrator instead
 from app.config.settings import settings
 
@@ -333,7 +333,7 @@ async def _prepare_enhanced_context(user_id: str, supabase) -> Dict[str, Any]:
     """Prepare enhanced context for the orchestrator"""
     try:
         # Get available businesses
-        businesses_resp = supabase.table("businesses").select("*").execute()
+        businesses_resp = await execute_async(supabase.table("businesses").select("*"))
         businesses = businesses_resp.data or []
 
         return {
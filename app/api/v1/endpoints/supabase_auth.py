@@ -8,8 +8,10 @@ import uuid
 import logging
 from datetime import datetime
 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
+from app.core.auth_cache import invalidate_business
 from app.schemas.auth import RegisterBusinessRequest, TokenResponse, LoginRequest
+from app.tasks.embedding_tasks import schedule_business_reindex_async
 
 router = APIRouter()
 
@@ -29,7 +31,7 @@ async def direct_supabase_register(
     """
     try:
         # Check if business slug already exists
-        business_response = supabase.table("businesses").select("*").eq("slug", request.business_slug).execute()
+        business_response = await execute_async(supabase.table("businesses").select("*").eq("slug", request.business_slug))
         if business_response.data:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -37,7 +39,7 @@ async def direct_supabase_register(
             )
 
         # Check if business with this email already exists
-        email_business_response = supabase.table("businesses").select("*").eq("email", request.admin_email).execute()
+        email_business_response = await execute_async(supabase.table("businesses").select("*").eq("email", request.admin_email))
         if email_business_response.data:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -88,7 +90,7 @@ async def direct_supabase_register(
             "updated_at": datetime.utcnow().isoformat()
         }
 
-        business_response = supabase.table("businesses").insert(business_data).execute()
+        business_response = await execute_async(supabase.table("businesses").insert(business_data))
         if not business_response.data:
             # Try to clean up the auth user if business creation fails
             try:
@@ -106,12 +108,12 @@ async def direct_supabase_register(
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        business_update_response = supabase.table("businesses").update(business_update_data).eq("id", business_id).execute()
+        business_update_response = await execute_async(supabase.table("businesses").update(business_update_data).eq("id", business_id))
         if not business_update_response.data:
             # Try to clean up both auth user and business if update fails
             try:
                 supabase.auth.admin.delete_user(user_id)
-                supabase.table("businesses").delete().eq("id", business_id).execute()
+                await execute_async(supabase.table("businesses").delete().eq("id", business_id))
             except Exception as cleanup_error:
                 logging.error(f"Failed to cleanup after business update failure: {cleanup_error}")
             raise HTTPException(
@@ -119,6 +121,11 @@ async def direct_supabase_register(
                 detail="Failed to update business with owner info"
             )
 
+        invalidate_business(business_id)
+
+        # Make the new business searchable
+        await schedule_business_reindex_async([business_id])
+
         # Sign in the user to get JWT token
         try:
             sign_in_response = supabase.auth.sign_in_with_password({
@@ -197,7 +204,7 @@ async def supabase_login(
 
         # Get business details for the user
         try:
-            business_response = supabase.table("businesses").select("*").eq("owner_id", user.id).execute()
+            business_response = await execute_async(supabase.table("businesses").select("*").eq("owner_id", user.id))
             business_data = business_response.data[0] if business_response.data else None
             
         except Exception as business_error:
@@ -21,6 +21,7 @@ task_routes = {
     'app.tasks.order_tasks.*': {'queue': 'orders'},
     'app.tasks.notification_tasks.*': {'queue': 'notifications'},
     'app.tasks.analytics_tasks.*': {'queue': 'analytics'},
+    'app.tasks.embedding_tasks.*': {'queue': 'embeddings'},
 }
 
 # Task execution settings
@@ -49,6 +50,10 @@ beat_schedule = {
         'task': 'app.tasks.analytics_tasks.update_analytics',
         'schedule': 3600.0,  # 1 hour
     },
+    'rebuild-vector-index': {
+        'task': 'app.tasks.embedding_tasks.rebuild_vector_index',
+        'schedule': 86400.0,  # 24 hours
+    },
 }
 
 # Logging
@@ -1,6 +1,12 @@
 """Pure Supabase database configuration."""
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import asyncio
 import logging
+import threading
+
+import httpx
+
 from app.config.settings import settings
 
 # Supabase client (singleton)
@@ -27,7 +33,11 @@ def get_supabase_client():
                 raise ValueError("❌ Supabase credentials missing in .env file")
                 
             # Create client - use basic initialization to avoid proxy issues
-            _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+            client = create_client(SUPABASE_URL, SUPABASE_KEY)
+            # PostgREST clients are rebuilt on auth events; route every one of
+            # them through the shared keep-alive pool
+            client._init_postgrest_client = _init_pooled_postgrest_client
+            _supabase_client = client
             logging.info("✅ Supabase client initialized successfully")
             
         except Exception as e:
@@ -36,6 +46,150 @@ def get_supabase_client():
     
     return _supabase_client
 
+
+class PooledHTTPTransport(httpx.HTTPTransport):
+    """HTTP transport that counts requests for pool utilisation metrics."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._stats_lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().handle_request(request)
+        except Exception:
+            with self._stats_lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        connections = list(self._pool.connections)
+        with self._stats_lock:
+            return {
+                "http2": settings.SUPABASE_HTTP2,
+                "max_connections": settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                "max_keepalive_connections": settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                "connections": len(connections),
+                "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "errors": self.errors,
+            }
+
+
+# Keep-alive connection pool shared by every Supabase HTTP client in the process
+_http_transport: Optional[PooledHTTPTransport] = None
+_http_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> PooledHTTPTransport:
+    """Get the per-process pooled (HTTP/2 when enabled) transport for Supabase."""
+    global _http_transport
+
+    if _http_transport is None:
+        with _http_transport_lock:
+            if _http_transport is None:
+                _http_transport = PooledHTTPTransport(
+                    http2=settings.SUPABASE_HTTP2,
+                    limits=httpx.Limits(
+                        max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                        keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+                    ),
+                )
+
+    return _http_transport
+
+
+def _init_pooled_postgrest_client(rest_url: str, headers: Dict[str, str], schema: str, timeout):
+    """Build a PostgREST client whose session sends through the shared pool."""
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient
+
+    class PooledPostgrestClient(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout):
+            return SyncClient(
+                base_url=base_url,
+                headers=headers,
+                timeout=timeout,
+                transport=get_http_transport(),
+            )
+
+    return PooledPostgrestClient(
+        rest_url,
+        headers=headers,
+        schema=schema,
+        timeout=timeout,
+    )
+
+
+def get_http_pool_stats() -> Dict[str, Any]:
+    """Utilisation of the Supabase connection pool (empty until first use)."""
+    if _http_transport is None:
+        return {}
+    return _http_transport.stats()
+
+
+def close_http_transport() -> None:
+    """Close pooled connections (application shutdown)."""
+    global _http_transport
+
+    if _http_transport is not None:
+        _http_transport.close()
+        _http_transport = None
+
+
+# Bounded thread pool for blocking PostgREST calls made from async code
+_db_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get the per-process thread pool used to run Supabase queries."""
+    global _db_executor
+
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.SUPABASE_EXECUTOR_MAX_WORKERS,
+            thread_name_prefix="supabase-db",
+        )
+
+    return _db_executor
+
+
+async def execute_async(query):
+    """
+    Execute a built Supabase query without blocking the event loop.
+
+    The synchronous ``query.execute()`` runs on the bounded DB thread pool, so
+    concurrent requests on a worker overlap their PostgREST round trips.
+
+    Usage:
+        response = await execute_async(supabase.table("orders").select("*").eq("id", order_id))
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), query.execute)
+
+
+def shutdown_db_executor() -> None:
+    """Stop the DB thread pool (application shutdown)."""
+    global _db_executor
+
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=False)
+        _db_executor = None
+
 # ❌ REMOVE THIS CONFUSING FUNCTION:
 # def get_db():
 #     return get_supabase_client()
\ No newline at end of file
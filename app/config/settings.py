@@ -40,9 +40,65 @@ class Settings(BaseSettings):
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
+    # Fan WebSocket broadcasts out to every worker over Redis pub/sub
+    WEBSOCKET_PUBSUB_ENABLED: bool = True
+    WEBSOCKET_PUBSUB_CHANNEL_PREFIX: str = "ws"
+    # Pending cross-worker broadcasts per worker before the oldest are dropped
+    WEBSOCKET_PUBSUB_QUEUE_SIZE: int = 1000
+    # Outbound frames buffered per socket, and what to do when a client falls behind
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # or "disconnect"
+    # Seconds between server heartbeat frames sent to every socket
+    WEBSOCKET_HEARTBEAT_INTERVAL: float = 25.0
+    # Sockets that answer heartbeats and then send nothing (not even a pong) for this
+    # long are reaped; 0 disables
+    WEBSOCKET_HEARTBEAT_TIMEOUT: float = 75.0
+    # Protocol-level ping/pong run by uvicorn (read by the gunicorn worker class); this
+    # closes dead receive-only clients that never send application heartbeats
+    WEBSOCKET_PROTOCOL_PING_INTERVAL: float = 20.0
+    WEBSOCKET_PROTOCOL_PING_TIMEOUT: float = 20.0
+    # Seconds high-frequency updates (kitchen) are held and merged into one frame; 0 disables
+    WEBSOCKET_COALESCE_WINDOW: float = 0.05
+    # Negotiate permessage-deflate with clients that offer it (read by the gunicorn worker class)
+    WEBSOCKET_PER_MESSAGE_DEFLATE: bool = True
+    # Events kept per business for replay on reconnect, mirrored to a Redis stream when enabled
+    WEBSOCKET_EVENT_LOG_SIZE: int = 1000
+    WEBSOCKET_EVENT_LOG_REDIS: bool = True
+    # Publishes wait on the Redis append: per-call timeout, and consecutive failures after
+    # which Redis is skipped (local ids only) for the retry period
+    WEBSOCKET_EVENT_LOG_REDIS_TIMEOUT: float = 0.25
+    WEBSOCKET_EVENT_LOG_REDIS_FAILURES: int = 3
+    WEBSOCKET_EVENT_LOG_REDIS_RETRY_SECONDS: float = 30.0
+    # AI chat jobs running at once per worker, and queued or running per socket
+    WEBSOCKET_TASK_CONCURRENCY: int = 8
+    WEBSOCKET_TASKS_PER_SOCKET: int = 2
+    # Live order feed: changes kept per business for cursor deltas, and how often
+    # views are reloaded without the cross-worker bus / with it (to catch writes
+    # that bypass record_order_change or bus messages lost in a reconnect)
+    LIVE_ORDERS_MAX_CHANGES: int = 500
+    LIVE_ORDERS_RESYNC_SECONDS: float = 30.0
+    LIVE_ORDERS_BUS_RESYNC_SECONDS: float = 300.0
+    # Cursors are wall-clock times shared by all workers; deltas reach back this far
+    # before the cursor to cover clock skew and bus delivery delay
+    LIVE_ORDERS_CURSOR_OVERLAP_SECONDS: float = 5.0
     
     # Security - Now using Supabase tokens only
     SECRET_KEY: str = "dev-secret-change-me"
+    # Verified tokens and business rows cached per worker by the auth dependencies
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # Dashboard analytics results shared by concurrent requests for the same window
+    # (across workers through Redis when enabled); order writes invalidate them
+    ANALYTICS_CACHE_TTL_SECONDS: float = 15.0
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 1000
+    ANALYTICS_CACHE_REDIS: bool = True
+    # Longest wait for another worker that is computing the same result
+    ANALYTICS_CACHE_LOCK_SECONDS: float = 10.0
+    # Redis call timeout, and consecutive failures after which the shared tier is
+    # skipped (local cache only) for the retry period
+    ANALYTICS_CACHE_REDIS_TIMEOUT: float = 0.25
+    ANALYTICS_CACHE_REDIS_FAILURES: int = 3
+    ANALYTICS_CACHE_REDIS_RETRY_SECONDS: float = 30.0
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -86,6 +142,27 @@ class Settings(BaseSettings):
     # Vector Database
     QDRANT_URL: Optional[str] = "http://localhost:6333"
     QDRANT_API_KEY: Optional[str] = None
+    # On-disk embedding index for RAG search (businesses and menu items)
+    VECTOR_INDEX_DIR: str = "./data/vector_index"
+    # Rows not indexed yet that a search may embed itself (cached) until the worker
+    # catches up; 0 keeps catalogue embedding out of the request path
+    VECTOR_INDEX_INLINE_LIMIT: int = 0
+    # Embedding model shared by every RAG search in a process
+    EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    EMBEDDING_DEVICE: str = "cpu"
+    EMBEDDING_NUM_THREADS: Optional[int] = None
+    # "torch" or "onnx" (requires optimum[onnxruntime])
+    EMBEDDING_BACKEND: str = "torch"
+    # Dynamic int8 quantization of the torch model (CPU only)
+    EMBEDDING_QUANTIZE: bool = False
+    # Load the model in the startup event instead of on the first search
+    EMBEDDING_PRELOAD: bool = False
+    # Embedding cache: in-process LRU backed by a disk tier shared by all workers
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_TTL_SECONDS: Optional[int] = 7 * 24 * 3600
+    EMBEDDING_CACHE_DIR: Optional[str] = "./data/embedding_cache"
+    EMBEDDING_CACHE_DISK_SIZE_LIMIT: int = 1024 * 1024 * 1024
 
     # External Services (Twilio, WhatsApp, Stripe)
     TWILIO_ACCOUNT_SID: Optional[str] = None
@@ -133,6 +210,13 @@ class Settings(BaseSettings):
     SUPABASE_API_KEY: Optional[str] = None  # Legacy fallback
     SUPABASE_JWT_SECRET: Optional[str] = None
     SUPABASE_PROJECT_ID: Optional[str] = None
+    # Threads per worker for running blocking Supabase queries off the event loop
+    SUPABASE_EXECUTOR_MAX_WORKERS: int = 16
+    # Keep-alive HTTP pool shared by all Supabase calls in a worker
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 20
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 10
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0
 
     # AWS Configuration (required for Agent Squad / Bedrock)
     AWS_ACCESS_KEY_ID: Optional[str] = None
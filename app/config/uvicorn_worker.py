@@ -0,0 +1,17 @@
+"""Gunicorn worker class for the API (see start.sh)."""
+from uvicorn.workers import UvicornWorker
+
+from app.config.settings import settings
+
+
+class RealtimeUvicornWorker(UvicornWorker):
+    """UvicornWorker with the WebSocket options from settings."""
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        # Compress frames for clients that offer permessage-deflate (batched kitchen frames compress well)
+        "ws_per_message_deflate": settings.WEBSOCKET_PER_MESSAGE_DEFLATE,
+        # Control-frame pings catch dead clients that never send application frames
+        "ws_ping_interval": settings.WEBSOCKET_PROTOCOL_PING_INTERVAL,
+        "ws_ping_timeout": settings.WEBSOCKET_PROTOCOL_PING_TIMEOUT,
+    }
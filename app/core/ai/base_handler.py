@@ -7,7 +7,8 @@ import asyncio
 import json
 import logging
 import re
-from typing import Dict, Any, Optional, List
+import threading
+from typing import AsyncIterator, Dict, Any, Optional, List
 from datetime import datetime
 
 try:
@@ -15,6 +16,7 @@ try:
 except Exception:  # ImportError or missing dependencies
     Groq = None  # type: ignore
 
+from app.config.database import execute_async
 from app.config.settings import settings
 from app.core.ai.types import RichContext, ChatContext
 from app.core.ai.role_mapper import RoleMapper
@@ -65,6 +67,64 @@ class BaseAIHandler:
             self.logger.exception("AI response generation failed: %s", e)
             raise
     
+    async def stream_ai_response(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the AI response in chunks as they are generated.
+
+        The Groq client is blocking, so the stream is consumed on a thread and
+        handed to the event loop chunk by chunk. Closing the generator (e.g.
+        the caller was cancelled) stops reading the stream.
+        """
+        if not self.client:
+            raise RuntimeError("Groq client not initialized")
+
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> None:
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                pass  # loop already closed
+
+        def read_stream() -> None:
+            try:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=2000,
+                    temperature=0.7,
+                    stream=True
+                )
+                try:
+                    for chunk in stream:
+                        if stop.is_set():
+                            break
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            put(chunk.choices[0].delta.content)
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        loop.run_in_executor(None, read_stream)
+        try:
+            while True:
+                item = await chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    self.logger.error("AI response streaming failed: %s", item)
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
     async def _execute_function_call(self, function_call) -> str:
         """Execute a function call and return the result"""
         function_name = function_call.name
@@ -111,8 +171,8 @@ class BaseAIHandler:
             }
             
             # Insert messages using Supabase API
-            supabase_client.table("messages").insert(user_msg).execute()
-            supabase_client.table("messages").insert(assistant_msg).execute()
+            await execute_async(supabase_client.table("messages").insert(user_msg))
+            await execute_async(supabase_client.table("messages").insert(assistant_msg))
             
         except Exception as e:
             self.logger.error("Failed to save conversation: %s", e)
@@ -6,7 +6,7 @@ from __future__ import annotations
 import logging
 from typing import Dict, Any, List, Optional
 
-from app.config.settings import settings
+from app.config.database import execute_async
 from app.core.ai.types import RichContext, ChatContext
 from app.core.ai.role_mapper import RoleMapper
 
@@ -23,7 +23,7 @@ async def build_global_context(context: RichContext) -> RichContext:
         
         # Load active businesses
         logger.info("Querying businesses...")
-        response = supabase.table('businesses').select('*').eq('is_active', True).limit(20).execute()
+        response = await execute_async(supabase.table('businesses').select('*').eq('is_active', True).limit(20))
         businesses = response.data if response.data else []
         logger.info(f"Found {len(businesses)} businesses")
         
@@ -31,7 +31,7 @@ async def build_global_context(context: RichContext) -> RichContext:
         enhanced_businesses = []
         for business in businesses:
             try:
-                menu_response = supabase.table('menu_items').select('*').eq('business_id', business['id']).eq('is_available', True).limit(3).execute()
+                menu_response = await execute_async(supabase.table('menu_items').select('*').eq('business_id', business['id']).eq('is_available', True).limit(3))
                 menu_items = menu_response.data if menu_response.data else []
                 
                 enhanced_businesses.append({
@@ -66,17 +66,16 @@ async def build_global_context(context: RichContext) -> RichContext:
 async def build_dedicated_context(context: RichContext, business_id: int) -> RichContext:
     """Build context for dedicated business chat"""
     try:
-        from supabase import create_client
-        api_key = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
-        supabase = create_client(settings.SUPABASE_URL, api_key)
+        from app.config.database import get_supabase_client
+        supabase = get_supabase_client()
         
         # Load business
-        business_response = supabase.table('businesses').select('*').eq('id', business_id).execute()
+        business_response = await execute_async(supabase.table('businesses').select('*').eq('id', business_id))
         if business_response.data:
             business = business_response.data[0]
             
             # Load menu
-            menu_response = supabase.table('menu_items').select('*').eq('business_id', business_id).eq('is_available', True).execute()
+            menu_response = await execute_async(supabase.table('menu_items').select('*').eq('business_id', business_id).eq('is_available', True))
             menu_items = menu_response.data if menu_response.data else []
             
             enhanced_business = {
@@ -193,7 +192,7 @@ async def load_conversation_history(
             else:
                 return []
         
-        response = query.order('created_at', desc=True).limit(20).execute()
+        response = await execute_async(query.order('created_at', desc=True).limit(20))
         messages = response.data if response.data else []
         
         history = []
@@ -0,0 +1,162 @@
+"""
+Per-process cache for authentication dependencies.
+
+``get_current_user`` used to verify the JWT and look up the owner's business
+on every request, and ``get_current_business`` then fetched the same row
+again. This cache keeps:
+
+- verified token payloads, keyed by the SHA-256 of the token and never kept
+  past the token's own ``exp``
+- business rows, keyed by id (with an email -> id map for owner lookups)
+
+Both expire after ``AUTH_CACHE_TTL_SECONDS``. Endpoints that write to
+``businesses`` call ``invalidate_business`` so the writing worker drops the
+row at once; other workers pick up the change when the TTL runs out.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import threading
+import time
+
+from app.config.settings import settings
+
+
+class AuthCache:
+    """Bounded TTL cache of verified token payloads and business rows."""
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._tokens: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._businesses: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._business_ids_by_email: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "token_hits": 0,
+            "token_misses": 0,
+            "business_hits": 0,
+            "business_misses": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _trim(entries: OrderedDict, limit: int) -> None:
+        while len(entries) > limit:
+            entries.popitem(last=False)
+
+    def get_payload(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verified payload for ``token``, or None if not cached (or expired)."""
+        key = self._token_key(token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._tokens.move_to_end(key)
+                self._counters["token_hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._tokens[key]
+            self._counters["token_misses"] += 1
+        return None
+
+    def set_payload(self, token: str, payload: Dict[str, Any]) -> None:
+        """Remember a verified payload until the TTL or the token's ``exp``, whichever is first."""
+        ttl = self.ttl_seconds
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._tokens[self._token_key(token)] = (time.monotonic() + ttl, payload)
+            self._trim(self._tokens, self.max_entries)
+
+    def _business_entry(self, business_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._businesses.get(business_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._businesses.move_to_end(business_id)
+            self._counters["business_hits"] += 1
+            return entry[1]
+        if entry is not None:
+            self._drop_business(business_id)
+        self._counters["business_misses"] += 1
+        return None
+
+    def _drop_business(self, business_id: str) -> None:
+        _, row = self._businesses.pop(business_id, (None, None))
+        if row and self._business_ids_by_email.get(row.get("email")) == business_id:
+            del self._business_ids_by_email[row["email"]]
+
+    def get_business(self, business_id) -> Optional[Dict[str, Any]]:
+        """Cached business row by id, or None."""
+        with self._lock:
+            return self._business_entry(str(business_id))
+
+    def get_business_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Cached business row by owner email, or None."""
+        with self._lock:
+            business_id = self._business_ids_by_email.get(email)
+            if business_id is None:
+                self._counters["business_misses"] += 1
+                return None
+            return self._business_entry(business_id)
+
+    def set_business(self, business_data: Dict[str, Any]) -> None:
+        """Remember a business row fetched from Supabase."""
+        if business_data.get("id") is None:
+            return
+        business_id = str(business_data["id"])
+        with self._lock:
+            self._drop_business(business_id)
+            self._businesses[business_id] = (time.monotonic() + self.ttl_seconds, business_data)
+            if business_data.get("email"):
+                self._business_ids_by_email[business_data["email"]] = business_id
+            while len(self._businesses) > self.max_entries:
+                self._drop_business(next(iter(self._businesses)))
+
+    def invalidate_business(self, business_id) -> None:
+        """Forget a business row after it was updated or deleted."""
+        with self._lock:
+            self._drop_business(str(business_id))
+            self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._businesses.clear()
+            self._business_ids_by_email.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["tokens"] = len(self._tokens)
+            stats["businesses"] = len(self._businesses)
+        return stats
+
+
+_auth_cache: Optional[AuthCache] = None
+
+
+def get_auth_cache() -> AuthCache:
+    """Get the process-wide authentication cache."""
+    global _auth_cache
+
+    if _auth_cache is None:
+        _auth_cache = AuthCache(
+            ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+            max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+        )
+
+    return _auth_cache
+
+
+def invalidate_business(business_id) -> None:
+    """Drop a changed business from this worker's authentication cache."""
+    get_auth_cache().invalidate_business(business_id)
@@ -3,7 +3,8 @@ from typing import Generator, Optional, Dict, Any
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError 
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
+from app.core.auth_cache import get_auth_cache
 from app.core.supabase_auth import verify_supabase_token
 from app.models.user import User
 from app.models.business import Business
@@ -12,6 +13,43 @@ from app.models.business import Business
 # that supports both custom JWT and Supabase tokens
 
 
+async def _verify_token_cached(token: str) -> Optional[Dict[str, Any]]:
+    """Verify a Supabase token, reusing the payload of a recently verified one."""
+    cache = get_auth_cache()
+    payload = cache.get_payload(token)
+    if payload is None:
+        payload = await verify_supabase_token(token)
+        if payload:
+            cache.set_payload(token, payload)
+    return payload
+
+
+async def _get_business_row(supabase, business_id) -> Optional[Dict[str, Any]]:
+    """Business row by id, served from the auth cache when possible."""
+    cache = get_auth_cache()
+    business_data = cache.get_business(business_id)
+    if business_data is None:
+        business_response = await execute_async(supabase.table("businesses").select("*").eq("id", business_id))
+        if not business_response.data:
+            return None
+        business_data = business_response.data[0]
+        cache.set_business(business_data)
+    return business_data
+
+
+async def _get_business_row_by_email(supabase, email: str) -> Optional[Dict[str, Any]]:
+    """Business row by owner email, served from the auth cache when possible."""
+    cache = get_auth_cache()
+    business_data = cache.get_business_by_email(email)
+    if business_data is None:
+        business_response = await execute_async(supabase.table("businesses").select("*").eq("email", email))
+        if not business_response.data:
+            return None
+        business_data = business_response.data[0]
+        cache.set_business(business_data)
+    return business_data
+
+
 async def get_current_user(
     authorization: Optional[str] = Header(None),
     supabase = Depends(get_supabase_client)
@@ -40,7 +78,7 @@ async def get_current_user(
     
     # Verify Supabase token only
     try:
-        supabase_payload = await verify_supabase_token(token)
+        supabase_payload = await _verify_token_cached(token)
         
         if supabase_payload:
             email: str = supabase_payload.get("email")
@@ -51,14 +89,13 @@ async def get_current_user(
                 )
             
             # Find business by owner email using Supabase
-            business_response = supabase.table("businesses").select("*").eq("email", email).execute()
-            if not business_response.data:
+            business_data = await _get_business_row_by_email(supabase, email)
+            if not business_data:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Business not found for this email. Please register first.",
                 )
             
-            business_data = business_response.data[0]
             if not business_data.get("is_active", True):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -108,17 +145,16 @@ async def get_current_user_optional(
     
     try:
         # Verify Supabase token only
-        supabase_payload = await verify_supabase_token(token)
+        supabase_payload = await _verify_token_cached(token)
         if supabase_payload:
             email: str = supabase_payload.get("email")
             if not email:
                 return None
 
-            business_response = supabase.table("businesses").select("*").eq("email", email).execute()
-            if not business_response.data:
+            business_data = await _get_business_row_by_email(supabase, email)
+            if not business_data:
                 return None
             
-            business_data = business_response.data[0]
             if not business_data.get("is_active", True):
                 return None
 
@@ -149,13 +185,12 @@ async def get_current_business(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User is not associated with any business"
         )
-    business_response = supabase.table("businesses").select("*").eq("id", current_user.business_id).execute()
-    if not business_response.data:
+    business_data = await _get_business_row(supabase, current_user.business_id)
+    if not business_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Business not found"
         )
-    business_data = business_response.data[0]
     if not business_data.get("is_active", True):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -178,7 +213,7 @@ async def get_current_business_from_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     token = authorization.split("Bearer ")[1]
-    payload = await verify_supabase_token(token)
+    payload = await _verify_token_cached(token)
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -191,13 +226,12 @@ async def get_current_business_from_token(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Token does not contain business_id",
         )
-    business_response = supabase.table("businesses").select("*").eq("id", business_id).execute()
-    if not business_response.data:
+    business_data = await _get_business_row(supabase, business_id)
+    if not business_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Business not found"
         )
-    business_data = business_response.data[0]
     if not business_data.get("is_active", True):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -213,7 +247,7 @@ async def get_current_business_from_token(
             detail="User is not associated with any business"
         )
     
-    business_response = supabase.table("businesses").select("*").eq("id", current_user.business_id).execute()
+    business_response = await execute_async(supabase.table("businesses").select("*").eq("id", current_user.business_id))
     if not business_response.data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -244,11 +278,10 @@ async def get_current_business_optional(
     if not current_user or not current_user.business_id:
         return None
     
-    business_response = supabase.table("businesses").select("*").eq("id", current_user.business_id).execute()
-    if not business_response.data:
+    business_data = await _get_business_row(supabase, current_user.business_id)
+    if not business_data:
         return None
     
-    business_data = business_response.data[0]
     return Business.from_dict(business_data) if business_data.get("is_active", True) else None
 
 
@@ -1,67 +1,156 @@
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status, Depends, Header
-import jwt
+import asyncio
 import logging
-import requests
 import time
+
+import httpx
 from jose import jwk, jwt
 from jose.utils import base64url_decode
 from app.config.settings import settings
 
-# Cache for JWKS keys
-_JWKS_CACHE = None
-_JWKS_CACHE_TIME = 0
+# JWKS cache timings (seconds)
 _JWKS_CACHE_DURATION = 300  # 5 minutes
+_JWKS_REFRESH_AHEAD = 60  # refresh in the background this long before expiry
+_JWKS_MIN_REFETCH_INTERVAL = 30  # unknown kids trigger at most one refetch per interval
+_JWKS_FETCH_TIMEOUT = 10
+
+
+class JWKSProvider:
+    """
+    Async Supabase JWKS cache for one worker process.
 
+    Keys are parsed once per fetch and indexed by ``kid``. Only one fetch runs
+    at a time; concurrent callers wait for it instead of issuing their own. A
+    background refresh starts shortly before the cache expires, so requests
+    normally never wait on the network.
+    """
 
-def refresh_jwks_cache():
+    def __init__(self):
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._background_refresh: Optional[asyncio.Task] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _fetch(self) -> Dict[str, Any]:
+        if not settings.SUPABASE_URL:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Supabase URL not configured"
+            )
+
+        jwks_url = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+        async with httpx.AsyncClient(timeout=_JWKS_FETCH_TIMEOUT) as client:
+            response = await client.get(jwks_url)
+            response.raise_for_status()
+            return response.json()
+
+    async def refresh(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the JWKS unless another caller just did.
+
+        Falls back to the previous key set if the fetch fails.
+        """
+        requested_at = time.monotonic()
+        async with self._get_lock():
+            # Someone else refreshed while we were waiting for the lock
+            if self._attempted_at >= requested_at:
+                return self._jwks
+            if not force and self._jwks and time.monotonic() - self._fetched_at < _JWKS_CACHE_DURATION - _JWKS_REFRESH_AHEAD:
+                return self._jwks
+
+            self._attempted_at = time.monotonic()
+            try:
+                jwks_data = await self._fetch()
+            except HTTPException:
+                raise
+            except Exception as e:
+                logging.error(f"Failed to fetch Supabase JWKS: {e}")
+                if self._jwks:
+                    logging.warning("Using expired JWKS cache due to fetch failure")
+                return self._jwks
+
+            keys = {}
+            for key_data in jwks_data.get("keys", []):
+                kid = key_data.get("kid")
+                if not kid:
+                    continue
+                try:
+                    keys[kid] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+                except Exception as e:
+                    logging.warning(f"Skipping unparseable JWKS key {kid}: {e}")
+
+            self._jwks = jwks_data
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            return jwks_data
+
+    def _schedule_background_refresh(self) -> None:
+        if self._background_refresh is not None and not self._background_refresh.done():
+            return
+        self._background_refresh = asyncio.get_running_loop().create_task(self.refresh())
+
+    async def get_jwks(self) -> Optional[Dict[str, Any]]:
+        """Current JWKS, fetching it if missing or expired."""
+        age = time.monotonic() - self._fetched_at
+        if self._jwks is None or age >= _JWKS_CACHE_DURATION:
+            await self.refresh()
+        elif age >= _JWKS_CACHE_DURATION - _JWKS_REFRESH_AHEAD:
+            self._schedule_background_refresh()
+        return self._jwks
+
+    async def get_key(self, kid: str):
+        """
+        Parsed public key for ``kid``, or None.
+
+        An unknown kid forces a refetch (keys may have been rotated), at most
+        once per ``_JWKS_MIN_REFETCH_INTERVAL``.
+        """
+        await self.get_jwks()
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._attempted_at >= _JWKS_MIN_REFETCH_INTERVAL:
+            logging.error(f"No matching key found for kid: {kid}")
+            await self.refresh(force=True)
+            key = self._keys.get(kid)
+        return key
+
+    def invalidate(self) -> None:
+        """Drop the cached key set so the next call refetches it."""
+        self._jwks = None
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+
+
+_jwks_provider = JWKSProvider()
+
+
+async def refresh_jwks_cache() -> bool:
     """Manually refresh the JWKS cache."""
-    global _JWKS_CACHE, _JWKS_CACHE_TIME
-    _JWKS_CACHE = None
-    _JWKS_CACHE_TIME = 0
+    _jwks_provider.invalidate()
     try:
-        jwks = get_supabase_jwks()
+        jwks = await _jwks_provider.refresh(force=True)
         return jwks is not None
-    except:
+    except Exception:
         return False
 
 
-def get_supabase_jwks():
+async def get_supabase_jwks() -> Optional[Dict[str, Any]]:
     """Fetch Supabase JWKS (JSON Web Key Set) for token verification with caching."""
-    global _JWKS_CACHE, _JWKS_CACHE_TIME
-
-    # Check if we have a valid cached version
-    current_time = time.time()
-    if _JWKS_CACHE and (current_time - _JWKS_CACHE_TIME) < _JWKS_CACHE_DURATION:
-        return _JWKS_CACHE
-
-    if not settings.SUPABASE_URL:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Supabase URL not configured"
-        )
-
-    jwks_url = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
-    try:
-        response = requests.get(jwks_url, timeout=10)
-        response.raise_for_status()
-        jwks_data = response.json()
-
-        # Update cache
-        _JWKS_CACHE = jwks_data
-        _JWKS_CACHE_TIME = current_time
-
-        return jwks_data
-    except Exception as e:
-        logging.error(f"Failed to fetch Supabase JWKS: {e}")
-        # If we have a cached version, use it even if it's expired
-        if _JWKS_CACHE:
-            logging.warning("Using expired JWKS cache due to fetch failure")
-            return _JWKS_CACHE
+    jwks = await _jwks_provider.get_jwks()
+    if jwks is None:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch Supabase JWKS keys"
         )
+    return jwks
 
 
 async def verify_supabase_token(token: str) -> Optional[Dict[str, Any]]:
@@ -127,11 +216,8 @@ async def verify_supabase_token(token: str) -> Optional[Dict[str, Any]]:
             logging.info("Attempting RS256 verification with JWKS")
             # Get the JWKS and find the matching key
             try:
-                jwks = get_supabase_jwks()
+                jwks = await get_supabase_jwks()
                 logging.info(f"JWKS keys count: {len(jwks.get('keys', [])) if jwks else 0}")
-                if not jwks:
-                    logging.error("Failed to fetch Supabase JWKS")
-                    return None
 
                 # Check if JWKS is empty
                 if len(jwks.get("keys", [])) == 0:
@@ -139,34 +225,15 @@ async def verify_supabase_token(token: str) -> Optional[Dict[str, Any]]:
                     logging.warning("Try using HS256 tokens instead of RS256")
                     return None
 
-                key = None
-                for jwk_key in jwks.get("keys", []):
-                    if jwk_key.get("kid") == kid:
-                        key = jwk_key
-                        break
-
-                if not key:
-                    logging.error(f"No matching key found for kid: {kid}")
-                    # Force refresh cache and try again
-                    global _JWKS_CACHE, _JWKS_CACHE_TIME
-                    _JWKS_CACHE = None
-                    _JWKS_CACHE_TIME = 0
-                    jwks = get_supabase_jwks()
-                    if jwks:
-                        for jwk_key in jwks.get("keys", []):
-                            if jwk_key.get("kid") == kid:
-                                key = jwk_key
-                                break
-
-                    if not key:
-                        logging.error(f"Still no matching key found for kid: {kid} after cache refresh")
-                        return None
+                public_key = await _jwks_provider.get_key(kid)
+                if public_key is None:
+                    logging.error(f"Still no matching key found for kid: {kid} after cache refresh")
+                    return None
 
                 # Verify the token
-                public_key = jwk.construct(key)
                 payload = jwt.decode(
                     token,
-                    key=public_key.to_pem().decode('utf-8') if hasattr(public_key, 'to_pem') else public_key,
+                    key=public_key,
                     algorithms=["RS256"],
                     audience="authenticated",
                     issuer=f"{settings.SUPABASE_URL}/auth/v1"
@@ -1,8 +1,14 @@
 """Main FastAPI application with WebSocket support."""
+import asyncio
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from app.config.database import get_supabase_client
+from app.config.database import (
+    close_http_transport,
+    get_http_pool_stats,
+    get_supabase_client,
+    shutdown_db_executor,
+)
 from app.config.settings import settings
 from app.config.logging import get_logger
 from app.api.v1.api import api_router
@@ -14,6 +20,8 @@ from app.core.middleware import (
     SecurityHeadersMiddleware,
 )
 from app.ngrok_config import get_cors_config, init_websocket_endpoints
+from app.services.analytics_cache import get_analytics_cache
+from app.services.websocket.gateway import gateway
 
 # Get logger
 logger = get_logger(__name__)
@@ -83,6 +91,20 @@ async def health_check():
     }
 
 
+# Runtime metrics (per worker process)
+@app.get("/metrics")
+async def runtime_metrics():
+    """Process-local cache and connection pool counters."""
+    from app.core.auth_cache import get_auth_cache
+    from app.services.ai.embedding_cache import get_embedding_cache
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "supabase_pool": get_http_pool_stats(),
+        "auth_cache": get_auth_cache().stats(),
+        "websocket": gateway.stats(),
+    }
+
+
 # RAG Test endpoint
 @app.get("/test-rag")
 async def test_rag(supabase = Depends(get_supabase_client)):
@@ -108,10 +130,21 @@ async def startup_event():
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info("WebSocket support enabled")
+    await gateway.start()
+
+    if settings.EMBEDDING_PRELOAD:
+        # Load the shared embedding model off the event loop so the first
+        # search request does not pay the model-load latency
+        from app.services.ai.embedding_model import preload_embedding_model
+        await asyncio.get_running_loop().run_in_executor(None, preload_embedding_model)
 
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown."""
-    logger.info("Shutting down application")
\ No newline at end of file
+    logger.info("Shutting down application")
+    await gateway.stop()
+    await get_analytics_cache().close()
+    shutdown_db_executor()
+    close_http_transport()
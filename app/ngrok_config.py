@@ -1,45 +1,9 @@
 from fastapi import WebSocket
-from typing import List
 import logging
 
-logger = logging.getLogger(__name__)
-
-class ConnectionManager:
-    """
-    Manages active WebSocket connections and broadcasts messages to all connected clients.
-    """
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        """Accept WebSocket connection and add to active connections."""
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"New WebSocket connection. Total connections: {len(self.active_connections)}")
+from app.services.websocket.gateway import gateway
 
-    def disconnect(self, websocket: WebSocket):
-        """Remove WebSocket connection from active connections."""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected. Remaining connections: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        """Broadcast a message to all connected WebSocket clients."""
-        if not self.active_connections:
-            return
-
-        import json
-        message_str = json.dumps(message)
-        
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_str)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-                self.disconnect(connection)
-
-# Global instance of the connection manager
-manager = ConnectionManager()
+logger = logging.getLogger(__name__)
 
 def get_cors_config():
     """
@@ -90,15 +54,17 @@ def init_websocket_endpoints(app):
     @app.websocket("/ws/dashboard")
     async def websocket_endpoint(websocket: WebSocket):
         """WebSocket endpoint for real-time dashboard updates."""
-        await manager.connect(websocket)
+        # No topics: this socket receives gateway-wide broadcasts only
+        await gateway.connect(websocket)
         try:
             while True:
                 # Keep connection alive
                 await websocket.receive_text()
+                gateway.touch(websocket)
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
         finally:
-            manager.disconnect(websocket)
+            gateway.disconnect(websocket)
 
 # Example usage in your FastAPI app:
 # from app.ngrok_config import init_websocket_endpoints, get_cors_config
@@ -6,12 +6,16 @@ Handles natural language requests for business reports and analytics
 
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
-from app.models import Order
-from datetime import datetime, timedelta
+from app.services.business.data_export import day_window, iter_order_pages
+from app.services.business.order_frame import load_order_frame
+from app.services.business.order_rollups import fetch_rollups, summarize
+from datetime import date, datetime, timedelta
 import logging
 import json
 import random
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 class ReportsManager:
@@ -46,6 +50,12 @@ class ReportsManager:
                 }
             }
     
+    async def _rollup_rows(self, business_id: int, start_date: date, end_date: date, with_customers: bool = False) -> List[Dict[str, Any]]:
+        """Hourly order rollups covering whole days ``start_date`` to ``end_date`` (inclusive)."""
+        start_datetime = datetime.combine(start_date, datetime.min.time())
+        end_datetime = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        return await fetch_rollups(self.db, business_id, start_datetime, end_datetime, with_customers=with_customers)
+    
     async def handle_reports_request(self, business_id: int, intent: Dict[str, Any]) -> Dict[str, Any]:
         """Handle reports-related requests from the AI"""
         action = intent.get("action", "")
@@ -118,39 +128,16 @@ class ReportsManager:
             else:
                 target_date = datetime.now().date()
             
-            # Get orders for the day
-            start_datetime = datetime.combine(target_date, datetime.min.time())
-            end_datetime = datetime.combine(target_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Aggregate the day's hourly order rollups
+            summary = summarize(await self._rollup_rows(business_id, target_date, target_date, with_customers=True))
             
             # Calculate metrics
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-            
-            # Status breakdown
-            status_counts = {}
-            for order in orders:
-                status = getattr(order.status, "value", str(order.status)) if order.status else "unknown"
-                if status not in status_counts:
-                    status_counts[status] = 0
-                status_counts[status] += 1
-            
-            # Customer metrics
-            unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
-            
-            # Payment methods
-            payment_methods = {}
-            for order in orders:
-                method = order.payment_method or "unknown"
-                if method not in payment_methods:
-                    payment_methods[method] = 0
-                payment_methods[method] += order.total_amount
+            total_revenue = summary["total_revenue"]
+            total_orders = summary["total_orders"]
+            avg_order_value = summary["average_order_value"]
+            status_counts = summary["status_counts"]
+            unique_customers = summary["unique_customers"]
+            payment_methods = summary["payment_method_revenue"]
             
             # Format response
             response_text = f"## Daily Business Summary - {target_date.strftime('%Y-%m-%d')}\n\n"
@@ -197,48 +184,25 @@ class ReportsManager:
             start_date = current_date - timedelta(days=current_date.weekday())  # Monday
             end_date = start_date + timedelta(days=6)  # Sunday
             
-            # Get orders for the week
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Aggregate the week's hourly order rollups
+            summary = summarize(await self._rollup_rows(business_id, start_date, end_date, with_customers=True))
             
             # Calculate metrics
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+            total_revenue = summary["total_revenue"]
+            total_orders = summary["total_orders"]
+            avg_order_value = summary["average_order_value"]
             
             # Daily trend
-            daily_revenue = {}
-            for order in orders:
-                day = order.created_at.date()
-                if day not in daily_revenue:
-                    daily_revenue[day] = 0
-                daily_revenue[day] += order.total_amount
-            
-            # Convert to list for JSON serialization
             daily_trend = [
                 {
-                    "date": day.strftime("%Y-%m-%d"),
-                    "revenue": round(revenue, 2)
+                    "date": day,
+                    "revenue": round(entry["revenue"], 2)
                 }
-                for day, revenue in sorted(daily_revenue.items())
+                for day, entry in sorted(summary["daily"].items())
             ]
             
-            # Status breakdown
-            status_counts = {}
-            for order in orders:
-                status = getattr(order.status, "value", str(order.status)) if order.status else "unknown"
-                if status not in status_counts:
-                    status_counts[status] = 0
-                status_counts[status] += 1
-            
-            # Customer metrics
-            unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
+            status_counts = summary["status_counts"]
+            unique_customers = summary["unique_customers"]
             
             # Format response
             response_text = f"## Weekly Performance Report\n"
@@ -305,31 +269,15 @@ class ReportsManager:
                     else:
                         start_date = start_date.replace(month=start_date.month - 1)
             
-            # Get orders for the period
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Aggregate the period's hourly order rollups
+            summary = summarize(await self._rollup_rows(business_id, start_date, end_date, with_customers=True))
             
             # Calculate metrics
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-            
-            # Customer metrics
-            unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
-            
-            # Status breakdown
-            status_counts = {}
-            for order in orders:
-                status = getattr(order.status, "value", str(order.status)) if order.status else "unknown"
-                if status not in status_counts:
-                    status_counts[status] = 0
-                status_counts[status] += 1
+            total_revenue = summary["total_revenue"]
+            total_orders = summary["total_orders"]
+            avg_order_value = summary["average_order_value"]
+            unique_customers = summary["unique_customers"]
+            status_counts = summary["status_counts"]
             
             # Format response
             response_text = f"## Comprehensive Monthly Report\n"
@@ -392,28 +340,16 @@ class ReportsManager:
                 end_date = current_date
                 title = "Sales Report (Last 7 Days)"
             
-            # Get orders for the period
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Aggregate the period's hourly order rollups
+            summary = summarize(await self._rollup_rows(business_id, start_date, end_date))
             
             # Calculate sales metrics
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+            total_revenue = summary["total_revenue"]
+            total_orders = summary["total_orders"]
+            avg_order_value = summary["average_order_value"]
             
             # Revenue by payment method
-            payment_methods = {}
-            for order in orders:
-                method = order.payment_method or "unknown"
-                if method not in payment_methods:
-                    payment_methods[method] = 0
-                payment_methods[method] += order.total_amount
+            payment_methods = summary["payment_method_revenue"]
             
             # Format response
             response_text = f"## {title}\n"
@@ -457,29 +393,17 @@ class ReportsManager:
             end_date = start_date.replace(day=1) + timedelta(days=32)
             end_date = end_date.replace(day=1) - timedelta(days=1)  # Last day of current month
             
-            # Get orders for current month
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Load the month's orders once
+            orders = await load_order_frame(self.db, business_id, start_date, end_date + timedelta(days=1))
             
             # Customer metrics
             total_orders = len(orders)
-            unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
+            total_revenue = orders.total()
+            unique_customers = orders.unique_customers()
             
             # Repeat customers analysis
-            customer_order_counts = {}
-            for order in orders:
-                if order.customer_id:
-                    if order.customer_id not in customer_order_counts:
-                        customer_order_counts[order.customer_id] = 0
-                    customer_order_counts[order.customer_id] += 1
-            
-            repeat_customers = len([cid for cid, count in customer_order_counts.items() if count > 1])
+            order_counts = orders.customer_stats()["orders"]
+            repeat_customers = int(np.count_nonzero(order_counts > 1))
             new_customers = unique_customers - repeat_customers
             
             repeat_customer_rate = (repeat_customers / unique_customers * 100) if unique_customers > 0 else 0
@@ -495,20 +419,11 @@ class ReportsManager:
             high_value_threshold = customer_config.get('high_value_threshold', 5)
             medium_value_threshold = customer_config.get('medium_value_threshold', 2)
             
-            high_value_customers = [
-                cid for cid, count in customer_order_counts.items() 
-                if count >= high_value_threshold  # Configurable threshold
-            ]
-            
-            medium_value_customers = [
-                cid for cid, count in customer_order_counts.items() 
-                if medium_value_threshold <= count < high_value_threshold
-            ]
-            
-            low_value_customers = [
-                cid for cid, count in customer_order_counts.items() 
-                if count < medium_value_threshold
-            ]
+            high_value_customers = int(np.count_nonzero(order_counts >= high_value_threshold))
+            medium_value_customers = int(np.count_nonzero(
+                (order_counts >= medium_value_threshold) & (order_counts < high_value_threshold)
+            ))
+            low_value_customers = int(np.count_nonzero(order_counts < medium_value_threshold))
             
             # Format response
             response_text = "## Customer Insights Report\n\n"
@@ -519,9 +434,9 @@ class ReportsManager:
             response_text += f"**Repeat Customer Rate:** {repeat_customer_rate:.1f}%\n\n"
             
             response_text += "**Customer Segments:**\n"
-            response_text += f"  - High Value (5+ orders): {len(high_value_customers)} customers\n"
-            response_text += f"  - Medium Value (2-4 orders): {len(medium_value_customers)} customers\n"
-            response_text += f"  - Low Value (1 order): {len(low_value_customers)} customers\n\n"
+            response_text += f"  - High Value (5+ orders): {high_value_customers} customers\n"
+            response_text += f"  - Medium Value (2-4 orders): {medium_value_customers} customers\n"
+            response_text += f"  - Low Value (1 order): {low_value_customers} customers\n\n"
             
             response_text += f"**Average Customer Value:** ${avg_customer_value:.2f}\n"
             
@@ -541,9 +456,9 @@ class ReportsManager:
                         "repeat_customer_rate": round(repeat_customer_rate, 2)
                     },
                     "customer_segments": {
-                        "high_value": len(high_value_customers),
-                        "medium_value": len(medium_value_customers),
-                        "low_value": len(low_value_customers)
+                        "high_value": high_value_customers,
+                        "medium_value": medium_value_customers,
+                        "low_value": low_value_customers
                     },
                     "average_customer_value": round(avg_customer_value, 2)
                 }
@@ -560,44 +475,24 @@ class ReportsManager:
             end_date = start_date.replace(day=1) + timedelta(days=32)
             end_date = end_date.replace(day=1) - timedelta(days=1)  # Last day of current month
             
-            # Get orders for current month
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Aggregate the month's hourly order rollups
+            summary = summarize(await self._rollup_rows(business_id, start_date, end_date))
             
             # Calculate revenue metrics
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+            total_revenue = summary["total_revenue"]
+            total_orders = summary["total_orders"]
+            avg_order_value = summary["average_order_value"]
             
             # Revenue by payment method
-            payment_methods = {}
-            for order in orders:
-                method = order.payment_method or "unknown"
-                if method not in payment_methods:
-                    payment_methods[method] = 0
-                payment_methods[method] += order.total_amount
+            payment_methods = summary["payment_method_revenue"]
             
             # Daily revenue trend
-            daily_revenue = {}
-            for order in orders:
-                day = order.created_at.date()
-                if day not in daily_revenue:
-                    daily_revenue[day] = 0
-                daily_revenue[day] += order.total_amount
-            
-            # Convert to list for JSON serialization
             daily_trend = [
                 {
-                    "date": day.strftime("%Y-%m-%d"),
-                    "revenue": round(revenue, 2)
+                    "date": day,
+                    "revenue": round(entry["revenue"], 2)
                 }
-                for day, revenue in sorted(daily_revenue.items())
+                for day, entry in sorted(summary["daily"].items())
             ]
             
             # Get business-specific cost parameters from settings
@@ -689,36 +584,20 @@ class ReportsManager:
             end_date = start_date.replace(day=1) + timedelta(days=32)
             end_date = end_date.replace(day=1) - timedelta(days=1)  # Last day of current month
             
-            # Get orders for current month
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Load the month's orders once
+            orders = await load_order_frame(self.db, business_id, start_date, end_date + timedelta(days=1))
             
             # Operational metrics
             total_orders = len(orders)
-            completed_orders = [o for o in orders if getattr(o.status, "value", str(o.status)) == "completed"]
+            completed_orders = orders.where(statuses=["completed"])
             
-            # Preparation time metrics
-            prep_times = []
-            for order in completed_orders:
-                if order.created_at and order.updated_at:
-                    prep_time = (order.updated_at - order.created_at).total_seconds() / 60  # in minutes
-                    prep_times.append(prep_time)
-            
-            avg_prep_time = sum(prep_times) / len(prep_times) if prep_times else 0
+            # Preparation time metrics (created to last update, in minutes)
+            prep_times = completed_orders.durations()
+            prep_times = prep_times[~np.isnan(prep_times)]
+            avg_prep_time = float(prep_times.mean()) if prep_times.size else 0
             
             # Order status distribution
-            status_counts = {}
-            for order in orders:
-                status = getattr(order.status, "value", str(order.status)) if order.status else "unknown"
-                if status not in status_counts:
-                    status_counts[status] = 0
-                status_counts[status] += 1
+            status_counts = orders.count_by("status")
             
             # Cancellation rate
             cancellations = status_counts.get("cancelled", 0)
@@ -730,28 +609,16 @@ class ReportsManager:
             peak_threshold = operational_config.get('peak_hour_threshold', 10)
             
             # Peak hours analysis
-            hourly_orders = {}
-            for order in orders:
-                hour = order.created_at.hour
-                if hour not in hourly_orders:
-                    hourly_orders[hour] = 0
-                hourly_orders[hour] += 1
-            
-            peak_hours = [hour for hour, count in hourly_orders.items() if count >= peak_threshold]
-            peak_hour = max(hourly_orders, key=hourly_orders.get) if hourly_orders else None
+            hourly_orders = orders.bucket("hour_of_day")
+            peak_hours = [row["period"] for row in hourly_orders if row["count"] >= peak_threshold]
+            peak_hour = max(hourly_orders, key=lambda row: row["count"])["period"] if hourly_orders else None
             
             # Daily order volume
-            daily_orders = {}
-            for order in orders:
-                day = order.created_at.date()
-                if day not in daily_orders:
-                    daily_orders[day] = 0
-                daily_orders[day] += 1
-            
-            avg_daily_orders = sum(daily_orders.values()) / len(daily_orders) if daily_orders else 0
+            daily_orders = orders.bucket("day")
+            avg_daily_orders = total_orders / len(daily_orders) if daily_orders else 0
             
             # Busiest day
-            busiest_day = max(daily_orders, key=daily_orders.get) if daily_orders else None
+            busiest_day = max(daily_orders, key=lambda row: row["count"])["period"] if daily_orders else None
             
             # Format response
             response_text = "## Monthly Operational Report\n\n"
@@ -766,7 +633,7 @@ class ReportsManager:
             response_text += "**Peak Performance:**\n"
             response_text += f"  - Peak Hour: {peak_hour}:00\n" if peak_hour is not None else "  - Peak Hour: Not available\n"
             response_text += f"  - Average Daily Orders: {avg_daily_orders:.1f}\n"
-            response_text += f"  - Busiest Day: {busiest_day.strftime('%Y-%m-%d') if busiest_day else 'Not available'}\n\n"
+            response_text += f"  - Busiest Day: {busiest_day or 'Not available'}\n\n"
             
             if status_counts:
                 response_text += "**Order Status Distribution:**\n"
@@ -793,7 +660,7 @@ class ReportsManager:
                     "peak_performance": {
                         "peak_hour": peak_hour,
                         "average_daily_orders": round(avg_daily_orders, 2),
-                        "busiest_day": busiest_day.strftime("%Y-%m-%d") if busiest_day else None
+                        "busiest_day": busiest_day
                     },
                     "status_distribution": status_counts
                 }
@@ -817,30 +684,19 @@ class ReportsManager:
                 else:
                     start_date = start_date.replace(month=start_date.month - 1)
             
-            # Get orders for the period
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Group the period's hourly order rollups by month
+            rows_by_month = {}
+            for row in await self._rollup_rows(business_id, start_date, end_date, with_customers=True):
+                rows_by_month.setdefault(row["bucket_start"].strftime("%Y-%m"), []).append(row)
             
-            # Group orders by month
             monthly_data = {}
-            for order in orders:
-                month_key = order.created_at.strftime("%Y-%m")
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = {"revenue": 0, "orders": 0, "customers": set()}
-                monthly_data[month_key]["revenue"] += order.total_amount
-                monthly_data[month_key]["orders"] += 1
-                if order.customer_id:
-                    monthly_data[month_key]["customers"].add(order.customer_id)
-            
-            # Convert customer sets to counts
-            for month_data in monthly_data.values():
-                month_data["customers"] = len(month_data["customers"])
+            for month_key, rows in rows_by_month.items():
+                month_summary = summarize(rows)
+                monthly_data[month_key] = {
+                    "revenue": month_summary["total_revenue"],
+                    "orders": month_summary["total_orders"],
+                    "customers": month_summary["unique_customers"]
+                }
             
             # Sort months chronologically
             sorted_months = sorted(monthly_data.keys())
@@ -937,31 +793,15 @@ class ReportsManager:
             start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
             end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
             
-            # Get orders for the period
-            start_datetime = datetime.combine(start_dt, datetime.min.time())
-            end_datetime = datetime.combine(end_dt, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Aggregate the period's hourly order rollups
+            summary = summarize(await self._rollup_rows(business_id, start_dt, end_dt, with_customers=True))
             
             # Calculate metrics based on report type
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-            
-            # Customer metrics
-            unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
-            
-            # Status breakdown
-            status_counts = {}
-            for order in orders:
-                status = getattr(order.status, "value", str(order.status)) if order.status else "unknown"
-                if status not in status_counts:
-                    status_counts[status] = 0
-                status_counts[status] += 1
+            total_revenue = summary["total_revenue"]
+            total_orders = summary["total_orders"]
+            avg_order_value = summary["average_order_value"]
+            unique_customers = summary["unique_customers"]
+            status_counts = summary["status_counts"]
             
             # Format response based on requested format
             if format.lower() == "csv":
@@ -1028,20 +868,16 @@ class ReportsManager:
             start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
             end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
             
-            # Get orders for the period
-            start_datetime = datetime.combine(start_dt, datetime.min.time())
-            end_datetime = datetime.combine(end_dt, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            # Counts come from the hourly rollups; the file itself is streamed by the export endpoint
+            window_start, window_end = day_window(start_dt, end_dt)
+            summary = summarize(await fetch_rollups(self.db, business_id, window_start, window_end, with_customers=True))
+            order_count = summary["total_orders"]
+            unique_customers = summary["unique_customers"]
             
             # Export data based on type
             if data_type == "orders":
                 # Simulate order data export
-                exported_records = len(orders)
+                exported_records = order_count
                 response_text = f"## Business Data Export\n\n"
                 response_text += f"**Data Type:** Orders\n"
                 response_text += f"**Period:** {start_date} to {end_date}\n"
@@ -1051,13 +887,16 @@ class ReportsManager:
                 
                 # Sample data for demonstration
                 response_text += "**Sample Data:**\n"
-                for i, order in enumerate(orders[:3]):  # Show first 3 orders
-                    response_text += f"  {i+1}. Order #{order.id} - ${order.total_amount:.2f} - {order.created_at.strftime('%Y-%m-%d')}\n"
-                if len(orders) > 3:
-                    response_text += f"  ... and {len(orders) - 3} more orders\n"
+                sample = []
+                async for page in iter_order_pages(self.db, business_id, window_start, window_end, "id,total_amount,created_at", page_size=3):
+                    sample = page
+                    break
+                for i, order in enumerate(sample):  # Show first 3 orders
+                    response_text += f"  {i+1}. Order #{order['id']} - ${float(order.get('total_amount') or 0):.2f} - {str(order['created_at'])[:10]}\n"
+                if order_count > 3:
+                    response_text += f"  ... and {order_count - 3} more orders\n"
             elif data_type == "customers":
                 # Simulate customer data export
-                unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
                 response_text = f"## Business Data Export\n\n"
                 response_text += f"**Data Type:** Customers\n"
                 response_text += f"**Period:** {start_date} to {end_date}\n"
@@ -1065,8 +904,7 @@ class ReportsManager:
                 response_text += f"**Records Exported:** {unique_customers}\n\n"
                 response_text += f"Your {format.upper()} file with customer data has been generated and is ready for download.\n"
             else:  # Default to all data
-                exported_records = len(orders)
-                unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
+                exported_records = order_count
                 response_text = f"## Business Data Export\n\n"
                 response_text += f"**Data Type:** All Business Data\n"
                 response_text += f"**Period:** {start_date} to {end_date}\n"
@@ -1087,7 +925,7 @@ class ReportsManager:
                         "end_date": end_date
                     },
                     "export_details": {
-                        "records_count": len(orders) if data_type == "orders" or data_type == "all" else unique_customers,
+                        "records_count": order_count if data_type == "orders" or data_type == "all" else unique_customers,
                         "status": "ready_for_download"
                     }
                 }
@@ -1209,19 +1047,12 @@ class ReportsManager:
             end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
             
             # Get orders for the period
-            start_datetime = datetime.combine(start_dt, datetime.min.time())
-            end_datetime = datetime.combine(end_dt, datetime.max.time())
-            
-            orders = self.db.query(Order).filter(
-                Order.business_id == business_id,
-                Order.created_at >= start_datetime,
-                Order.created_at <= end_datetime
-            ).all()
+            orders = await load_order_frame(self.db, business_id, start_dt, end_dt + timedelta(days=1))
             
             # Calculate metrics
-            total_revenue = sum(order.total_amount for order in orders)
+            total_revenue = orders.total()
             total_orders = len(orders)
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+            avg_order_value = orders.average()
             
             # Template-specific content
             if template_id == "daily_summary":
@@ -1236,16 +1067,10 @@ class ReportsManager:
                 content += f"**Average Order Value:** ${avg_order_value:.2f}\n"
                 
                 # Add trend analysis
-                daily_revenue = {}
-                for order in orders:
-                    day = order.created_at.date()
-                    if day not in daily_revenue:
-                        daily_revenue[day] = 0
-                    daily_revenue[day] += order.total_amount
-                
+                daily_revenue = orders.bucket("day")
                 if daily_revenue:
-                    best_day = max(daily_revenue, key=daily_revenue.get)
-                    content += f"**Best Day:** {best_day.strftime('%Y-%m-%d')} with ${daily_revenue[best_day]:.2f}\n"
+                    best_day = max(daily_revenue, key=lambda row: row["revenue"])
+                    content += f"**Best Day:** {best_day['period']} with ${best_day['revenue']:.2f}\n"
             elif template_id == "monthly_comprehensive":
                 template_name = "Monthly Comprehensive Report"
                 content = f"**Total Revenue:** ${total_revenue:.2f}\n"
@@ -1253,17 +1078,11 @@ class ReportsManager:
                 content += f"**Average Order Value:** ${avg_order_value:.2f}\n"
                 
                 # Customer metrics
-                unique_customers = len(set(order.customer_id for order in orders if order.customer_id))
+                unique_customers = orders.unique_customers()
                 content += f"**Unique Customers:** {unique_customers}\n"
                 
                 # Status breakdown
-                status_counts = {}
-                for order in orders:
-                    status = getattr(order.status, "value", str(order.status)) if order.status else "unknown"
-                    if status not in status_counts:
-                        status_counts[status] = 0
-                    status_counts[status] += 1
-                
+                status_counts = orders.count_by("status")
                 if status_counts:
                     content += "\n**Order Status Distribution:**\n"
                     for status, count in status_counts.items():
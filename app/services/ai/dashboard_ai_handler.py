@@ -4,7 +4,7 @@ Dashboard AI Handler - Business management service
 from __future__ import annotations
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from app.core.ai.base_handler import BaseAIHandler
 from app.core.ai.types import RichContext, ChatContext
@@ -36,9 +36,10 @@ class DashboardAIHandler(BaseAIHandler):
         session_id: str,
         business_id: int,
         user_id: Optional[str] = None,
-        additional_context: Optional[Dict[str, Any]] = None
+        additional_context: Optional[Dict[str, Any]] = None,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
-        """Process a dashboard chat message"""
+        """Process a dashboard chat message (``on_token`` receives the response as it streams)"""
         try:
             # Build rich context
             context = RichContext(
@@ -61,7 +62,14 @@ class DashboardAIHandler(BaseAIHandler):
             prompt = self.build_prompt(context)
             
             # Get AI response
-            response = await self.get_ai_response(prompt)
+            if on_token is None:
+                response = await self.get_ai_response(prompt)
+            else:
+                parts = []
+                async for token in self.stream_ai_response(prompt):
+                    parts.append(token)
+                    await on_token(token)
+                response = "".join(parts)
             
             # Check for dashboard actions
             intent = self.extract_json_from_response(response)
@@ -0,0 +1,210 @@
+# app/services/ai/embedding_cache.py
+"""
+Two-tier embedding cache.
+
+- Memory tier: per-process LRU bounded by entry count and total bytes, with TTL
+- Disk tier: ``diskcache`` directory shared by every gunicorn and Celery worker
+  on the host, so embeddings survive restarts
+
+Keys are ``<model id>:<sha256 of text>``, where the model id covers the model
+name, inference backend and quantization (``embedding_model_id``), so changing
+any of them never serves vectors from the previous configuration.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.ai.embedding_model import embedding_model_id
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU/TTL embedding cache with an optional shared disk tier.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: Optional[int] = None,
+        disk_directory: Optional[str] = None,
+        disk_size_limit: int = 1024 * 1024 * 1024,
+    ):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+        self._disk = None
+        if disk_directory:
+            try:
+                import diskcache
+                self._disk = diskcache.Cache(disk_directory, size_limit=disk_size_limit)
+            except Exception as e:
+                logger.warning(f"Embedding disk cache unavailable, using memory only: {e}")
+
+    def key(self, text: str) -> str:
+        """Cache key for ``text`` under the current model."""
+        return f"{self.model_id}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+    def _memory_get(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        embedding, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._drop(key)
+            self._counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return embedding
+
+    def _memory_set(self, key: str, embedding: np.ndarray) -> None:
+        if key in self._entries:
+            self._drop(key)
+        if embedding.nbytes > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (embedding, expires_at)
+        self._bytes += embedding.nbytes
+
+        # Evict least recently used entries until both limits hold
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._counters["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        embedding, _ = self._entries.pop(key)
+        self._bytes -= embedding.nbytes
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Cached embedding for ``text``, or None."""
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Cached embeddings for ``texts`` (None where missing).
+
+        Memory misses fall through to the disk tier and are promoted on hit.
+        """
+        keys = [self.key(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        disk_lookups: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for position, key in enumerate(keys):
+                embedding = self._memory_get(key)
+                if embedding is not None:
+                    results[position] = embedding
+                    self._counters["memory_hits"] += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(position)
+
+        if disk_lookups and self._disk is not None:
+            found = {}
+            for key in disk_lookups:
+                try:
+                    value = self._disk.get(key)
+                except Exception as e:
+                    logger.warning(f"Embedding disk cache read failed: {e}")
+                    break
+                if value is not None:
+                    found[key] = np.frombuffer(value, dtype=np.float32)
+
+            with self._lock:
+                for key, embedding in found.items():
+                    self._memory_set(key, embedding)
+                    for position in disk_lookups.pop(key):
+                        results[position] = embedding
+                        self._counters["disk_hits"] += 1
+
+        with self._lock:
+            self._counters["misses"] += sum(len(positions) for positions in disk_lookups.values())
+
+        return results
+
+    def set(self, text: str, embedding: np.ndarray) -> None:
+        """Store one embedding in both tiers."""
+        self.set_many([text], [embedding])
+
+    def set_many(self, texts: Sequence[str], embeddings: Sequence[np.ndarray]) -> None:
+        """Store embeddings in both tiers."""
+        items = [
+            (self.key(text), np.ascontiguousarray(embedding, dtype=np.float32))
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+        with self._lock:
+            for key, embedding in items:
+                self._memory_set(key, embedding)
+
+        if self._disk is not None:
+            try:
+                for key, embedding in items:
+                    self._disk.set(key, embedding.tobytes(), expire=self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Embedding disk cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Empty the memory tier (the shared disk tier is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current memory-tier size."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        if self._disk is not None:
+            try:
+                stats["disk_entries"] = len(self._disk)
+            except Exception:
+                pass
+        return stats
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_id: Optional[str] = None) -> EmbeddingCache:
+    """Process-wide embedding cache for ``model_id`` (defaults to the configured model, see ``embedding_model_id``)."""
+    model_id = model_id or embedding_model_id()
+    cache = _caches.get(model_id)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(model_id)
+            if cache is None:
+                cache = EmbeddingCache(
+                    model_id,
+                    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                    max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+                    ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS,
+                    disk_directory=settings.EMBEDDING_CACHE_DIR,
+                    disk_size_limit=settings.EMBEDDING_CACHE_DISK_SIZE_LIMIT,
+                )
+                _caches[model_id] = cache
+    return cache
@@ -0,0 +1,165 @@
+# app/services/ai/embedding_model.py
+"""
+Process-wide embedding model registry.
+
+Loading a SentenceTransformer costs seconds of CPU and hundreds of MB, so every
+RAGSearch (and background task) in a process shares one lazily loaded model.
+The model, device, thread count and inference backend come from settings:
+
+- ``EMBEDDING_BACKEND="torch"``: regular SentenceTransformer, optionally with
+  dynamic int8 quantization of its Linear layers (``EMBEDDING_QUANTIZE``)
+- ``EMBEDDING_BACKEND="onnx"``: ONNX Runtime export through ``optimum``; falls
+  back to torch when ``optimum[onnxruntime]`` is not installed
+"""
+from typing import List, Optional, Union
+import importlib.util
+import logging
+import threading
+import time
+
+import numpy as np
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtime encoder exposing the subset of ``SentenceTransformer.encode``
+    used by RAG search (mean pooling, optional normalisation).
+    """
+
+    def __init__(self, model_name: str, num_threads: Optional[int] = None):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        session_options = onnxruntime.SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+
+        self.tokenizer = AutoTokenizer.from_pretrained(repo_id)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            repo_id, export=True, session_options=session_options
+        )
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.model.config.hidden_size)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True, return_tensors="np"
+            )
+            token_embeddings = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled.astype(np.float32))
+
+        embeddings = np.concatenate(batches) if batches else np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings[0] if single else embeddings
+
+
+def _load_torch_model(model_name: str):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if settings.EMBEDDING_NUM_THREADS:
+        torch.set_num_threads(settings.EMBEDDING_NUM_THREADS)
+
+    model = SentenceTransformer(model_name, device=settings.EMBEDDING_DEVICE)
+
+    if settings.EMBEDDING_QUANTIZE:
+        if settings.EMBEDDING_DEVICE != "cpu":
+            logger.warning("EMBEDDING_QUANTIZE only applies to CPU inference; skipping quantization")
+        else:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return model
+
+
+def _onnx_available() -> bool:
+    return all(importlib.util.find_spec(name) is not None for name in ("onnxruntime", "optimum"))
+
+
+def _quantized(backend: str) -> bool:
+    return backend == "torch" and settings.EMBEDDING_QUANTIZE and settings.EMBEDDING_DEVICE == "cpu"
+
+
+def embedding_model_id() -> str:
+    """
+    Identify the vectors the configured model produces: model name, backend
+    actually used and quantization (e.g. ``"all-MiniLM-L6-v2:torch:int8"``).
+
+    Known without loading the model, so cached embeddings can be looked up
+    under it first.
+    """
+    backend = settings.EMBEDDING_BACKEND.lower()
+    if backend == "onnx" and not _onnx_available():
+        backend = "torch"
+    suffix = ":int8" if _quantized(backend) else ""
+    return f"{settings.EMBEDDING_MODEL_NAME}:{backend}{suffix}"
+
+
+def _load_model():
+    model_name = settings.EMBEDDING_MODEL_NAME
+    backend = settings.EMBEDDING_BACKEND.lower()
+    started = time.perf_counter()
+
+    model = None
+    if backend == "onnx":
+        try:
+            model = OnnxSentenceEncoder(model_name, settings.EMBEDDING_NUM_THREADS)
+        except ImportError as e:
+            logger.warning(f"ONNX embedding backend unavailable ({e}); falling back to torch")
+            backend = "torch"
+
+    if model is None:
+        model = _load_torch_model(model_name)
+
+    logger.info(
+        f"Loaded embedding model '{model_name}' ({backend}, {settings.EMBEDDING_DEVICE}) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return model
+
+
+def get_embedding_model():
+    """
+    Get the process-wide embedding model, loading it on first use.
+
+    Thread-safe: concurrent first callers wait for a single load.
+    """
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+
+    return _model
+
+
+def preload_embedding_model() -> None:
+    """Load the embedding model eagerly (e.g. from the startup event)."""
+    get_embedding_model()
@@ -3,15 +3,17 @@
 RAG Search Module for Central AI
 Implements database search capabilities using Retrieval-Augmented Generation
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from supabase import create_client, Client
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import hashlib
 import json
 
+from app.config.database import get_db_executor
+from app.config.settings import settings
 from app.models import Business, MenuItem, Message, Order
+from app.services.ai.embedding_cache import get_embedding_cache
+from app.services.ai.embedding_model import get_embedding_model
+from app.services.ai.vector_index import VectorIndex, get_vector_index, normalize_rows, top_k_indices
 
 
 # Category context for intelligent understanding
@@ -129,13 +131,77 @@ class RAGSearch:
     Enhanced with embedding-based semantic search for better results.
     """
     
+    # Max ids per ``in_`` filter, keeps PostgREST request URLs short
+    IN_QUERY_CHUNK_SIZE = 200
+    # Rows per request; PostgREST caps responses (1000 by default)
+    SELECT_PAGE_SIZE = 1000
+    
     def __init__(self, db: Client):
         self.db = db
-        # Initialize embedding model for semantic search
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        # Cache for embeddings to improve performance
-        self.embedding_cache = {}
-        self.max_cache_size = 1000
+        # Identity map of business rows loaded during this request
+        self._businesses_by_id: Dict[str, Dict[str, Any]] = {}
+        # Bounded two-tier embedding cache shared across instances and workers
+        self.embedding_cache = get_embedding_cache()
+        # Persistent catalogue embeddings, shared by every RAGSearch in the process
+        self.business_index = get_vector_index("businesses")
+        self.menu_item_index = get_vector_index("menu_items")
+    
+    def _select_in(self, table: str, column: str, values, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Bulk select rows of ``table`` whose ``column`` is in ``values``.
+        
+        Args:
+            table: Table name
+            column: Column matched against ``values``
+            values: Values to match (duplicates are ignored)
+            filters: Extra equality filters applied to every chunk
+            
+        Returns:
+            All matching rows
+        """
+        values = list(dict.fromkeys(value for value in values if value is not None))
+        rows = []
+        for start in range(0, len(values), self.IN_QUERY_CHUNK_SIZE):
+            # A chunk can match more rows than one response holds (e.g. menu items
+            # of 200 businesses), so read it page by page until a short page
+            offset = 0
+            while True:
+                db_query = self.db.table(table).select('*').in_(column, values[start:start + self.IN_QUERY_CHUNK_SIZE])
+                for key, value in (filters or {}).items():
+                    db_query = db_query.eq(key, value)
+                response = db_query.order('id').range(offset, offset + self.SELECT_PAGE_SIZE - 1).execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < self.SELECT_PAGE_SIZE:
+                    break
+                offset += self.SELECT_PAGE_SIZE
+        return rows
+    
+    def _remember_businesses(self, businesses: List[Dict[str, Any]]) -> None:
+        """Record fully loaded business rows in the identity map."""
+        for business in businesses:
+            self._businesses_by_id[str(business['id'])] = business
+    
+    def _get_businesses(self, business_ids) -> Dict[str, Dict[str, Any]]:
+        """
+        Load businesses by id, querying only those not seen yet in this request.
+        
+        Returns:
+            Mapping of stringified business id to business row
+        """
+        wanted = [str(business_id) for business_id in business_ids if business_id is not None]
+        missing = [business_id for business_id in wanted if business_id not in self._businesses_by_id]
+        if missing:
+            self._remember_businesses(self._select_in('businesses', 'id', missing))
+        return {
+            business_id: self._businesses_by_id[business_id]
+            for business_id in wanted if business_id in self._businesses_by_id
+        }
+    
+    @property
+    def embedding_model(self):
+        """Process-wide embedding model, loaded on first use."""
+        return get_embedding_model()
     
     def _get_embedding(self, text: str) -> np.ndarray:
         """
@@ -147,22 +213,45 @@ class RAGSearch:
         Returns:
             Numpy array of embedding vector
         """
-        # Create cache key
-        cache_key = hashlib.md5(text.encode()).hexdigest()
-        
         # Check cache first
-        if cache_key in self.embedding_cache:
-            return self.embedding_cache[cache_key]
+        embedding = self.embedding_cache.get(text)
+        if embedding is not None:
+            return embedding
         
-        # Generate new embedding
+        # Generate and cache new embedding
         embedding = self.embedding_model.encode(text, convert_to_numpy=True)
-        
-        # Cache the embedding (with size limit)
-        if len(self.embedding_cache) < self.max_cache_size:
-            self.embedding_cache[cache_key] = embedding
+        self.embedding_cache.set(text, embedding)
         
         return embedding
     
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed many texts with one batched model call, reusing cached vectors.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Contiguous float32 matrix of L2-normalised embeddings, one row per text
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        cached = self.embedding_cache.get_many(texts)
+        
+        # Encode only the distinct texts that are not cached yet
+        pending = list(dict.fromkeys(text for text, embedding in zip(texts, cached) if embedding is None))
+        fresh = {}
+        if pending:
+            encoded = self._encode_texts(pending)
+            self.embedding_cache.set_many(pending, encoded)
+            fresh = dict(zip(pending, encoded))
+        
+        return normalize_rows(np.stack([
+            embedding if embedding is not None else fresh[text]
+            for text, embedding in zip(texts, cached)
+        ]))
+    
     def _calculate_similarity(self, query_embedding: np.ndarray, text_embedding: np.ndarray) -> float:
         """
         Calculate cosine similarity between two embeddings.
@@ -174,8 +263,9 @@ class RAGSearch:
         Returns:
             Cosine similarity score (0-1)
         """
-        similarity = cosine_similarity([query_embedding], [text_embedding])[0][0]
-        return float(similarity)
+        query_vector = normalize_rows(query_embedding)[0]
+        text_vector = normalize_rows(text_embedding)[0]
+        return float(query_vector @ text_vector)
     
     def _semantic_search(self, query: str, items: List[Dict], text_fields: List[str], top_k: int = 10) -> List[Dict]:
         """
@@ -193,32 +283,142 @@ class RAGSearch:
         if not query or not items:
             return items[:top_k] if items else []
         
-        # Generate query embedding
-        query_embedding = self._get_embedding(query)
-        
-        # Calculate similarities for each item
-        scored_items = []
+        # Combine text from specified fields, skipping items without any text
+        candidates = []
+        texts = []
         for item in items:
-            # Combine text from specified fields
             combined_text = " ".join([
                 str(item.get(field, "")) for field in text_fields
                 if item.get(field)
             ])
-            
             if combined_text.strip():
-                # Generate embedding for item
-                item_embedding = self._get_embedding(combined_text)
-                # Calculate similarity
-                similarity = self._calculate_similarity(query_embedding, item_embedding)
-                
-                scored_items.append({
-                    **item,
-                    "_semantic_score": similarity
-                })
-        
-        # Sort by semantic similarity and return top-k
-        scored_items.sort(key=lambda x: x["_semantic_score"], reverse=True)
-        return scored_items[:top_k]
+                candidates.append(item)
+                texts.append(combined_text)
+        
+        if not candidates:
+            return []
+        
+        # Score every item with one matrix-vector product
+        query_embedding = normalize_rows(self._get_embedding(query))[0]
+        scores = self._get_embeddings(texts) @ query_embedding
+        
+        # Return top-k by semantic similarity
+        return [
+            {**candidates[i], "_semantic_score": float(scores[i])}
+            for i in top_k_indices(scores, top_k)
+        ]
+    
+    def _business_index_text(self, business: Dict[str, Any]) -> str:
+        """Query-independent business text stored in the vector index."""
+        return self._create_business_representation(business, {})
+    
+    @staticmethod
+    def _menu_item_index_text(item: Dict[str, Any]) -> str:
+        """Menu item text stored in the vector index."""
+        return " ".join(str(item[field]) for field in ("name", "description") if item.get(field))
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts with a single batched model call."""
+        return self.embedding_model.encode(texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False)
+    
+    def _queue_unindexed(self, index: VectorIndex, rows: List[Dict[str, Any]]) -> None:
+        """
+        Queue background indexing for rows that have no vector yet.
+        
+        The broker round trip runs on the I/O thread pool and is not waited
+        for, so searches never block on it.
+        """
+        missing = index.missing(row['id'] for row in rows)
+        if not missing:
+            return
+        
+        from app.tasks.embedding_tasks import schedule_business_reindex, schedule_menu_item_reindex
+        schedule = schedule_business_reindex if index is self.business_index else schedule_menu_item_reindex
+        get_db_executor().submit(schedule, missing, dedupe=True)
+    
+    def _score_rows(self, index: VectorIndex, rows: List[Dict[str, Any]], text_fn, query_embedding: np.ndarray) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """
+        Cosine similarity of ``query_embedding`` against ``rows``.
+        
+        Indexed rows are scored from ``index``. Rows the embeddings worker has
+        not indexed yet are queued for indexing and skipped, unless
+        ``VECTOR_INDEX_INLINE_LIMIT`` opts in to embedding up to that many of
+        them here (through the embedding cache).
+        
+        Returns:
+            Tuple of (scored rows, scores) in matching order
+        """
+        indexed_ids, scores = index.scores(query_embedding, [row['id'] for row in rows])
+        rows_by_id = {str(row['id']): row for row in rows}
+        scored = [rows_by_id[row_id] for row_id in indexed_ids]
+        
+        indexed = set(indexed_ids)
+        missing = [row for row in rows if str(row['id']) not in indexed]
+        if missing:
+            self._queue_unindexed(index, missing)
+            inline = missing[:settings.VECTOR_INDEX_INLINE_LIMIT]
+            if inline:
+                inline_scores = self._get_embeddings([text_fn(row) for row in inline]) @ normalize_rows(query_embedding)[0]
+                scored.extend(inline)
+                scores = np.concatenate([scores.astype(np.float32), inline_scores])
+        
+        return scored, scores
+    
+    def _refresh_index_rows(self, index: VectorIndex, table: str, active_column: str, ids: List, text_fn) -> int:
+        """
+        Re-embed the given rows of ``table`` and upsert them into ``index``.
+        Rows that were deleted or are no longer active are removed instead.
+        
+        Returns:
+            Number of rows upserted
+        """
+        if not ids:
+            return 0
+        
+        response = self.db.table(table).select('*').in_('id', list(ids)).execute()
+        rows = [row for row in (response.data or []) if row.get(active_column, True)]
+        
+        index.remove({str(item_id) for item_id in ids} - {str(row['id']) for row in rows})
+        if rows:
+            index.upsert([row['id'] for row in rows], self._encode_texts([text_fn(row) for row in rows]))
+        
+        return len(rows)
+    
+    def refresh_business_embeddings(self, business_ids: List) -> int:
+        """Re-embed changed businesses into the business index."""
+        return self._refresh_index_rows(
+            self.business_index, 'businesses', 'is_active', business_ids, self._business_index_text
+        )
+    
+    def refresh_menu_item_embeddings(self, menu_item_ids: List) -> int:
+        """Re-embed changed menu items into the menu item index."""
+        return self._refresh_index_rows(
+            self.menu_item_index, 'menu_items', 'is_available', menu_item_ids, self._menu_item_index_text
+        )
+    
+    def build_vector_index(self) -> Dict[str, int]:
+        """
+        (Re)build the business and menu item vector indexes from the database.
+        
+        Returns:
+            Number of rows written to each index
+        """
+        businesses_response = self.db.table('businesses').select('*').eq('is_active', True).execute()
+        businesses = businesses_response.data if businesses_response.data else []
+        
+        menu_response = self.db.table('menu_items').select('id, name, description').eq('is_available', True).execute()
+        menu_items = menu_response.data if menu_response.data else []
+        
+        counts = {}
+        for index, rows, text_fn in (
+            (self.business_index, businesses, self._business_index_text),
+            (self.menu_item_index, menu_items, self._menu_item_index_text),
+        ):
+            vectors = self._encode_texts([text_fn(row) for row in rows]) if rows else np.empty((0, 0))
+            index.build([row['id'] for row in rows], vectors)
+            counts[index.name] = len(rows)
+        
+        return counts
     
     def _analyze_query_with_llm(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -487,6 +687,7 @@ class RAGSearch:
             
             if not all_businesses:
                 return []
+            self._remember_businesses(all_businesses)
             
             # Create enhanced query with context
             enhanced_query = self._enhance_query_with_context(query, intent_analysis)
@@ -494,44 +695,29 @@ class RAGSearch:
             # Generate query embedding
             query_embedding = self._get_embedding(enhanced_query)
             
-            # Calculate semantic similarity for each business
-            scored_businesses = []
+            # Score every business with one matrix-vector product over the index
+            candidates, semantic_scores = self._score_rows(
+                self.business_index, all_businesses, self._business_index_text, query_embedding
+            )
+            if not candidates:
+                return []
             
-            for business in all_businesses:
-                # Create rich business representation
-                business_text = self._create_business_representation(business, intent_analysis)
-                
-                # Handle None values safely
-                if business_text is None:
-                    business_text = f"Business: {business.get('name', 'Unknown')}"
-                    
-                business_embedding = self._get_embedding(business_text)
-                
-                # Calculate semantic similarity
-                semantic_score = self._calculate_similarity(query_embedding, business_embedding)
-                
-                # Calculate contextual relevance score
-                context_score = self._calculate_context_relevance(business, intent_analysis)
-                
-                # Combined relevance score
-                combined_score = (semantic_score * 0.7) + (context_score * 0.3)
-                
-                if combined_score > 0.3:  # Minimum relevance threshold
-                    scored_businesses.append({
-                        "business": business,
-                        "semantic_score": semantic_score,
-                        "context_score": context_score,
-                        "combined_score": combined_score,
-                        "match_reasons": self._get_match_reasons(business, intent_analysis)
-                    })
-            
-            # Sort by combined relevance score
-            scored_businesses.sort(key=lambda x: x["combined_score"], reverse=True)
+            # Calculate contextual relevance score
+            context_scores = np.fromiter(
+                (self._calculate_context_relevance(business, intent_analysis) for business in candidates),
+                dtype=np.float32,
+                count=len(candidates)
+            )
+            
+            # Combined relevance score with minimum relevance threshold
+            combined_scores = (semantic_scores * 0.7) + (context_scores * 0.3)
+            relevant = np.flatnonzero(combined_scores > 0.3)
+            ranked = relevant[top_k_indices(combined_scores[relevant], top_k)]
             
             # Format and return top results
             results = []
-            for item in scored_businesses[:top_k]:
-                business = item["business"]
+            for row in ranked:
+                business = candidates[row]
                 formatted_business = {
                     "id": business['id'],
                     "name": business['name'],
@@ -540,8 +726,8 @@ class RAGSearch:
                     "location": business.get('location', 'local area'),
                     "rating": business.get('rating', 0),
                     "phone": business.get('phone', ''),
-                    "relevance_score": item["combined_score"],
-                    "match_reasons": item["match_reasons"],
+                    "relevance_score": float(combined_scores[row]),
+                    "match_reasons": self._get_match_reasons(business, intent_analysis),
                     "sample_menu": []
                 }
                 results.append(formatted_business)
@@ -908,10 +1094,6 @@ class RAGSearch:
         else:
             return business.get('location', 'Local area')
     
-    def _original_search_businesses(self, query: str, filters: Optional[Dict[str, Any]] = None, top_k: int = 10, use_semantic: bool = True) -> List[Dict[str, Any]]:
-        # TO DO: Implement original search method
-        pass
-    
     def search_businesses(self, query: str, filters: Optional[Dict[str, Any]] = None, top_k: int = 10, use_semantic: bool = True) -> List[Dict[str, Any]]:
         """
         Modern semantic search with vector embeddings and LLM understanding.
@@ -973,12 +1155,13 @@ class RAGSearch:
             if not menu_items:
                 return []
             
+            # Load every referenced business with one bulk query
+            businesses = self._get_businesses(item['business_id'] for item in menu_items)
+            
             # Format menu items with business info
             formatted_items = []
             for item in menu_items:
-                # Get business info for context
-                business_response = self.db.table('businesses').select('*').eq('id', item['business_id']).execute()
-                business = business_response.data[0] if business_response.data else None
+                business = businesses.get(str(item['business_id']))
                 
                 formatted_item = {
                     "id": item['id'],
@@ -994,28 +1177,27 @@ class RAGSearch:
             
             # Apply semantic search if enabled and query provided
             if use_semantic and query:
-                text_fields = ['name', 'description']
-                semantic_results = self._semantic_search(query, formatted_items, text_fields, top_k)
-                
-                # Remove semantic scores from final results
-                for result in semantic_results:
-                    if "_semantic_score" in result:
-                        del result["_semantic_score"]
-                
-                return semantic_results
+                # Rank against the persistent menu item index
+                scored, scores = self._score_rows(
+                    self.menu_item_index, menu_items, self._menu_item_index_text, self._get_embedding(query)
+                )
+                if scored:
+                    items_by_id = {str(item['id']): item for item in formatted_items}
+                    return [items_by_id[str(scored[i]['id'])] for i in top_k_indices(scores, top_k)]
+                # Nothing indexed yet: fall through to keyword matching
+            
+            # Fallback to keyword search or return all items
+            if query:
+                # Simple keyword filtering as fallback
+                query_lower = query.lower()
+                filtered_results = [
+                    item for item in formatted_items
+                    if (query_lower in item['name'].lower() or 
+                        (item['description'] and query_lower in item['description'].lower()))
+                ]
+                return filtered_results[:top_k]
             else:
-                # Fallback to keyword search or return all items
-                if query:
-                    # Simple keyword filtering as fallback
-                    query_lower = query.lower()
-                    filtered_results = [
-                        item for item in formatted_items
-                        if (query_lower in item['name'].lower() or 
-                            (item['description'] and query_lower in item['description'].lower()))
-                    ]
-                    return filtered_results[:top_k]
-                else:
-                    return formatted_items[:top_k]
+                return formatted_items[:top_k]
             
         except Exception as e:
             print(f"Error in search_menu_items: {str(e)}")
@@ -1052,12 +1234,19 @@ class RAGSearch:
             
             if not businesses:
                 return []
+            self._remember_businesses(businesses)
+            
+            # Load available menu items for all businesses at once and group them
+            menu_items_by_business: Dict[str, List[Dict[str, Any]]] = {}
+            for item in self._select_in(
+                'menu_items', 'business_id', [business['id'] for business in businesses], {'is_available': True}
+            ):
+                menu_items_by_business.setdefault(str(item['business_id']), []).append(item)
             
             # Format businesses
             formatted_businesses = []
             for business in businesses:
-                menu_response = self.db.table('menu_items').select('*').eq('business_id', business['id']).eq('is_available', True).execute()
-                menu_items = menu_response.data if menu_response.data else []
+                menu_items = menu_items_by_business.get(str(business['id']), [])
                 
                 formatted_business = {
                     "id": business['id'],
@@ -1075,20 +1264,23 @@ class RAGSearch:
                 }
                 formatted_businesses.append(formatted_business)
             
-            # Calculate semantic scores
-            query_embedding = self._get_embedding(query)
-            semantic_scores = {}
-            
-            for business in formatted_businesses:
-                combined_text = f"{business['name']} {business['description']} {business['category']}"
-                business_embedding = self._get_embedding(combined_text)
-                semantic_scores[business['id']] = self._calculate_similarity(query_embedding, business_embedding)
+            # Calculate semantic scores with one matrix-vector product over the index
+            # (inactive businesses are not indexed and score 0)
+            scored, indexed_scores = self._score_rows(
+                self.business_index,
+                [business for business in businesses if business.get('is_active', True)],
+                self._business_index_text,
+                self._get_embedding(query),
+            )
+            positions = {str(business['id']): i for i, business in enumerate(formatted_businesses)}
+            semantic_scores = np.zeros(len(formatted_businesses), dtype=np.float32)
+            semantic_scores[[positions[str(business['id'])] for business in scored]] = indexed_scores
             
             # Calculate keyword scores
             query_lower = query.lower()
-            keyword_scores = {}
+            keyword_scores = np.zeros(len(formatted_businesses), dtype=np.float32)
             
-            for business in formatted_businesses:
+            for position, business in enumerate(formatted_businesses):
                 score = 0
                 name_lower = business['name'].lower()
                 desc_lower = business['description'].lower()
@@ -1111,39 +1303,16 @@ class RAGSearch:
                     if word in cat_lower:
                         score += 0.5
                 
-                keyword_scores[business['id']] = score
+                keyword_scores[position] = score
             
             # Normalize keyword scores (0-1 range)
-            if keyword_scores:
-                max_keyword = max(keyword_scores.values())
-                if max_keyword > 0:
-                    keyword_scores = {k: v/max_keyword for k, v in keyword_scores.items()}
-            
-            # Combine scores
-            combined_results = []
-            for business in formatted_businesses:
-                business_id = business['id']
-                semantic_score = semantic_scores.get(business_id, 0)
-                keyword_score = keyword_scores.get(business_id, 0)
-                
-                combined_score = (semantic_weight * semantic_score) + (keyword_weight * keyword_score)
-                
-                business_copy = business.copy()
-                business_copy["_combined_score"] = combined_score
-                business_copy["_semantic_score"] = semantic_score
-                business_copy["_keyword_score"] = keyword_score
-                combined_results.append(business_copy)
+            max_keyword = keyword_scores.max()
+            if max_keyword > 0:
+                keyword_scores /= max_keyword
             
-            # Sort by combined score and return top-k
-            combined_results.sort(key=lambda x: x["_combined_score"], reverse=True)
-            
-            # Remove internal scores from final results
-            for result in combined_results[:top_k]:
-                for key in ["_combined_score", "_semantic_score", "_keyword_score"]:
-                    if key in result:
-                        del result[key]
-            
-            return combined_results[:top_k]
+            # Combine scores and return top-k
+            combined_scores = (semantic_weight * semantic_scores) + (keyword_weight * keyword_scores)
+            return [formatted_businesses[i] for i in top_k_indices(combined_scores, top_k)]
             
         except Exception as e:
             print(f"Error in hybrid_search_businesses: {str(e)}")
@@ -1160,13 +1329,11 @@ class RAGSearch:
             Dictionary with business context or None if not found
         """
         try:
-            business_response = self.db.table('businesses').select('*').eq('id', business_id).execute()
+            business = self._get_businesses([business_id]).get(str(business_id))
             
-            if not business_response.data:
+            if not business:
                 return None
             
-            business = business_response.data[0]
-            
             # Get menu items
             menu_response = self.db.table('menu_items').select('*').eq('business_id', business_id).eq('is_available', True).execute()
             menu_items = menu_response.data if menu_response.data else []
@@ -1436,12 +1603,9 @@ class RAGSearch:
             
             # Test embedding similarity
             test_texts = ["Italian restaurant", "pizza place", "hair salon", "coffee shop"]
-            query_emb = self._get_embedding("food place")
-            similarities = []
-            for text in test_texts:
-                text_emb = self._get_embedding(text)
-                sim = self._calculate_similarity(query_emb, text_emb)
-                similarities.append((text, sim))
+            query_emb = normalize_rows(self._get_embedding("food place"))[0]
+            text_scores = self._get_embeddings(test_texts) @ query_emb
+            similarities = [(text, float(sim)) for text, sim in zip(test_texts, text_scores)]
             
             print("Embedding similarities for 'food place':")
             for text, sim in sorted(similarities, key=lambda x: x[1], reverse=True):
@@ -0,0 +1,260 @@
+# app/services/ai/vector_index.py
+"""
+Persistent vector index for catalogue embeddings.
+
+Each index is a pair of files in ``settings.VECTOR_INDEX_DIR``:
+
+- ``<name>.npy``: a contiguous float32 matrix of L2-normalised embeddings
+- ``<name>.ids.json``: the row -> id map for that matrix
+
+The matrix is memory-mapped for reads, so every worker process shares the same
+page cache, and a query costs one matrix-vector product plus a top-k scan.
+Writers replace both files atomically; readers pick up the new version on
+their next query by checking the id map's modification time.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Return a contiguous float32 copy of ``vectors`` with unit-length rows.
+
+    Args:
+        vectors: 1-D vector or 2-D matrix of embeddings
+
+    Returns:
+        2-D float32 matrix whose rows have L2 norm 1 (zero rows stay zero)
+    """
+    matrix = np.array(np.atleast_2d(vectors), dtype=np.float32, order="C")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the ``top_k`` highest scores, best first.
+
+    Uses ``argpartition`` so only the selected slice is sorted.
+    """
+    count = scores.shape[0]
+    if top_k <= 0 or count == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k >= count:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex:
+    """
+    Memory-mapped, file-backed matrix of normalised embeddings keyed by id.
+
+    Ids are stored as strings so integer and UUID primary keys behave the same.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        self.name = name
+        self.directory = Path(directory or settings.VECTOR_INDEX_DIR)
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._version: Optional[int] = None
+
+    @property
+    def matrix_path(self) -> Path:
+        return self.directory / f"{self.name}.npy"
+
+    @property
+    def ids_path(self) -> Path:
+        return self.directory / f"{self.name}.ids.json"
+
+    def exists(self) -> bool:
+        """Whether a built index is present on disk."""
+        return self.matrix_path.exists() and self.ids_path.exists()
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._ids)
+
+    def __contains__(self, item_id) -> bool:
+        self._refresh()
+        return str(item_id) in self._positions
+
+    def _refresh(self) -> None:
+        """(Re)load the on-disk index if another writer replaced it."""
+        try:
+            version = os.stat(self.ids_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+            try:
+                with open(self.ids_path, "r", encoding="utf-8") as f:
+                    ids = [str(item_id) for item_id in json.load(f)["ids"]]
+                matrix = np.load(self.matrix_path, mmap_mode="r")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not load vector index '{self.name}': {e}")
+                return
+
+            if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+                # A writer is between the two renames; keep the previous version
+                return
+
+            self._matrix = matrix
+            self._ids = ids
+            self._positions = {item_id: row for row, item_id in enumerate(ids)}
+            self._version = version
+
+    def _write(self, ids: List[str], matrix: np.ndarray) -> None:
+        """Atomically replace the on-disk files with ``ids``/``matrix``."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_matrix = tempfile.mkstemp(dir=self.directory, suffix=".npy.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        fd, tmp_ids = tempfile.mkstemp(dir=self.directory, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0}, f)
+
+        # Matrix first, id map last: readers key their reload on the id map
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_ids, self.ids_path)
+
+    def _current(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        self._refresh()
+        return self._ids, self._matrix
+
+    def build(self, ids: Sequence, vectors: np.ndarray) -> None:
+        """
+        Replace the whole index.
+
+        Args:
+            ids: Row ids, one per vector
+            vectors: Embedding matrix (normalised here)
+        """
+        ids = [str(item_id) for item_id in ids]
+        matrix = normalize_rows(vectors) if len(ids) else np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self._write(ids, matrix)
+            self._version = None
+        self._refresh()
+        logger.info(f"Built vector index '{self.name}' with {len(ids)} rows")
+
+    def upsert(self, ids: Sequence, vectors: np.ndarray) -> None:
+        """Insert or replace the given rows, keeping the rest of the index."""
+        if not len(ids):
+            return
+        new_ids = [str(item_id) for item_id in ids]
+        new_matrix = normalize_rows(vectors)
+
+        with self._lock:
+            current_ids, current = self._current()
+            if current is None or current.shape[0] == 0:
+                self._write(new_ids, new_matrix)
+            else:
+                matrix = np.array(current, dtype=np.float32)
+                positions = dict(self._positions)
+                merged_ids = list(current_ids)
+                appended = []
+                for item_id, vector in zip(new_ids, new_matrix):
+                    row = positions.get(item_id)
+                    if row is None:
+                        positions[item_id] = len(merged_ids)
+                        merged_ids.append(item_id)
+                        appended.append(vector)
+                    else:
+                        matrix[row] = vector
+                if appended:
+                    matrix = np.vstack([matrix, np.stack(appended)])
+                self._write(merged_ids, matrix)
+            self._version = None
+        self._refresh()
+
+    def remove(self, ids: Iterable) -> None:
+        """Drop the given rows from the index (unknown ids are ignored)."""
+        drop = {str(item_id) for item_id in ids}
+        with self._lock:
+            current_ids, current = self._current()
+            if current is None or not drop.intersection(self._positions):
+                return
+            keep = [row for row, item_id in enumerate(current_ids) if item_id not in drop]
+            self._write([current_ids[row] for row in keep], np.array(current[keep], dtype=np.float32))
+            self._version = None
+        self._refresh()
+
+    def missing(self, ids: Iterable) -> List[str]:
+        """Ids from ``ids`` that have no row in the index."""
+        self._refresh()
+        return [str(item_id) for item_id in ids if str(item_id) not in self._positions]
+
+    def scores(self, query_vector: np.ndarray, ids: Optional[Sequence] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Cosine similarity of ``query_vector`` against indexed rows.
+
+        Args:
+            query_vector: Query embedding (normalised here)
+            ids: Restrict scoring to these ids; ids absent from the index are skipped
+
+        Returns:
+            Tuple of (ids, scores) in matching order
+        """
+        current_ids, matrix = self._current()
+        if matrix is None or matrix.shape[0] == 0:
+            return [], np.empty(0, dtype=np.float32)
+
+        query = normalize_rows(query_vector)[0]
+        if ids is None:
+            return list(current_ids), matrix @ query
+
+        positions = self._positions
+        found = [str(item_id) for item_id in ids if str(item_id) in positions]
+        if not found:
+            return [], np.empty(0, dtype=np.float32)
+        rows = np.fromiter((positions[item_id] for item_id in found), dtype=np.int64, count=len(found))
+        return found, matrix[rows] @ query
+
+    def search(self, query_vector: np.ndarray, top_k: int = 10, ids: Optional[Sequence] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k nearest rows to ``query_vector`` by cosine similarity.
+
+        Returns:
+            List of (id, score) tuples, best first
+        """
+        found, scores = self.scores(query_vector, ids)
+        return [(found[i], float(scores[i])) for i in top_k_indices(scores, top_k)]
+
+
+_indexes: Dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(name: str) -> VectorIndex:
+    """Process-wide VectorIndex for ``name``, so every caller shares one mmap."""
+    index = _indexes.get(name)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(name)
+            if index is None:
+                index = VectorIndex(name)
+                _indexes[name] = index
+    return index
@@ -0,0 +1,327 @@
+"""
+Shared cache of dashboard analytics results.
+
+The dashboard requests ``/analytics/orders``, ``/messages``, ``/combined``,
+``/{business_id}/analytics/overview``, ``/realtime`` and ``/performance`` in
+parallel, and each of them used to query the same window again. Results are
+now cached under (business id, table, window, filters):
+
+- per worker, for ``ANALYTICS_CACHE_TTL_SECONDS``; concurrent requests for a
+  key that is being computed wait for that computation instead of starting
+  their own (single flight)
+- across workers in Redis when enabled: the first worker to miss takes a
+  short lock and computes, the others wait for its result
+
+Order writes invalidate the ``orders`` entries of their business.
+``record_order_change`` bumps the business's generation in Redis, which is
+part of every shared key, so older entries are never read again. The bump
+runs in the background, so order writes never wait on Redis. The change is
+then broadcast, and each worker drops its local entries when it arrives.
+Other tables (messages) are only refreshed by the TTL.
+
+Redis calls are short-timeout and guarded by a breaker: after
+``failure_threshold`` consecutive failures the shared tier is skipped for
+``retry_after`` seconds and results are computed and cached per worker.
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import hashlib
+import logging
+import time
+
+import orjson
+import redis.asyncio as redis
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# (business id, table, window, serialized filters)
+CacheKey = Tuple[str, str, str, str]
+
+# Seconds between checks while another worker computes a result
+_POLL_INTERVAL = 0.05
+
+
+class AnalyticsCache:
+    """TTL cache with single-flight loading, backed by Redis across workers."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 15.0,
+        max_entries: int = 1000,
+        redis_url: Optional[str] = None,
+        key_prefix: str = "analytics",
+        lock_seconds: float = 10.0,
+        redis_timeout: float = 0.25,
+        failure_threshold: int = 3,
+        retry_after: float = 30.0,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.lock_seconds = lock_seconds
+        self.redis_timeout = redis_timeout
+        self.failure_threshold = failure_threshold
+        self.retry_after = retry_after
+
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        # Bumped when a (business, table) is invalidated; results computed
+        # under an older generation are returned but not stored
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._redis: Optional[redis.Redis] = None
+        # Consecutive Redis failures, and until when (monotonic) Redis is skipped
+        self._failures = 0
+        self._skip_until = 0.0
+        # Generation bumps still running (kept referenced until done)
+        self._background: Set[asyncio.Task] = set()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "shared_hits": 0,
+            "loads": 0,
+            "invalidations": 0,
+            "redis_errors": 0,
+            "redis_skipped": 0,
+        }
+
+    @staticmethod
+    def make_key(business_id, table: str, window: str, filters: Optional[Dict[str, Any]] = None) -> CacheKey:
+        encoded = orjson.dumps(filters or {}, option=orjson.OPT_SORT_KEYS).decode()
+        return (str(business_id), table, window, encoded)
+
+    def _client(self) -> Optional[redis.Redis]:
+        """Redis client, or None when disabled or while the breaker is open."""
+        if not self.redis_url:
+            return None
+        if time.monotonic() < self._skip_until:
+            self._counters["redis_skipped"] += 1
+            return None
+        if self._redis is None:
+            self._redis = redis.from_url(self.redis_url)
+        return self._redis
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception as e:
+                logger.warning(f"Error closing analytics cache: {e}")
+            self._redis = None
+
+    async def get_or_load(
+        self,
+        business_id,
+        table: str,
+        window: str,
+        filters: Optional[Dict[str, Any]],
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Cached result for the key, or ``await loader()`` (once per key at a time)."""
+        key = self.make_key(business_id, table, window, filters)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request computing it was cancelled; load it again
+                return await self.get_or_load(business_id, table, window, filters, loader)
+
+        self._counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generations.get(key[:2], 0)
+        try:
+            value = await self._load_shared(key, loader)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Waiters get the error; nobody else needs to retrieve it
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        else:
+            future.set_result(value)
+            if self._generations.get(key[:2], 0) == generation:
+                self._store(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _store(self, key: CacheKey, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Shared tier
+    # ------------------------------------------------------------------
+
+    def _generation_key(self, business_id: str, table: str) -> str:
+        return f"{self.key_prefix}:generation:{business_id}:{table}"
+
+    def _value_key(self, key: CacheKey, generation: int) -> str:
+        business_id, table, window, filters = key
+        digest = hashlib.sha1(f"{window}|{filters}".encode()).hexdigest()
+        return f"{self.key_prefix}:{business_id}:{table}:{generation}:{digest}"
+
+    async def _call(self, command: Awaitable[Any]) -> Any:
+        result = await asyncio.wait_for(command, self.redis_timeout)
+        self._failures = 0
+        return result
+
+    async def _load_shared(self, key: CacheKey, loader: Callable[[], Awaitable[Any]]) -> Any:
+        client = self._client()
+        if client is None:
+            return await self._load(loader)
+
+        locked = False
+        try:
+            generation = int(await self._call(client.get(self._generation_key(*key[:2]))) or 0)
+            value_key = self._value_key(key, generation)
+            lock_key = f"{value_key}:lock"
+            cached = await self._call(client.get(value_key))
+            if cached is None:
+                locked = bool(await self._call(client.set(lock_key, b"1", nx=True, px=int(self.lock_seconds * 1000))))
+                if not locked:
+                    cached = await self._wait_for_value(client, value_key, lock_key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._redis_error(e)
+            return await self._load(loader)
+
+        if cached is not None:
+            self._counters["shared_hits"] += 1
+            return orjson.loads(cached)
+        if not locked:
+            # The worker holding the lock is slow or failed; compute it here
+            return await self._load(loader)
+
+        try:
+            value = await self._load(loader)
+            try:
+                await self._call(client.set(
+                    value_key,
+                    orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS),
+                    px=int(self.ttl_seconds * 1000),
+                ))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._redis_error(e)
+            return value
+        finally:
+            try:
+                await self._call(client.delete(lock_key))
+            except Exception:
+                pass
+
+    async def _wait_for_value(self, client: redis.Redis, value_key: str, lock_key: str) -> Optional[bytes]:
+        deadline = time.monotonic() + self.lock_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_POLL_INTERVAL)
+            cached = await self._call(client.get(value_key))
+            if cached is not None:
+                return cached
+            if not await self._call(client.exists(lock_key)):
+                # Lock released without a value: the computation failed
+                return None
+        return None
+
+    async def _load(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self._counters["loads"] += 1
+        return await loader()
+
+    def _redis_error(self, error: Exception) -> None:
+        self._counters["redis_errors"] += 1
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._failures = 0
+            self._skip_until = time.monotonic() + self.retry_after
+            logger.warning(f"Analytics cache Redis failing ({error}); caching per worker for {self.retry_after:.0f}s")
+        else:
+            logger.warning(f"Analytics cache Redis unavailable, computing locally: {error}")
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def drop_local(self, business_id, table: str) -> None:
+        """Forget this worker's entries of ``table`` for a business."""
+        scope = (str(business_id), table)
+        self._generations[scope] = self._generations.get(scope, 0) + 1
+        for key in [key for key in self._entries if key[:2] == scope]:
+            del self._entries[key]
+        self._counters["invalidations"] += 1
+
+    async def invalidate(self, business_id, table: str) -> None:
+        """
+        Drop local entries of ``table`` for a business and retire the shared
+        ones. The shared generation is bumped in the background.
+        """
+        self.drop_local(business_id, table)
+        client = self._client()
+        if client is None:
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._bump_generation(client, self._generation_key(str(business_id), table))
+        )
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _bump_generation(self, client: redis.Redis, generation_key: str) -> None:
+        try:
+            await self._call(client.incr(generation_key))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._redis_error(e)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._counters)
+        stats["entries"] = len(self._entries)
+        stats["inflight"] = len(self._inflight)
+        stats["redis"] = self._redis is not None and time.monotonic() >= self._skip_until
+        return stats
+
+
+_analytics_cache: Optional[AnalyticsCache] = None
+
+
+def get_analytics_cache() -> AnalyticsCache:
+    """Get the process-wide analytics cache."""
+    global _analytics_cache
+
+    if _analytics_cache is None:
+        redis_url = settings.REDIS_URL if settings.ANALYTICS_CACHE_REDIS else None
+        _analytics_cache = AnalyticsCache(
+            ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS,
+            max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+            redis_url=redis_url or None,
+            lock_seconds=settings.ANALYTICS_CACHE_LOCK_SECONDS,
+            redis_timeout=settings.ANALYTICS_CACHE_REDIS_TIMEOUT,
+            failure_threshold=settings.ANALYTICS_CACHE_REDIS_FAILURES,
+            retry_after=settings.ANALYTICS_CACHE_REDIS_RETRY_SECONDS,
+        )
+
+    return _analytics_cache
@@ -1,9 +1,41 @@
-"""Analytics Service for Dashboard Operations."""
-from typing import Dict, List, Any, Optional
+"""
+Analytics Service for Dashboard Operations.
+
+Dashboard stats are aggregated in Postgres by the functions of
+db/migrations/add_analytics_rpc.sql and fetched through Supabase RPC, so a
+stats call transfers a few aggregate rows rather than the window's orders and
+messages. Until that migration has been applied the same figures are computed
+here (orders from the hourly rollups, messages from their timestamps). Raw
+rows are only returned page by page.
+
+Results are shared through the analytics cache (app/services/analytics_cache.py),
+so the dashboard's parallel calls for one window cost a single set of queries.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import logging
+
 from fastapi import HTTPException, status
-from app.config.database import get_supabase_client
+from app.config.database import get_supabase_client, execute_async
 from app.models.order import OrderStatus
+from app.services.analytics_cache import get_analytics_cache
+from app.services.business.live_orders import record_order_change
+from app.services.business.order_rollups import as_utc, get_order_summary
+
+logger = logging.getLogger(__name__)
+
+# PostgREST caps responses; full reads go in pages of this size
+_PAGE_SIZE = 1000
+
+_rpc_fallback_logged = False
+
+
+def _log_rpc_fallback(error: Exception) -> None:
+    global _rpc_fallback_logged
+    if not _rpc_fallback_logged:
+        logger.warning(f"Analytics RPC functions unavailable, aggregating rows instead: {error}")
+        _rpc_fallback_logged = True
 
 
 class AnalyticsService:
@@ -20,157 +52,296 @@ class AnalyticsService:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Get comprehensive orders analytics."""
-
-        # Determine date range
-        if start_date and end_date:
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-        else:
-            end_dt = datetime.utcnow()
-            if period == "1d":
-                start_dt = end_dt - timedelta(days=1)
-            elif period == "30d":
-                start_dt = end_dt - timedelta(days=30)
-            else:  # Default to 7 days
-                start_dt = end_dt - timedelta(days=7)
-
-        start_date_iso = start_dt.isoformat()
-        end_date_iso = end_dt.isoformat()
-
-        # Build query
-        query = self.supabase.table('orders').select('*').eq('business_id', business_id).gte('created_at', start_date_iso).lte('created_at', end_date_iso)
+        """
+        Get comprehensive orders analytics.
+
+        Only aggregates are returned; the order rows themselves are served
+        page by page by ``get_orders_page``.
+        """
+        return await get_analytics_cache().get_or_load(
+            business_id,
+            "orders",
+            self._window_key(period, start_date, end_date),
+            {"view": "summary", "status": status_filter},
+            lambda: self._load_orders_analytics(business_id, period, status_filter, start_date, end_date)
+        )
 
-        if status_filter:
-            query = query.eq('status', status_filter)
+    async def _load_orders_analytics(
+        self,
+        business_id: int,
+        period: str,
+        status_filter: Optional[str],
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ) -> Dict[str, Any]:
+        start_dt, end_dt = self._resolve_window(period, start_date, end_date)
 
-        orders_response = query.execute()
-        orders = orders_response.data if orders_response.data else []
+        try:
+            daily_rows, status_rows = await asyncio.gather(
+                self._rpc("analytics_order_revenue_by_day", business_id, start_dt, end_dt, p_status=status_filter),
+                self._rpc("analytics_order_status_distribution", business_id, start_dt, end_dt, p_status=status_filter)
+            )
+            status_distribution = {row["status"]: int(row["order_count"]) for row in status_rows}
+            total_orders = sum(status_distribution.values())
+            total_revenue = sum(float(row["revenue"] or 0) for row in status_rows)
+            daily_trends = {
+                str(row["day"]): {"count": int(row["order_count"]), "revenue": float(row["revenue"] or 0)}
+                for row in daily_rows
+            }
+        except Exception as e:
+            _log_rpc_fallback(e)
+            summary = await get_order_summary(
+                self.supabase,
+                business_id,
+                start_dt,
+                end_dt,
+                statuses=[status_filter] if status_filter else None
+            )
+            status_distribution = summary["status_counts"]
+            total_orders = summary["total_orders"]
+            total_revenue = summary["total_revenue"]
+            daily_trends = summary["daily"]
 
-        # Calculate analytics
-        analytics = {
+        return {
             "period": period,
-            "start_date": start_date_iso,
-            "end_date": end_date_iso,
-            "total_orders": len(orders),
-            "total_revenue": sum(order.get('total_amount', 0) for order in orders),
-            "orders": orders
+            "start_date": start_dt.isoformat(),
+            "end_date": end_dt.isoformat(),
+            "total_orders": total_orders,
+            "total_revenue": total_revenue,
+            "status_distribution": status_distribution,
+            "daily_trends": daily_trends,
+            "average_order_value": total_revenue / total_orders if total_orders > 0 else 0
         }
 
-        # Status distribution
-        status_counts = {}
-        for order in orders:
-            status = order.get('status')
-            if status:
-                status_counts[status] = status_counts.get(status, 0) + 1
-
-        analytics["status_distribution"] = status_counts
-
-        # Daily trends
-        daily_trends = {}
-        for order in orders:
-            created_at = order.get('created_at')
-            if created_at:
-                date_str = created_at.split('T')[0]
-                if date_str not in daily_trends:
-                    daily_trends[date_str] = {"count": 0, "revenue": 0}
-                daily_trends[date_str]["count"] += 1
-                daily_trends[date_str]["revenue"] += order.get('total_amount', 0)
-
-        analytics["daily_trends"] = daily_trends
-
-        # Average order value
-        analytics["average_order_value"] = (
-            analytics["total_revenue"] / analytics["total_orders"]
-            if analytics["total_orders"] > 0 else 0
-        )
-
-        return analytics
-
     async def get_messages_analytics(
         self,
         business_id: int,
         period: str = "7d",
         session_id: Optional[str] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        session_limit: int = 100
     ) -> Dict[str, Any]:
-        """Get comprehensive messages analytics."""
-
-        # Determine date range
-        if start_date and end_date:
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-        else:
-            end_dt = datetime.utcnow()
-            if period == "1d":
-                start_dt = end_dt - timedelta(days=1)
-            elif period == "30d":
-                start_dt = end_dt - timedelta(days=30)
-            else:  # Default to 7 days
-                start_dt = end_dt - timedelta(days=7)
-
-        start_date_iso = start_dt.isoformat()
-        end_date_iso = end_dt.isoformat()
-
-        # Build query
-        query = self.supabase.table('messages').select('*').eq('business_id', business_id).gte('created_at', start_date_iso).lte('created_at', end_date_iso)
-
-        if session_id:
-            query = query.eq('session_id', session_id)
-
-        messages_response = query.execute()
-        messages = messages_response.data if messages_response.data else []
+        """
+        Get comprehensive messages analytics.
+
+        ``sessions`` lists the ``session_limit`` most recently active sessions;
+        the totals cover all of them. Message rows are served by
+        ``get_messages_page``.
+        """
+        return await get_analytics_cache().get_or_load(
+            business_id,
+            "messages",
+            self._window_key(period, start_date, end_date),
+            {"view": "summary", "session": session_id, "sessions": session_limit},
+            lambda: self._load_messages_analytics(business_id, period, session_id, start_date, end_date, session_limit)
+        )
 
-        # Calculate analytics
-        analytics = {
+    async def _load_messages_analytics(
+        self,
+        business_id: int,
+        period: str,
+        session_id: Optional[str],
+        start_date: Optional[str],
+        end_date: Optional[str],
+        session_limit: int
+    ) -> Dict[str, Any]:
+        start_dt, end_dt = self._resolve_window(period, start_date, end_date)
+
+        try:
+            stats_rows, session_rows = await asyncio.gather(
+                self._rpc("analytics_message_stats", business_id, start_dt, end_dt, p_session_id=session_id),
+                self._rpc(
+                    "analytics_session_stats", business_id, start_dt, end_dt,
+                    p_session_id=session_id, p_limit=session_limit, p_offset=0
+                )
+            )
+            totals = next((row for row in stats_rows if row["day"] is None), {})
+            total_messages = int(totals.get("message_count") or 0)
+            total_sessions = int(totals.get("session_count") or 0)
+            average_duration = float(totals.get("average_duration_minutes") or 0)
+            daily_trends = {
+                str(row["day"]): int(row["message_count"])
+                for row in sorted(stats_rows, key=lambda row: str(row["day"]))
+                if row["day"] is not None
+            }
+            sessions = [
+                {
+                    "session_id": row["session_id"],
+                    "message_count": int(row["message_count"]),
+                    "first_message": row["first_message"],
+                    "last_message": row["last_message"],
+                    "duration_minutes": float(row["duration_minutes"] or 0)
+                }
+                for row in session_rows
+            ]
+        except Exception as e:
+            _log_rpc_fallback(e)
+            messages = await self._fetch_all(
+                lambda: self._messages_query(business_id, start_dt, end_dt, session_id, "session_id,created_at")
+            )
+            total_messages = len(messages)
+
+            # Session statistics
+            by_session: Dict[str, List[Dict[str, Any]]] = {}
+            for message in messages:
+                session_id_msg = message.get('session_id')
+                if session_id_msg:
+                    by_session.setdefault(session_id_msg, []).append(message)
+
+            sessions = []
+            for session_id_key, session_messages in by_session.items():
+                sessions.append({
+                    "session_id": session_id_key,
+                    "message_count": len(session_messages),
+                    "first_message": min(msg.get('created_at', '') for msg in session_messages),
+                    "last_message": max(msg.get('created_at', '') for msg in session_messages),
+                    "duration_minutes": self._calculate_session_duration(session_messages)
+                })
+            sessions.sort(key=lambda session: session["last_message"], reverse=True)
+            total_sessions = len(sessions)
+            average_duration = (
+                sum(session["duration_minutes"] for session in sessions) / total_sessions
+                if total_sessions > 0 else 0
+            )
+            sessions = sessions[:session_limit]
+
+            # Daily message trends
+            daily_trends = {}
+            for message in messages:
+                created_at = message.get('created_at')
+                if created_at:
+                    date_str = created_at.split('T')[0]
+                    daily_trends[date_str] = daily_trends.get(date_str, 0) + 1
+            daily_trends = dict(sorted(daily_trends.items()))
+
+        return {
             "period": period,
-            "start_date": start_date_iso,
-            "end_date": end_date_iso,
-            "total_messages": len(messages),
-            "messages": messages
+            "start_date": start_dt.isoformat(),
+            "end_date": end_dt.isoformat(),
+            "total_messages": total_messages,
+            "total_sessions": total_sessions,
+            "sessions": sessions,
+            "daily_trends": daily_trends,
+            "average_messages_per_session": total_messages / total_sessions if total_sessions > 0 else 0,
+            "average_session_duration_minutes": average_duration
         }
 
-        # Session statistics
-        sessions = {}
-        for message in messages:
-            session_id_msg = message.get('session_id')
-            if session_id_msg:
-                if session_id_msg not in sessions:
-                    sessions[session_id_msg] = []
-                sessions[session_id_msg].append(message)
-
-        # Session summary
-        session_summary = []
-        for session_id_key, session_messages in sessions.items():
-            session_summary.append({
-                "session_id": session_id_key,
-                "message_count": len(session_messages),
-                "first_message": min(msg.get('created_at', '') for msg in session_messages),
-                "last_message": max(msg.get('created_at', '') for msg in session_messages),
-                "duration_minutes": self._calculate_session_duration(session_messages)
-            })
-
-        analytics["sessions"] = session_summary
-        analytics["total_sessions"] = len(session_summary)
-
-        # Daily message trends
-        daily_trends = {}
-        for message in messages:
-            created_at = message.get('created_at')
-            if created_at:
-                date_str = created_at.split('T')[0]
-                daily_trends[date_str] = daily_trends.get(date_str, 0) + 1
+    async def get_active_conversations(
+        self,
+        business_id: int,
+        minutes: int = 60,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Sessions with a message in the last ``minutes``, most recently active first."""
+        return await get_analytics_cache().get_or_load(
+            business_id,
+            "messages",
+            f"{minutes}m",
+            {"view": "conversations", "limit": limit},
+            lambda: self._load_active_conversations(business_id, datetime.utcnow() - timedelta(minutes=minutes), limit)
+        )
 
-        analytics["daily_trends"] = daily_trends
+    async def _load_active_conversations(self, business_id: int, since: datetime, limit: int) -> List[Dict[str, Any]]:
+        try:
+            rows = await self._rpc(
+                "analytics_active_conversations", business_id, p_since=as_utc(since).isoformat(), p_limit=limit
+            )
+            return [
+                {
+                    "session_id": row["session_id"],
+                    "message_count": int(row["message_count"]),
+                    "last_message": row["last_message"],
+                    "last_content": row["last_content"]
+                }
+                for row in rows
+            ]
+        except Exception as e:
+            _log_rpc_fallback(e)
+            messages = await self._fetch_all(
+                lambda: self.supabase.table('messages').select('session_id,created_at,content')
+                .eq('business_id', business_id)
+                .gte('created_at', as_utc(since).isoformat())
+                .order('created_at', desc=True)
+            )
+            conversations: Dict[str, Dict[str, Any]] = {}
+            for message in messages:
+                session_id = message.get('session_id')
+                if not session_id:
+                    continue
+                conversation = conversations.get(session_id)
+                if conversation is None:
+                    conversations[session_id] = {
+                        "session_id": session_id,
+                        "message_count": 1,
+                        "last_message": message.get('created_at'),
+                        "last_content": message.get('content')
+                    }
+                else:
+                    conversation["message_count"] += 1
+            return list(conversations.values())[:limit]
+
+    async def get_orders_page(
+        self,
+        business_id: int,
+        period: str = "7d",
+        status_filter: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """One page of the window's order rows, newest first."""
+
+        async def load() -> Dict[str, Any]:
+            start_dt, end_dt = self._resolve_window(period, start_date, end_date)
+            query = self._orders_query(business_id, start_dt, end_dt, status_filter)
+            response = await execute_async(query.range(offset, offset + limit - 1))
+            return self._page("orders", response.data or [], limit, offset)
+
+        return await get_analytics_cache().get_or_load(
+            business_id,
+            "orders",
+            self._window_key(period, start_date, end_date),
+            {"view": "rows", "status": status_filter, "limit": limit, "offset": offset},
+            load
+        )
 
-        # Average messages per session
-        analytics["average_messages_per_session"] = (
-            analytics["total_messages"] / analytics["total_sessions"]
-            if analytics["total_sessions"] > 0 else 0
+    async def get_messages_page(
+        self,
+        business_id: int,
+        period: str = "7d",
+        session_id: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """One page of the window's message rows, newest first."""
+
+        async def load() -> Dict[str, Any]:
+            start_dt, end_dt = self._resolve_window(period, start_date, end_date)
+            query = self._messages_query(business_id, start_dt, end_dt, session_id)
+            response = await execute_async(query.range(offset, offset + limit - 1))
+            return self._page("messages", response.data or [], limit, offset)
+
+        return await get_analytics_cache().get_or_load(
+            business_id,
+            "messages",
+            self._window_key(period, start_date, end_date),
+            {"view": "rows", "session": session_id, "limit": limit, "offset": offset},
+            load
         )
 
-        return analytics
+    async def export_orders(self, business_id: int, period: str = "30d") -> List[Dict[str, Any]]:
+        """Every order row of the window (for exports)."""
+        start_dt, end_dt = self._resolve_window(period)
+        return await self._fetch_all(lambda: self._orders_query(business_id, start_dt, end_dt))
+
+    async def export_messages(self, business_id: int, period: str = "30d") -> List[Dict[str, Any]]:
+        """Every message row of the window (for exports)."""
+        start_dt, end_dt = self._resolve_window(period)
+        return await self._fetch_all(lambda: self._messages_query(business_id, start_dt, end_dt))
 
     async def create_order_analytics_record(
         self,
@@ -188,7 +359,7 @@ class AnalyticsService:
         if "status" not in order_data:
             order_data["status"] = OrderStatus.PENDING
 
-        response = self.supabase.table('orders').insert(order_data).execute()
+        response = await execute_async(self.supabase.table('orders').insert(order_data))
 
         if not response.data:
             raise HTTPException(
@@ -196,6 +367,7 @@ class AnalyticsService:
                 detail="Failed to create order record"
             )
 
+        await record_order_change(response.data[0])
         return response.data[0]
 
     async def update_order_status(
@@ -215,7 +387,7 @@ class AnalyticsService:
         if additional_data:
             update_data.update(additional_data)
 
-        response = self.supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business_id).execute()
+        response = await execute_async(self.supabase.table('orders').update(update_data).eq('id', order_id).eq('business_id', business_id))
 
         if not response.data:
             raise HTTPException(
@@ -223,6 +395,7 @@ class AnalyticsService:
                 detail="Order not found or update failed"
             )
 
+        await record_order_change(response.data[0])
         return response.data[0]
 
     async def create_message_analytics_record(
@@ -236,7 +409,7 @@ class AnalyticsService:
         message_data["business_id"] = business_id
         message_data["created_at"] = datetime.utcnow().isoformat()
 
-        response = self.supabase.table('messages').insert(message_data).execute()
+        response = await execute_async(self.supabase.table('messages').insert(message_data))
 
         if not response.data:
             raise HTTPException(
@@ -253,8 +426,10 @@ class AnalyticsService:
     ) -> Dict[str, Any]:
         """Get combined analytics from both orders and messages."""
 
-        orders_analytics = await self.get_orders_analytics(business_id, period)
-        messages_analytics = await self.get_messages_analytics(business_id, period)
+        orders_analytics, messages_analytics = await asyncio.gather(
+            self.get_orders_analytics(business_id, period),
+            self.get_messages_analytics(business_id, period)
+        )
 
         # Calculate combined metrics
         combined = {
@@ -279,6 +454,99 @@ class AnalyticsService:
 
         return combined
 
+    @staticmethod
+    def _window_key(period: str, start_date: Optional[str], end_date: Optional[str]) -> str:
+        return f"{start_date}/{end_date}" if start_date and end_date else period
+
+    @staticmethod
+    def _resolve_window(
+        period: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Tuple[datetime, datetime]:
+        """Explicit ISO ``start_date``/``end_date``, or the ``period`` ending now."""
+        if start_date and end_date:
+            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        else:
+            end_dt = datetime.utcnow()
+            if period == "1h":
+                start_dt = end_dt - timedelta(hours=1)
+            elif period == "1d":
+                start_dt = end_dt - timedelta(days=1)
+            elif period == "30d":
+                start_dt = end_dt - timedelta(days=30)
+            else:  # Default to 7 days
+                start_dt = end_dt - timedelta(days=7)
+        return start_dt, end_dt
+
+    async def _rpc(
+        self,
+        name: str,
+        business_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        **params: Any
+    ) -> List[Dict[str, Any]]:
+        """Call one of the analytics functions of db/migrations/add_analytics_rpc.sql."""
+        params["p_business_id"] = business_id
+        if start is not None:
+            params["p_start"] = as_utc(start).isoformat()
+        if end is not None:
+            params["p_end"] = as_utc(end).isoformat()
+        response = await execute_async(self.supabase.rpc(name, params))
+        return response.data or []
+
+    def _orders_query(self, business_id, start: datetime, end: datetime, status_filter: Optional[str] = None):
+        query = (
+            self.supabase.table('orders').select('*')
+            .eq('business_id', business_id)
+            .gte('created_at', as_utc(start).isoformat())
+            .lt('created_at', as_utc(end).isoformat())
+        )
+        if status_filter:
+            query = query.eq('status', status_filter)
+        return query.order('created_at', desc=True).order('id', desc=True)
+
+    def _messages_query(
+        self,
+        business_id,
+        start: datetime,
+        end: datetime,
+        session_id: Optional[str] = None,
+        columns: str = '*'
+    ):
+        query = (
+            self.supabase.table('messages').select(columns)
+            .eq('business_id', business_id)
+            .gte('created_at', as_utc(start).isoformat())
+            .lt('created_at', as_utc(end).isoformat())
+        )
+        if session_id:
+            query = query.eq('session_id', session_id)
+        return query.order('created_at', desc=True).order('id', desc=True)
+
+    async def _fetch_all(self, build_query: Callable[[], Any]) -> List[Dict[str, Any]]:
+        """Every row of a query, read in pages (PostgREST caps a single response)."""
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            response = await execute_async(build_query().range(offset, offset + _PAGE_SIZE - 1))
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < _PAGE_SIZE:
+                return rows
+            offset += _PAGE_SIZE
+
+    @staticmethod
+    def _page(key: str, rows: List[Dict[str, Any]], limit: int, offset: int) -> Dict[str, Any]:
+        return {
+            key: rows,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": offset + limit if len(rows) == limit else None
+        }
+
     def _calculate_session_duration(self, messages: List[Dict[str, Any]]) -> float:
         """Calculate session duration in minutes."""
         if not messages:
@@ -0,0 +1,289 @@
+"""
+Live order feed: per-business in-memory view of active orders.
+
+The dashboard used to re-select every active order on each poll and on
+every AI chat turn. Instead, each worker keeps a materialised view of the
+active orders per business, loaded from Supabase once and then kept current
+by the order write paths (``record_order_change``). Changes are published on
+the realtime gateway's ``live_orders`` topic, so every worker applies every
+change, wherever the write happened.
+
+Cursors are epoch milliseconds compared against the orders' ``updated_at``,
+so a cursor issued by one worker is understood by all of them. Clients send
+the cursor of their last response and get what changed since then, minus
+``LIVE_ORDERS_CURSOR_OVERLAP_SECONDS`` to absorb clock skew and delivery
+delay between workers (the same order may therefore be sent again):
+
+- a delta (``upserts`` and ``removed`` order ids) from memory when this
+  worker's view covers the cursor
+- a delta queried from ``orders.updated_at`` when the cursor is older than
+  the view (e.g. issued before this worker loaded it)
+- a full snapshot on the first request or when too much has changed
+"""
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.config.database import execute_async
+from app.config.settings import settings
+from app.models.order import OrderStatus
+from app.services.analytics_cache import get_analytics_cache
+from app.services.business.order_rollups import parse_timestamp
+from app.services.websocket.gateway import DASHBOARD, gateway, topic
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [
+    OrderStatus.PENDING.value,
+    OrderStatus.CONFIRMED.value,
+    OrderStatus.PREPARING.value,
+    OrderStatus.READY.value,
+]
+
+LIVE_ORDERS_TOPIC = "live_orders"
+
+
+def _is_active(order: Dict[str, Any]) -> bool:
+    return order.get("status") in ACTIVE_STATUSES
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _stamp(order: Dict[str, Any]) -> int:
+    """``updated_at`` of an order row in epoch milliseconds (now if missing)."""
+    value = order.get("updated_at") or order.get("created_at")
+    if value:
+        try:
+            return int(parse_timestamp(value).timestamp() * 1000)
+        except (TypeError, ValueError):
+            pass
+    return _now_ms()
+
+
+def _lower_bound(cursor: Optional[str]) -> Optional[int]:
+    """Oldest change stamp a client holding ``cursor`` may have missed; None if no cursor."""
+    if not cursor or not str(cursor).isdigit():
+        return None
+    return int(cursor) - int(settings.LIVE_ORDERS_CURSOR_OVERLAP_SECONDS * 1000)
+
+
+class LiveOrderView:
+    """Active orders of one business plus a bounded log of recent removals."""
+
+    def __init__(self, business_id: str, max_changes: int = 500):
+        self.business_id = business_id
+        self.max_changes = max_changes
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        # Change stamp (epoch ms) of every order in self.orders
+        self.stamps: Dict[str, int] = {}
+        # (stamp, order id) of orders that left the active set
+        self.removed: Deque[Tuple[int, str]] = deque(maxlen=max_changes)
+        # Every change stamped after this is reflected in orders / removed
+        self.known_since: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._loading = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    def is_fresh(self) -> bool:
+        if self.loaded_at is None:
+            return False
+        # Without the cross-worker bus, other workers' writes are invisible; resync often.
+        # With it, still resync now and then for writes that never went through the bus
+        if gateway.bus is None:
+            max_age = settings.LIVE_ORDERS_RESYNC_SECONDS
+        else:
+            max_age = settings.LIVE_ORDERS_BUS_RESYNC_SECONDS
+        return time.monotonic() - self.loaded_at <= max_age
+
+    async def ensure_loaded(self, supabase) -> None:
+        """Load the active orders once (concurrent callers share the query)."""
+        if self.is_fresh():
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self.is_fresh():
+                return
+            # Changes arriving while the query runs are replayed on top of it
+            self._loading = True
+            started = _now_ms()
+            try:
+                response = await execute_async(
+                    supabase.table('orders').select('*')
+                    .eq('business_id', self.business_id)
+                    .in_('status', ACTIVE_STATUSES)
+                )
+                self.orders = {str(order["id"]): order for order in (response.data or [])}
+                self.stamps = {order_id: _stamp(order) for order_id, order in self.orders.items()}
+                # Orders that left the feed before this snapshot are unknown to the view
+                self.removed.clear()
+                self.known_since = started - int(settings.LIVE_ORDERS_CURSOR_OVERLAP_SECONDS * 1000)
+                self.loaded_at = time.monotonic()
+            finally:
+                self._loading = False
+                pending, self._pending = self._pending, []
+
+            for order in pending:
+                self.apply(order)
+
+    def apply(self, order: Dict[str, Any]) -> bool:
+        """Apply a changed order row; returns False if it changed nothing."""
+        if self._loading:
+            self._pending.append(order)
+            return False
+        if self.loaded_at is None:
+            return False
+
+        order_id = str(order["id"])
+        stamp = _stamp(order)
+        if order_id in self.orders and self.stamps[order_id] > stamp:
+            # Out-of-order delivery of an older write
+            return False
+
+        if _is_active(order):
+            self.orders[order_id] = order
+            self.stamps[order_id] = stamp
+        elif order_id in self.orders:
+            del self.orders[order_id]
+            del self.stamps[order_id]
+            if len(self.removed) == self.removed.maxlen:
+                # Removals older than the log are forgotten; older cursors go to the database
+                self.known_since = max(self.known_since, self.removed[0][0])
+            self.removed.append((stamp, order_id))
+        else:
+            return False
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "cursor": str(_now_ms()),
+            "full": True,
+            "orders": self.active_orders(),
+        }
+
+    def changes_since(self, cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Delta since ``cursor`` from memory, a full snapshot if there is no
+        cursor, or None if the cursor is older than what this view knows.
+        """
+        lower = _lower_bound(cursor)
+        if lower is None:
+            return self.snapshot()
+        if lower < self.known_since:
+            return None
+
+        now = _now_ms()
+        removed = dict.fromkeys(
+            order_id for stamp, order_id in self.removed
+            if stamp > lower and order_id not in self.orders
+        )
+        return {
+            "cursor": str(now),
+            "full": False,
+            "upserts": [order for order_id, order in self.orders.items() if self.stamps[order_id] > lower],
+            "removed": list(removed),
+        }
+
+    async def changes_from_database(self, supabase, cursor: str) -> Dict[str, Any]:
+        """Delta since ``cursor`` read from ``orders.updated_at``; snapshot if too much changed."""
+        now = _now_ms()
+        lower = datetime.fromtimestamp(_lower_bound(cursor) / 1000, tz=timezone.utc)
+        response = await execute_async(
+            supabase.table('orders').select('*')
+            .eq('business_id', self.business_id)
+            .gt('updated_at', lower.isoformat())
+            .order('updated_at')
+            .limit(self.max_changes + 1)
+        )
+        rows = response.data or []
+        if len(rows) > self.max_changes:
+            return self.snapshot()
+        return {
+            "cursor": str(now),
+            "full": False,
+            "upserts": [order for order in rows if _is_active(order)],
+            "removed": [str(order["id"]) for order in rows if not _is_active(order)],
+        }
+
+    def active_orders(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Active orders, newest first."""
+        orders = sorted(self.orders.values(), key=lambda order: str(order.get("created_at") or ""), reverse=True)
+        return orders[:limit] if limit else orders
+
+
+_views: Dict[str, LiveOrderView] = {}
+
+
+def get_live_order_view(business_id) -> LiveOrderView:
+    """This worker's view for ``business_id``."""
+    key = str(business_id)
+    view = _views.get(key)
+    if view is None:
+        view = LiveOrderView(key, max_changes=settings.LIVE_ORDERS_MAX_CHANGES)
+        _views[key] = view
+    return view
+
+
+async def get_active_orders(business_id, supabase, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Active orders from the live view (queried from Supabase only on first use)."""
+    view = get_live_order_view(business_id)
+    await view.ensure_loaded(supabase)
+    return view.active_orders(limit)
+
+
+async def get_changes_since(business_id, supabase, cursor: Optional[str]) -> Dict[str, Any]:
+    """Live-order delta (or snapshot) since ``cursor``, on any worker."""
+    view = get_live_order_view(business_id)
+    await view.ensure_loaded(supabase)
+    delta = view.changes_since(cursor)
+    if delta is None:
+        delta = await view.changes_from_database(supabase, cursor)
+    return delta
+
+
+async def record_order_change(order: Optional[Dict[str, Any]]) -> None:
+    """
+    Feed a created/updated order row into the live views of every worker.
+
+    Call after any write to ``orders`` with the row Supabase returned. This
+    also invalidates the business's cached order analytics.
+    """
+    if not order or order.get("id") is None or order.get("business_id") is None:
+        return
+    await get_analytics_cache().invalidate(order["business_id"], "orders")
+    await gateway.publish(LIVE_ORDERS_TOPIC, {"order": order})
+
+
+async def _on_order_change(message: Dict[str, Any]) -> None:
+    order = message["order"]
+    business_id = str(order["business_id"])
+    get_analytics_cache().drop_local(business_id, "orders")
+
+    view = _views.get(business_id)
+    if view is None:
+        # Nobody on this worker follows this business yet; it loads on first use
+        return
+
+    if not view.apply(order):
+        return
+
+    # Push the change to this worker's dashboards. The cursor is the change's own
+    # stamp, so a later sync still covers changes that are slower to arrive
+    active = _is_active(order)
+    await gateway.publish_local(topic(DASHBOARD, business_id), {
+        "type": "live_orders_delta",
+        "cursor": str(_stamp(order)),
+        "full": False,
+        "upserts": [order] if active else [],
+        "removed": [] if active else [str(order["id"])],
+    })
+
+
+gateway.add_listener(LIVE_ORDERS_TOPIC, _on_order_change)
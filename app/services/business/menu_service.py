@@ -10,6 +10,7 @@ from sqlalchemy import func
 from app.models import MenuItem, MenuCategory, Business, Order, OrderStatus
 from app.schemas.menu import MenuItemCreate, MenuItemUpdate, MenuCategoryCreate, MenuCategoryUpdate
 from app.services.notifications.notification_service import NotificationService
+from app.tasks.embedding_tasks import schedule_menu_item_reindex, schedule_menu_item_reindex_async
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +82,9 @@ class MenuService:
         self.db.commit()
         self.db.refresh(menu_item)
         
+        # Re-embed the new item for search
+        await schedule_menu_item_reindex_async([menu_item.id])
+        
         # Send notification to staff about new menu item
         try:
             business = self.db.query(Business).filter(Business.id == business_id).first()
@@ -166,6 +170,10 @@ class MenuService:
         self.db.commit()
         self.db.refresh(menu_item)
         
+        # Only text and availability changes affect the search embedding
+        if item_data.name is not None or item_data.description is not None or item_data.is_available is not None:
+            schedule_menu_item_reindex([menu_item.id])
+        
         return menu_item
     
     async def toggle_item_availability(
@@ -196,6 +204,8 @@ class MenuService:
         self.db.commit()
         self.db.refresh(menu_item)
         
+        await schedule_menu_item_reindex_async([menu_item.id])
+        
         # Send notification about availability change
         try:
             business = self.db.query(Business).filter(Business.id == business_id).first()
@@ -250,6 +260,9 @@ class MenuService:
         self.db.delete(menu_item)
         self.db.commit()
         
+        # Drop the item from the search index
+        await schedule_menu_item_reindex_async([item_id])
+        
         # Send notification about item deletion
         try:
             business = self.db.query(Business).filter(Business.id == business_id).first()
@@ -0,0 +1,345 @@
+"""
+Columnar order windows for analytics and reports.
+
+The analytics, report and business-intelligence endpoints and the dashboard
+AI's ReportsManager each pulled their window of orders and walked it in
+Python several times (one loop per breakdown, one query per customer).
+``load_order_frame`` reads the window once and turns it into parallel NumPy
+arrays: creation/update times, amounts, tax and integer codes for status,
+payment method, order type and customer. Breakdowns are then ``bincount``
+calls over those codes, time buckets are ``datetime64`` casts, and percentiles
+and per-customer figures are vectorized too.
+
+Times are UTC, the same as ``order_rollups``. Customers are identified by
+``customer_id``, falling back to ``customer_session_id``.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from app.config.database import execute_async
+from app.services.business.order_rollups import as_utc
+
+logger = logging.getLogger(__name__)
+
+# Categorical columns: frame attribute -> order field
+CATEGORIES = {
+    "status": "status",
+    "payment_method": "payment_method",
+    "order_type": "order_type",
+}
+
+# Calendar buckets (chronological) and cyclic ones (hour of day, day of week, month of year)
+TIME_UNITS = ("hour", "day", "week", "month", "hour_of_day", "weekday", "month_of_year")
+
+# PostgREST caps responses; order windows are read in pages of this size
+_PAGE_SIZE = 1000
+
+_EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday = 0)
+
+
+def _encode(values: Sequence[Any], missing: Optional[str] = "unknown") -> Tuple[np.ndarray, Tuple[Any, ...]]:
+    """Integer codes and labels for a categorical column (-1 where missing and ``missing`` is None)."""
+    keys = [
+        (getattr(value, "value", value) if value not in (None, "") else missing)
+        for value in values
+    ]
+    present = [key for key in keys if key is not None]
+    if not present:
+        return np.full(len(keys), -1, dtype=np.int64), ()
+    labels, inverse = np.unique(np.array([str(key) for key in present], dtype=object), return_inverse=True)
+    if len(present) == len(keys):
+        return inverse.astype(np.int64), tuple(labels)
+    codes = np.full(len(keys), -1, dtype=np.int64)
+    codes[[index for index, key in enumerate(keys) if key is not None]] = inverse
+    return codes, tuple(labels)
+
+
+def _to_datetime64(values: Sequence[Any]) -> np.ndarray:
+    """UTC ``datetime64[us]`` for ISO strings or datetimes; NaT where missing."""
+    converted = []
+    for value in values:
+        if value in (None, ""):
+            converted.append("NaT")
+        elif isinstance(value, datetime):
+            converted.append(as_utc(value).replace(tzinfo=None).isoformat())
+        else:
+            text = str(value)
+            if text.endswith("Z"):
+                text = text[:-1]
+            elif text.endswith("+00:00"):
+                text = text[:-6]
+            elif len(text) > 10 and text[-6] in "+-" and text[-3] == ":":
+                text = as_utc(datetime.fromisoformat(text)).replace(tzinfo=None).isoformat()
+            converted.append(text)
+    return np.array(converted, dtype="datetime64[us]")
+
+
+def _as_datetime(value) -> datetime:
+    """UTC datetime for a datetime or a date (midnight)."""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return as_utc(value)
+
+
+def _as_datetime64(value) -> np.datetime64:
+    return np.datetime64(_as_datetime(value).replace(tzinfo=None), "us")
+
+
+class OrderFrame:
+    """An order window as parallel column arrays."""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        created_at: np.ndarray,
+        updated_at: np.ndarray,
+        amount: np.ndarray,
+        tax: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        labels: Dict[str, Tuple[Any, ...]],
+    ):
+        self.ids = ids
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.amount = amount
+        self.tax = tax
+        # column -> integer codes into labels[column]; "customer" uses -1 for anonymous orders
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "OrderFrame":
+        """Build a frame from ``orders`` rows (as returned by PostgREST)."""
+        rows = [row for row in rows if row.get("created_at")]
+        codes: Dict[str, np.ndarray] = {}
+        labels: Dict[str, Tuple[Any, ...]] = {}
+        for column, field in CATEGORIES.items():
+            codes[column], labels[column] = _encode([row.get(field) for row in rows])
+        codes["customer"], labels["customer"] = _encode(
+            [row.get("customer_id") or row.get("customer_session_id") for row in rows],
+            missing=None,
+        )
+        return cls(
+            ids=np.array([row.get("id") for row in rows], dtype=object),
+            created_at=_to_datetime64([row.get("created_at") for row in rows]),
+            updated_at=_to_datetime64([row.get("updated_at") for row in rows]),
+            amount=np.array([float(row.get("total_amount") or 0) for row in rows], dtype=np.float64),
+            tax=np.array([float(row.get("tax_amount") or 0) for row in rows], dtype=np.float64),
+            codes=codes,
+            labels=labels,
+        )
+
+    def __len__(self) -> int:
+        return int(self.amount.size)
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    def take(self, mask: np.ndarray) -> "OrderFrame":
+        """Rows where ``mask`` holds (labels are shared, codes stay valid)."""
+        return OrderFrame(
+            ids=self.ids[mask],
+            created_at=self.created_at[mask],
+            updated_at=self.updated_at[mask],
+            amount=self.amount[mask],
+            tax=self.tax[mask],
+            codes={column: codes[mask] for column, codes in self.codes.items()},
+            labels=self.labels,
+        )
+
+    def mask_in(self, column: str, values: Iterable[str]) -> np.ndarray:
+        wanted = set(values)
+        hits = [code for code, label in enumerate(self.labels[column]) if label in wanted]
+        return np.isin(self.codes[column], hits)
+
+    def where(self, statuses: Optional[Iterable[str]] = None, start=None, end=None, customers_only: bool = False) -> "OrderFrame":
+        """Orders with one of ``statuses``, created in ``[start, end)``, optionally only identified customers."""
+        mask = np.ones(len(self), dtype=bool)
+        if statuses is not None:
+            mask &= self.mask_in("status", statuses)
+        if start is not None:
+            mask &= self.created_at >= _as_datetime64(start)
+        if end is not None:
+            mask &= self.created_at < _as_datetime64(end)
+        if customers_only:
+            mask &= self.codes["customer"] >= 0
+        return self if mask.all() else self.take(mask)
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+
+    def total(self) -> float:
+        return float(self.amount.sum())
+
+    def average(self) -> float:
+        return float(self.amount.mean()) if len(self) else 0.0
+
+    def percentiles(self, quantiles: Sequence[float] = (50, 90, 99), values: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """``{"p50": ..., ...}`` of order amounts (or ``values``)."""
+        values = self.amount if values is None else values
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {f"p{q:g}": 0.0 for q in quantiles}
+        return {f"p{q:g}": float(value) for q, value in zip(quantiles, np.percentile(values, quantiles))}
+
+    def count_by(self, column: str) -> Dict[str, int]:
+        """Order count per label of a categorical column."""
+        codes = self.codes[column]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.labels[column]))
+        return {label: int(count) for label, count in zip(self.labels[column], counts) if count}
+
+    def sum_by(self, column: str) -> Dict[str, float]:
+        """Revenue per label of a categorical column."""
+        codes = self.codes[column]
+        present = codes >= 0
+        counts = np.bincount(codes[present], minlength=len(self.labels[column]))
+        sums = np.bincount(codes[present], weights=self.amount[present], minlength=len(self.labels[column]))
+        return {label: float(total) for label, total, count in zip(self.labels[column], sums, counts) if count}
+
+    def group_by(self, column: str) -> Dict[str, Dict[str, float]]:
+        """``{label: {"count", "revenue"}}`` for a categorical column."""
+        revenue = self.sum_by(column)
+        return {label: {"count": count, "revenue": revenue[label]} for label, count in self.count_by(column).items()}
+
+    def time_keys(self, unit: str, times: Optional[np.ndarray] = None) -> np.ndarray:
+        """Integer bucket of every order for ``unit`` (see ``TIME_UNITS``)."""
+        times = self.created_at if times is None else times
+        if unit == "hour":
+            return times.astype("datetime64[h]").astype(np.int64)
+        if unit == "hour_of_day":
+            return times.astype("datetime64[h]").astype(np.int64) % 24
+        days = times.astype("datetime64[D]").astype(np.int64)
+        if unit == "day":
+            return days
+        if unit == "weekday":
+            return (days + _EPOCH_WEEKDAY) % 7
+        if unit == "week":
+            # Monday of the ISO week
+            return days - (days + _EPOCH_WEEKDAY) % 7
+        if unit == "month":
+            return times.astype("datetime64[M]").astype(np.int64)
+        if unit == "month_of_year":
+            return times.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        raise ValueError(f"Unknown time unit: {unit}")
+
+    @staticmethod
+    def time_label(unit: str, key: int):
+        """Display label of a bucket key: ISO date/hour, ``"2024-W07"``, ``"2024-03"``, or the int itself for cyclic units."""
+        if unit in ("hour_of_day", "weekday", "month_of_year"):
+            return int(key)
+        if unit == "hour":
+            return str(np.datetime64(int(key), "h"))
+        if unit == "month":
+            return str(np.datetime64(int(key), "M"))
+        day = (date(1970, 1, 1) + timedelta(days=int(key)))
+        if unit == "week":
+            year, week, _ = day.isocalendar()
+            return f"{year}-W{week:02d}"
+        return day.isoformat()
+
+    def bucket(self, unit: str, values: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        ``[{"period", "count", "revenue"}]`` per time bucket, in bucket order.
+
+        ``values`` replaces order amounts as the summed quantity.
+        """
+        if not len(self):
+            return []
+        values = self.amount if values is None else values
+        keys, inverse = np.unique(self.time_keys(unit), return_inverse=True)
+        counts = np.bincount(inverse, minlength=keys.size)
+        sums = np.bincount(inverse, weights=values, minlength=keys.size)
+        return [
+            {"period": self.time_label(unit, key), "count": int(count), "revenue": float(total)}
+            for key, count, total in zip(keys, counts, sums)
+        ]
+
+    def split(self, unit: str) -> List[Tuple[Any, "OrderFrame"]]:
+        """``[(period label, frame of that period)]`` in bucket order."""
+        if not len(self):
+            return []
+        keys = self.time_keys(unit)
+        order = np.argsort(keys, kind="stable")
+        unique, starts = np.unique(keys[order], return_index=True)
+        return [
+            (self.time_label(unit, key), self.take(indices))
+            for key, indices in zip(unique, np.split(order, starts[1:]))
+        ]
+
+    def durations(self) -> np.ndarray:
+        """Minutes from creation to last update per order (NaN where not updated)."""
+        minutes = (self.updated_at - self.created_at).astype("timedelta64[s]").astype(np.float64) / 60
+        minutes[np.isnat(self.updated_at)] = np.nan
+        return minutes
+
+    # ------------------------------------------------------------------
+    # Customers
+    # ------------------------------------------------------------------
+
+    def unique_customers(self) -> int:
+        return int(np.unique(self.codes["customer"][self.codes["customer"] >= 0]).size)
+
+    def customer_ids(self) -> set:
+        labels = self.labels["customer"]
+        return {labels[code] for code in np.unique(self.codes["customer"][self.codes["customer"] >= 0])}
+
+    def customer_stats(self) -> Dict[str, np.ndarray]:
+        """
+        Per-customer columns for customers with at least one order here:
+        ``customer`` (ids), ``orders``, ``revenue``, ``first`` and ``last``
+        (``datetime64``).
+        """
+        codes = self.codes["customer"]
+        present = codes >= 0
+        codes, amount, created = codes[present], self.amount[present], self.created_at[present]
+        size = len(self.labels["customer"])
+        orders = np.bincount(codes, minlength=size)
+        revenue = np.bincount(codes, weights=amount, minlength=size).astype(np.float64)
+        last = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(last, codes, created.astype(np.int64))
+
+        seen = orders > 0
+        return {
+            "customer": np.array(self.labels["customer"], dtype=object)[seen],
+            "orders": orders[seen],
+            "revenue": revenue[seen],
+            "first": self.first_orders()[seen],
+            "last": last[seen].astype("datetime64[us]"),
+        }
+
+    def first_orders(self) -> np.ndarray:
+        """First order time per customer code (NaT for customers without orders here)."""
+        codes = self.codes["customer"]
+        present = codes >= 0
+        first = np.full(len(self.labels["customer"]), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, codes[present], self.created_at[present].astype(np.int64))
+        first = first.astype("datetime64[us]")
+        first[first == np.datetime64(np.iinfo(np.int64).max, "us")] = np.datetime64("NaT")
+        return first
+
+
+async def load_order_frame(supabase, business_id, start, end) -> OrderFrame:
+    """Orders of ``business_id`` created in ``[start, end)`` (datetimes or dates) as one frame."""
+    start, end = _as_datetime(start), _as_datetime(end)
+    rows: List[Dict[str, Any]] = []
+    offset = 0
+    while True:
+        response = await execute_async(
+            supabase.table('orders').select('*')
+            .eq('business_id', business_id)
+            .gte('created_at', start.isoformat())
+            .lt('created_at', end.isoformat())
+            .order('created_at')
+            .range(offset, offset + _PAGE_SIZE - 1)
+        )
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < _PAGE_SIZE:
+            break
+        offset += _PAGE_SIZE
+    return OrderFrame.from_rows(rows)
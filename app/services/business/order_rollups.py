@@ -0,0 +1,280 @@
+"""
+Hourly order rollups for analytics.
+
+Stats endpoints and reports used to download every order in their window and
+sum them in Python, so a 365-day report on a busy restaurant fetched every
+order of the year. ``order_rollups_hourly`` (db/migrations/add_order_rollups.sql)
+holds one row per business x UTC hour x status x payment method with the order
+count, revenue, tax and a HyperLogLog sketch of the customers. A trigger on
+``orders`` keeps it current on every insert, update and delete, whichever code
+path wrote the order, so reading a window costs O(buckets).
+
+- Windows are answered at hour granularity: the start is rounded down and the
+  end up to the hour.
+- Unique customers are estimates (about 3% standard error). Sketches only
+  grow, so a customer stays counted in the status their order moved away from.
+- Until the migration has been applied, the same buckets are computed from the
+  raw orders, so callers see the same shape either way.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import logging
+import math
+
+import numpy as np
+
+from app.config.database import execute_async
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "order_rollups_hourly"
+ROLLUP_COLUMNS = "bucket_start,status,payment_method,order_count,revenue,tax"
+
+# HyperLogLog layout shared with order_rollup_sketch_add() in the migration
+SKETCH_REGISTERS = 1024
+_INDEX_BITS = 10
+_RANK_BITS = 53
+
+# PostgREST caps responses; rollup windows are read in pages of this size
+_PAGE_SIZE = 1000
+
+_fallback_logged = False
+
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def hour_floor(value: datetime) -> datetime:
+    return as_utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+def hour_ceil(value: datetime) -> datetime:
+    floored = hour_floor(value)
+    return floored if floored == as_utc(value) else floored + timedelta(hours=1)
+
+
+def parse_timestamp(value: str) -> datetime:
+    return as_utc(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+
+
+# ----------------------------------------------------------------------
+# Customer sketches
+# ----------------------------------------------------------------------
+
+def empty_sketch() -> np.ndarray:
+    return np.zeros(SKETCH_REGISTERS, dtype=np.uint8)
+
+
+def decode_sketch(value: Any) -> np.ndarray:
+    """Registers from a ``bytea`` column as PostgREST returns it (``"\\x0a00..."``)."""
+    if not value:
+        return empty_sketch()
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+    registers = np.frombuffer(value, dtype=np.uint8)
+    return registers if registers.size == SKETCH_REGISTERS else empty_sketch()
+
+
+def sketch_add(registers: np.ndarray, customer: Any) -> None:
+    """Add a customer to a sketch in place (used when rolling up raw orders)."""
+    if customer in (None, ""):
+        return
+    value = int.from_bytes(hashlib.blake2b(str(customer).encode(), digest_size=8).digest(), "big")
+    index = value & (SKETCH_REGISTERS - 1)
+    remaining = (value >> _INDEX_BITS) & ((1 << _RANK_BITS) - 1)
+    rank = _RANK_BITS - remaining.bit_length() + 1
+    if registers[index] < rank:
+        registers[index] = rank
+
+
+def estimate_customers(sketches: Iterable[np.ndarray]) -> int:
+    """Estimated number of distinct customers across ``sketches``."""
+    sketches = list(sketches)
+    if not sketches:
+        return 0
+    registers = np.maximum.reduce(sketches).astype(np.float64)
+
+    m = SKETCH_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.power(2.0, -registers))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction (linear counting)
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+
+# ----------------------------------------------------------------------
+# Reading rollups
+# ----------------------------------------------------------------------
+
+async def fetch_rollups(
+    supabase,
+    business_id,
+    start: datetime,
+    end: datetime,
+    with_customers: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Rollup rows of ``business_id`` for hours overlapping ``[start, end)``.
+
+    Each row has ``bucket_start`` (datetime), ``status``, ``payment_method``,
+    ``order_count``, ``revenue``, ``tax`` and, with ``with_customers``, a
+    ``customer_sketch``.
+    """
+    start, end = hour_floor(start), hour_ceil(end)
+    columns = ROLLUP_COLUMNS + (",customer_sketch" if with_customers else "")
+    rows: List[Dict[str, Any]] = []
+    try:
+        offset = 0
+        while True:
+            response = await execute_async(
+                supabase.table(ROLLUP_TABLE).select(columns)
+                .eq('business_id', str(business_id))
+                .gte('bucket_start', start.isoformat())
+                .lt('bucket_start', end.isoformat())
+                .order('bucket_start')
+                .range(offset, offset + _PAGE_SIZE - 1)
+            )
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < _PAGE_SIZE:
+                break
+            offset += _PAGE_SIZE
+    except Exception as e:
+        global _fallback_logged
+        if not _fallback_logged:
+            logger.warning(f"Order rollups unavailable, aggregating raw orders instead: {e}")
+            _fallback_logged = True
+        return await _rollups_from_orders(supabase, business_id, start, end, with_customers)
+
+    result = []
+    for row in rows:
+        if not row.get("order_count") and not float(row.get("revenue") or 0):
+            continue
+        bucket = {
+            "bucket_start": parse_timestamp(row["bucket_start"]),
+            "status": row.get("status") or "unknown",
+            "payment_method": row.get("payment_method") or "unknown",
+            "order_count": int(row.get("order_count") or 0),
+            "revenue": float(row.get("revenue") or 0),
+            "tax": float(row.get("tax") or 0),
+        }
+        if with_customers:
+            bucket["customer_sketch"] = decode_sketch(row.get("customer_sketch"))
+        result.append(bucket)
+    return result
+
+
+async def _rollups_from_orders(supabase, business_id, start: datetime, end: datetime, with_customers: bool) -> List[Dict[str, Any]]:
+    response = await execute_async(
+        supabase.table('orders').select('*')
+        .eq('business_id', business_id)
+        .gte('created_at', start.isoformat())
+        .lt('created_at', end.isoformat())
+    )
+    return rollup_orders(response.data or [], with_customers)
+
+
+def rollup_orders(orders: Iterable[Dict[str, Any]], with_customers: bool = False) -> List[Dict[str, Any]]:
+    """Bucket raw order rows exactly like the ``orders`` trigger does."""
+    buckets: Dict[tuple, Dict[str, Any]] = {}
+    for order in orders:
+        if not order.get("created_at"):
+            continue
+        key = (
+            hour_floor(parse_timestamp(order["created_at"])),
+            order.get("status") or "unknown",
+            order.get("payment_method") or "unknown",
+        )
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {
+                "bucket_start": key[0],
+                "status": key[1],
+                "payment_method": key[2],
+                "order_count": 0,
+                "revenue": 0.0,
+                "tax": 0.0,
+            }
+            if with_customers:
+                bucket["customer_sketch"] = empty_sketch()
+        bucket["order_count"] += 1
+        bucket["revenue"] += float(order.get("total_amount") or 0)
+        bucket["tax"] += float(order.get("tax_amount") or 0)
+        if with_customers:
+            sketch_add(bucket["customer_sketch"], order.get("customer_id") or order.get("customer_session_id"))
+    return sorted(buckets.values(), key=lambda bucket: bucket["bucket_start"])
+
+
+# ----------------------------------------------------------------------
+# Aggregation
+# ----------------------------------------------------------------------
+
+def summarize(rows: Iterable[Dict[str, Any]], statuses: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Totals and breakdowns over rollup rows (optionally only ``statuses``).
+
+    Revenue figures are unrounded; ``unique_customers`` is present only when
+    the rows carry sketches.
+    """
+    wanted = set(statuses) if statuses is not None else None
+    summary: Dict[str, Any] = {
+        "total_orders": 0,
+        "total_revenue": 0.0,
+        "total_tax": 0.0,
+        "status_counts": {},
+        "status_revenue": {},
+        "payment_method_counts": {},
+        "payment_method_revenue": {},
+        "daily": {},
+        "hourly": {},
+    }
+    sketches = []
+    has_sketches = False
+    for row in rows:
+        if wanted is not None and row["status"] not in wanted:
+            continue
+        count, revenue = row["order_count"], row["revenue"]
+        summary["total_orders"] += count
+        summary["total_revenue"] += revenue
+        summary["total_tax"] += row["tax"]
+
+        status = row["status"]
+        summary["status_counts"][status] = summary["status_counts"].get(status, 0) + count
+        summary["status_revenue"][status] = summary["status_revenue"].get(status, 0.0) + revenue
+
+        method = row["payment_method"]
+        summary["payment_method_counts"][method] = summary["payment_method_counts"].get(method, 0) + count
+        summary["payment_method_revenue"][method] = summary["payment_method_revenue"].get(method, 0.0) + revenue
+
+        for group, key in (("daily", row["bucket_start"].date().isoformat()), ("hourly", row["bucket_start"].hour)):
+            entry = summary[group].setdefault(key, {"count": 0, "revenue": 0.0})
+            entry["count"] += count
+            entry["revenue"] += revenue
+
+        if "customer_sketch" in row:
+            has_sketches = True
+            sketches.append(row["customer_sketch"])
+
+    summary["average_order_value"] = (
+        summary["total_revenue"] / summary["total_orders"] if summary["total_orders"] > 0 else 0
+    )
+    if has_sketches:
+        summary["unique_customers"] = estimate_customers(sketches)
+    return summary
+
+
+async def get_order_summary(
+    supabase,
+    business_id,
+    start: datetime,
+    end: datetime,
+    statuses: Optional[Iterable[str]] = None,
+    with_customers: bool = False,
+) -> Dict[str, Any]:
+    """``summarize`` over the rollups of ``[start, end)``."""
+    rows = await fetch_rollups(supabase, business_id, start, end, with_customers=with_customers)
+    return summarize(rows, statuses)
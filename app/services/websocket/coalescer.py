@@ -0,0 +1,89 @@
+"""Coalescing of high-frequency realtime updates into batched frames.
+
+During a rush the kitchen flips order statuses and preparation times many
+times a second, and each flip used to become its own frame on every kitchen
+display. Updates published through the coalescer are held per topic for a
+short window (``WEBSOCKET_COALESCE_WINDOW`` seconds). Updates with the same key
+(e.g. the same order and update type) are merged so only the latest state is
+sent, and the window's updates go out as one frame:
+
+- a single pending update is published unchanged
+- several are published as ``{"type": "batch", "topic": ..., "messages": [...]}``
+  in the order they were last updated
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+PublishCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class MessageCoalescer:
+    """Per-topic flush window that merges updates by key."""
+
+    def __init__(self, publish: PublishCallback, window: float = 0.05):
+        self._publish = publish
+        self.window = window
+
+        # Topic -> key -> merged message, in last-updated order
+        self._pending: Dict[str, "OrderedDict[Hashable, Dict[str, Any]]"] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"received": 0, "merged": 0, "frames": 0}
+
+    async def add(self, name: str, key: Hashable, message: Dict[str, Any]) -> None:
+        """Queue ``message`` for topic ``name``; a pending update with the same key is merged."""
+        self._counters["received"] += 1
+        if self.window <= 0:
+            self._counters["frames"] += 1
+            await self._publish(name, message)
+            return
+
+        pending = self._pending.setdefault(name, OrderedDict())
+        previous = pending.pop(key, None)
+        if previous is not None:
+            self._counters["merged"] += 1
+            message = {**previous, **message}
+        pending[key] = message
+
+        if name not in self._timers:
+            self._timers[name] = asyncio.get_running_loop().call_later(self.window, self._flush_later, name)
+
+    def _flush_later(self, name: str) -> None:
+        task = asyncio.get_running_loop().create_task(self.flush(name))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self, name: str) -> None:
+        """Publish everything pending for topic ``name`` now."""
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(name, None)
+        if not pending:
+            return
+
+        messages = list(pending.values())
+        if len(messages) == 1:
+            frame = messages[0]
+        else:
+            frame = {"type": "batch", "topic": name, "messages": messages}
+
+        self._counters["frames"] += 1
+        try:
+            await self._publish(name, frame)
+        except Exception as e:
+            logger.warning(f"Failed to publish coalesced updates for {name}: {e}")
+
+    async def flush_all(self) -> None:
+        """Publish every pending topic (shutdown)."""
+        for name in list(self._pending):
+            await self.flush(name)
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._counters)
+        stats["pending"] = sum(len(pending) for pending in self._pending.values())
+        return stats
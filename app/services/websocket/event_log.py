@@ -0,0 +1,261 @@
+"""Replayable per-business event log for WebSocket reconnects.
+
+Every message the gateway publishes on a business-scoped topic (``business``,
+``dashboard``, ``kitchen``) is stamped with an ``event_id`` and appended to a
+bounded per-business ring buffer. When Redis is configured, the event is also
+mirrored to a capped Redis stream (``<prefix>:events:<business_id>``), whose
+entry id becomes the event id, so ids increase across all workers.
+
+Event ids look like Redis stream ids (``"<ms>-<n>"``) and compare in that
+order. A reconnecting client sends the last id it applied and gets back every
+later event on its topics. If that id is no longer in the buffer (rolled over,
+or the worker restarted without Redis), replay reports a reset and the client
+reloads over REST. Live events may arrive while the replay is built, so
+clients ignore events whose id is not newer than the last one applied.
+
+Publishing waits for the XADD, so Redis calls are short-timeout and guarded by
+a breaker: after ``failure_threshold`` consecutive failures the mirror is
+skipped for ``retry_after`` seconds (local ids and the local buffer only)
+instead of stalling every publish on a Redis that is down.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+import orjson
+import redis.asyncio as redis
+
+from app.config.settings import settings
+from app.services.websocket.writer import dumps
+
+logger = logging.getLogger(__name__)
+
+# Topic kinds whose messages are logged for replay
+LOGGED_KINDS = ("business", "dashboard", "kitchen")
+
+# (event id, topic, message)
+Event = Tuple[str, str, Dict[str, Any]]
+
+
+def parse_event_id(event_id: str) -> Optional[Tuple[int, int]]:
+    """``"1700000000000-3"`` -> ``(1700000000000, 3)``; None if malformed."""
+    millis, _, sequence = str(event_id).partition("-")
+    if not (millis.isdigit() and sequence.isdigit()):
+        return None
+    return int(millis), int(sequence)
+
+
+class EventLog:
+    """Per-business ring buffers of published events, mirrored to Redis streams."""
+
+    def __init__(
+        self,
+        max_events: int = 1000,
+        redis_url: Optional[str] = None,
+        stream_prefix: str = "ws",
+        redis_timeout: float = 0.25,
+        failure_threshold: int = 3,
+        retry_after: float = 30.0,
+    ):
+        self.max_events = max_events
+        self.redis_url = redis_url
+        self.stream_prefix = stream_prefix
+        self.redis_timeout = redis_timeout
+        self.failure_threshold = failure_threshold
+        self.retry_after = retry_after
+
+        self._buffers: Dict[str, Deque[Event]] = {}
+        self._redis: Optional[redis.Redis] = None
+        self._last_local = (0, 0)
+        # Consecutive Redis failures, and until when (monotonic) Redis is skipped
+        self._failures = 0
+        self._skip_until = 0.0
+        self._counters = {
+            "recorded": 0,
+            "replays": 0,
+            "replayed_events": 0,
+            "resets": 0,
+            "redis_errors": 0,
+            "redis_skipped": 0,
+        }
+
+    def stream(self, business_id: str) -> str:
+        return f"{self.stream_prefix}:events:{business_id}"
+
+    async def start(self) -> None:
+        """Connect the Redis mirror (if configured)."""
+        if self.redis_url and self._redis is None:
+            self._redis = redis.from_url(self.redis_url)
+
+    async def stop(self) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception as e:
+                logger.warning(f"Error closing WebSocket event log: {e}")
+            self._redis = None
+
+    def _redis_available(self) -> bool:
+        if self._redis is None:
+            return False
+        if time.monotonic() < self._skip_until:
+            self._counters["redis_skipped"] += 1
+            return False
+        return True
+
+    def _redis_ok(self) -> None:
+        self._failures = 0
+
+    def _redis_failed(self, action: str, error: Exception) -> None:
+        self._counters["redis_errors"] += 1
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._failures = 0
+            self._skip_until = time.monotonic() + self.retry_after
+            logger.warning(f"WebSocket event log Redis failing ({error}); using local ids for {self.retry_after:.0f}s")
+        else:
+            logger.warning(f"{action}: {error}")
+
+    @staticmethod
+    def business_of(name: str) -> Optional[str]:
+        """Business id of a logged topic (``"kitchen:12"`` -> ``"12"``), else None."""
+        kind, _, key = name.partition(":")
+        return key if kind in LOGGED_KINDS and key else None
+
+    def _local_id(self) -> str:
+        # Same shape as a Redis stream id, strictly increasing within this process
+        millis = int(time.time() * 1000)
+        last_millis, last_sequence = self._last_local
+        if millis <= last_millis:
+            millis, sequence = last_millis, last_sequence + 1
+        else:
+            sequence = 0
+        self._last_local = (millis, sequence)
+        return f"{millis}-{sequence}"
+
+    async def record(self, name: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Log a message published on topic ``name``.
+
+        Returns the message to send: a copy stamped with ``event_id`` for
+        business-scoped topics, otherwise the message unchanged.
+        """
+        business_id = self.business_of(name)
+        if business_id is None:
+            return message
+
+        event_id = None
+        if self._redis_available():
+            try:
+                entry_id = await asyncio.wait_for(
+                    self._redis.xadd(
+                        self.stream(business_id),
+                        {"topic": name, "message": dumps(message)},
+                        maxlen=self.max_events,
+                        approximate=True,
+                    ),
+                    self.redis_timeout,
+                )
+                event_id = entry_id.decode() if isinstance(entry_id, bytes) else str(entry_id)
+                self._redis_ok()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._redis_failed("Could not mirror WebSocket event to Redis", e)
+        if event_id is None:
+            event_id = self._local_id()
+
+        stamped = dict(message)
+        stamped["event_id"] = event_id
+
+        buffer = self._buffers.get(business_id)
+        if buffer is None:
+            buffer = self._buffers[business_id] = deque(maxlen=self.max_events)
+        buffer.append((event_id, name, stamped))
+        self._counters["recorded"] += 1
+        return stamped
+
+    async def replay(self, business_id, last_event_id: str, topics: Iterable[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events after ``last_event_id`` on ``topics``, oldest first.
+
+        Returns None when ``last_event_id`` is no longer retained, i.e. the
+        client missed events that cannot be replayed and must reload.
+        """
+        business_id = str(business_id)
+        wanted = set(topics)
+        events = None
+
+        # The Redis stream holds every worker's events; the local buffer only this worker's
+        if self._redis_available():
+            try:
+                events = await self._replay_from_redis(business_id, last_event_id)
+                self._redis_ok()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._redis_failed("WebSocket event replay from Redis failed, using local buffer", e)
+                events = self._replay_from_buffer(business_id, last_event_id)
+        else:
+            events = self._replay_from_buffer(business_id, last_event_id)
+
+        if events is None:
+            self._counters["resets"] += 1
+            return None
+
+        messages = [message for _, name, message in events if name in wanted]
+        self._counters["replays"] += 1
+        self._counters["replayed_events"] += len(messages)
+        return messages
+
+    def _replay_from_buffer(self, business_id: str, last_event_id: str) -> Optional[List[Event]]:
+        buffer = self._buffers.get(business_id, ())
+        for index, (event_id, _, _) in enumerate(buffer):
+            if event_id == last_event_id:
+                return list(buffer)[index + 1:]
+        return None
+
+    async def _replay_from_redis(self, business_id: str, last_event_id: str) -> Optional[List[Event]]:
+        if parse_event_id(last_event_id) is None:
+            return None
+        entries = await asyncio.wait_for(
+            self._redis.xrange(self.stream(business_id), min=last_event_id, max="+"),
+            self.redis_timeout,
+        )
+
+        events: List[Event] = []
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else str(entry_id)
+            topic_name = fields.get(b"topic", fields.get("topic"))
+            if isinstance(topic_name, bytes):
+                topic_name = topic_name.decode()
+            message = orjson.loads(fields.get(b"message", fields.get("message")))
+            message["event_id"] = entry_id
+            events.append((entry_id, topic_name, message))
+
+        # The client's own last event must still be in the stream, or events were trimmed
+        if not events or events[0][0] != last_event_id:
+            return None
+        return events[1:]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._counters)
+        stats["businesses"] = len(self._buffers)
+        stats["buffered"] = sum(len(buffer) for buffer in self._buffers.values())
+        stats["redis"] = self._redis is not None and time.monotonic() >= self._skip_until
+        return stats
+
+
+def create_event_log() -> EventLog:
+    """Event log from settings (Redis mirror only when Redis is configured)."""
+    redis_url = settings.REDIS_URL if settings.WEBSOCKET_EVENT_LOG_REDIS else None
+    return EventLog(
+        max_events=settings.WEBSOCKET_EVENT_LOG_SIZE,
+        redis_url=redis_url or None,
+        stream_prefix=settings.WEBSOCKET_PUBSUB_CHANNEL_PREFIX,
+        redis_timeout=settings.WEBSOCKET_EVENT_LOG_REDIS_TIMEOUT,
+        failure_threshold=settings.WEBSOCKET_EVENT_LOG_REDIS_FAILURES,
+        retry_after=settings.WEBSOCKET_EVENT_LOG_REDIS_RETRY_SECONDS,
+    )
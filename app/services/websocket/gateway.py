@@ -0,0 +1,418 @@
+"""Realtime gateway: the single owner of every WebSocket in a worker.
+
+Sockets subscribe to topics rather than being tracked by each endpoint:
+
+- ``business:<id>``: business-wide feed (orders, tables, inventory, QR codes)
+- ``dashboard:<id>``: dashboard-only events
+- ``kitchen:<id>``: kitchen display events
+- ``table:<id>``: a single table's customer view
+- ``session:<id>``: one chat/dashboard session (possibly several tabs)
+
+Every message, whatever its topic, goes through the same path: serialized
+once, queued on each subscriber's ``ConnectionWriter``, and published once on
+the Redis bus for sockets held by other workers. One scheduler task sends the
+server heartbeat for all sockets, and ``stats()`` is the one metrics surface
+for realtime traffic.
+
+Heartbeat: every ``WEBSOCKET_HEARTBEAT_INTERVAL`` seconds each socket gets a
+``{"type": "ping"}`` frame. Any frame from the client (its own ``ping``, a
+``pong`` reply, or a regular message) marks it alive. Sockets that have sent a
+heartbeat at least once and then stay silent for longer than
+``WEBSOCKET_HEARTBEAT_TIMEOUT`` (half-open connections from tablets that
+dropped off Wi-Fi) are reaped in bulk on the same tick and closed with 4408.
+Receive-only clients that never answer (kitchen displays, table views) are
+left to the server's protocol-level ping/pong instead.
+
+Registries are dicts of sets with reverse indexes (topic -> sockets and
+socket -> topics), so connect, disconnect and (un)subscribe are O(1).
+
+Services can also ``add_listener`` on a topic to receive its messages in
+every worker, whether or not that worker has sockets subscribed.
+
+High-frequency updates go through ``publish_coalesced``: they are merged by
+key over a short window and sent as one batched frame (see ``coalescer``).
+
+Messages on business-scoped topics carry an ``event_id`` and are kept in a
+replayable log (see ``event_log``); a reconnecting client calls ``resume``
+with its last id to receive what it missed.
+
+Slow work triggered by a socket message (AI chat) runs through ``run_task``
+on a bounded pool, so the socket keeps serving its other messages.
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from fastapi import WebSocket
+import asyncio
+import logging
+import time
+
+from app.config.settings import settings
+from app.services.websocket.coalescer import MessageCoalescer
+from app.services.websocket.event_log import EventLog, create_event_log
+from app.services.websocket.pubsub import RedisBroadcastBus, create_broadcast_bus
+from app.services.websocket.tasks import SocketTaskPool
+from app.services.websocket.writer import ConnectionWriter, dumps
+
+logger = logging.getLogger(__name__)
+
+# Close code for sockets reaped by the heartbeat (application range, mirrors HTTP 408)
+HEARTBEAT_TIMEOUT_CLOSE_CODE = 4408
+
+BUSINESS = "business"
+DASHBOARD = "dashboard"
+KITCHEN = "kitchen"
+TABLE = "table"
+SESSION = "session"
+
+
+def topic(kind: str, key) -> str:
+    """Topic name, e.g. ``topic(KITCHEN, 12) == "kitchen:12"``."""
+    return f"{kind}:{key}"
+
+
+class RealtimeGateway:
+    """Topic-based WebSocket registry, fan-out and heartbeat for one worker."""
+
+    def __init__(self):
+        # Outbound queue + writer task per socket, keyed by id(websocket)
+        self.writers: Dict[int, ConnectionWriter] = {}
+        # Topic -> sockets subscribed to it, and the reverse
+        self.topics: Dict[str, Set[int]] = {}
+        self._socket_topics: Dict[int, Set[str]] = {}
+        # Topic -> in-process handlers (kept subscribed on the bus permanently)
+        self.listeners: Dict[str, List[Callable[[Dict[str, Any]], Awaitable[None]]]] = {}
+        # Counters of writers that have already gone away
+        self._closed_totals = {"sent": 0, "dropped": 0}
+        self.reaped = 0
+        # Flush window for publish_coalesced
+        self.coalescer = MessageCoalescer(self.publish, window=settings.WEBSOCKET_COALESCE_WINDOW)
+        # Background jobs started by socket messages
+        self.tasks = SocketTaskPool(
+            max_concurrency=settings.WEBSOCKET_TASK_CONCURRENCY,
+            max_per_socket=settings.WEBSOCKET_TASKS_PER_SOCKET,
+        )
+        # Replay buffer for reconnecting clients
+        self.events: EventLog = create_event_log()
+        # Cross-worker fan-out; None until started (or when disabled)
+        self.bus: Optional[RedisBroadcastBus] = None
+        self._scheduler: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Start the heartbeat scheduler and the cross-worker bus (application startup)."""
+        if self._scheduler is None:
+            self._scheduler = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+        await self.events.start()
+
+        bus = create_broadcast_bus()
+        if bus is None:
+            return
+        try:
+            await bus.start(self._deliver_local)
+        except Exception as e:
+            logger.warning(f"WebSocket broadcast bus unavailable, broadcasts stay worker-local: {e}")
+            await bus.stop()
+            return
+        self.bus = bus
+        for name in set(self.topics) | set(self.listeners):
+            await bus.subscribe_topic(name)
+
+    async def stop(self):
+        """Stop the scheduler and disconnect the bus (application shutdown)."""
+        await self.coalescer.flush_all()
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            try:
+                await self._scheduler
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._scheduler = None
+        await self.events.stop()
+        if self.bus is not None:
+            await self.bus.stop()
+            self.bus = None
+
+    def _bus_call(self, method: str, name: str):
+        """Run a bus (un)subscription from sync code without blocking the caller."""
+        if self.bus is None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(getattr(self.bus, method)(name))
+        except RuntimeError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Registry
+    # ------------------------------------------------------------------
+
+    async def connect(self, websocket: WebSocket, topics: Iterable[str] = ()) -> ConnectionWriter:
+        """Accept a socket and subscribe it to ``topics``."""
+        await websocket.accept()
+        socket_key = id(websocket)
+        writer = ConnectionWriter(
+            websocket,
+            max_queue=settings.WEBSOCKET_SEND_QUEUE_SIZE,
+            policy=settings.WEBSOCKET_SLOW_CONSUMER_POLICY,
+            on_close=lambda closed: self._writer_closed(socket_key, closed),
+        )
+        self.writers[socket_key] = writer
+        self._socket_topics[socket_key] = set()
+        self.subscribe(websocket, *topics)
+        return writer
+
+    def _writer_closed(self, socket_key: int, writer: ConnectionWriter):
+        # The writer gave up on its socket (send error or slow consumer)
+        if self.writers.get(socket_key) is writer:
+            self._remove_socket(socket_key)
+
+    def _remove_socket(self, socket_key: int):
+        self.tasks.cancel_socket(socket_key)
+        writer = self.writers.pop(socket_key, None)
+        if writer is not None:
+            writer.close()
+            self._closed_totals["sent"] += writer.sent
+            self._closed_totals["dropped"] += writer.dropped
+
+        for name in self._socket_topics.pop(socket_key, ()):
+            self._leave(socket_key, name)
+
+    def _leave(self, socket_key: int, name: str):
+        sockets = self.topics.get(name)
+        if sockets is None:
+            return
+        sockets.discard(socket_key)
+        if not sockets:
+            del self.topics[name]
+            if name not in self.listeners:
+                self._bus_call("unsubscribe_topic", name)
+
+    def disconnect(self, websocket: WebSocket):
+        """Unregister a socket and leave all its topics."""
+        self._remove_socket(id(websocket))
+
+    def subscribe(self, websocket: WebSocket, *topics: str):
+        """Add a connected socket to ``topics``."""
+        socket_key = id(websocket)
+        joined = self._socket_topics.get(socket_key)
+        if joined is None:
+            return
+        for name in topics:
+            if name not in self.topics:
+                self.topics[name] = set()
+                if name not in self.listeners:
+                    self._bus_call("subscribe_topic", name)
+            self.topics[name].add(socket_key)
+            joined.add(name)
+
+    def unsubscribe(self, websocket: WebSocket, *topics: str):
+        """Remove a socket from ``topics``."""
+        socket_key = id(websocket)
+        joined = self._socket_topics.get(socket_key, set())
+        for name in topics:
+            joined.discard(name)
+            self._leave(socket_key, name)
+
+    def add_listener(self, name: str, callback: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Call ``callback(message)`` for every message published on topic ``name``, from any worker."""
+        if name not in self.listeners:
+            self.listeners[name] = []
+            if name not in self.topics:
+                self._bus_call("subscribe_topic", name)
+        self.listeners[name].append(callback)
+
+    # ------------------------------------------------------------------
+    # Fan-out
+    # ------------------------------------------------------------------
+
+    async def _deliver_local(self, name: Optional[str], message: Dict[str, Any]):
+        """Queue for the sockets this worker owns (name=None means every socket)."""
+        for callback in self.listeners.get(name, ()):
+            try:
+                await callback(message)
+            except Exception as e:
+                logger.error(f"Realtime listener for {name} failed: {e}")
+
+        if name is None:
+            writers = list(self.writers.values())
+        else:
+            writers = [self.writers[socket_key] for socket_key in self.topics.get(name, ())]
+        if not writers:
+            return
+        # Serialize once; every subscriber gets the same frame
+        frame = dumps(message)
+        for writer in writers:
+            writer.enqueue(frame)
+
+    async def publish(self, name: str, message: Dict[str, Any]):
+        """Send ``message`` to every subscriber of topic ``name``, on every worker."""
+        message = await self.events.record(name, message)
+        if self.bus is not None:
+            self.bus.publish(name, message)
+        await self._deliver_local(name, message)
+
+    async def publish_local(self, name: str, message: Dict[str, Any]):
+        """Send ``message`` to subscribers of topic ``name`` on this worker only."""
+        await self._deliver_local(name, message)
+
+    async def publish_coalesced(self, name: str, key, message: Dict[str, Any]):
+        """
+        Publish ``message`` on topic ``name`` after the coalescing window.
+
+        Pending messages on the topic with the same ``key`` are merged into
+        one (latest values win); the window's messages go out as one frame.
+        """
+        await self.coalescer.add(name, key, message)
+
+    async def broadcast_to_all(self, message: Dict[str, Any]):
+        """Send ``message`` to every connected socket, on every worker."""
+        if self.bus is not None:
+            self.bus.publish(None, message)
+        await self._deliver_local(None, message)
+
+    async def broadcast_to_business(self, business_id, message: Dict[str, Any]):
+        """Send ``message`` to the business-wide topic."""
+        await self.publish(topic(BUSINESS, business_id), message)
+
+    async def send_to_session(self, session_id: str, message: Dict[str, Any]):
+        """Send ``message`` to every socket of a session."""
+        await self.publish(topic(SESSION, session_id), message)
+
+    async def send_personal_message(self, message: Dict[str, Any], websocket: WebSocket):
+        """Queue ``message`` for one socket only."""
+        writer = self.writers.get(id(websocket))
+        if writer is not None:
+            writer.enqueue(dumps(message))
+
+    def run_task(
+        self,
+        websocket: WebSocket,
+        job_id: str,
+        job: Callable[[], Awaitable[Any]],
+        on_cancel: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> bool:
+        """Run ``job()`` on the task pool for this socket; False if the socket has too many jobs."""
+        return self.tasks.submit(id(websocket), job_id, job, on_cancel)
+
+    def cancel_task(self, websocket: WebSocket, job_id: str) -> bool:
+        """Cancel a job started with ``run_task``."""
+        return self.tasks.cancel(id(websocket), job_id)
+
+    async def resume(self, websocket: WebSocket, business_id, last_event_id: Optional[str]):
+        """
+        Send a reconnecting socket the events it missed on its topics.
+
+        Replies ``{"type": "replay", "events": [...]}``, or
+        ``{"type": "replay_reset"}`` when ``last_event_id`` has rolled out of
+        the log and the client has to reload over REST.
+        """
+        joined = self._socket_topics.get(id(websocket), set())
+        events = None
+        if last_event_id:
+            events = await self.events.replay(business_id, last_event_id, joined)
+        if events is None:
+            await self.send_personal_message({"type": "replay_reset"}, websocket)
+            return
+        await self.send_personal_message({"type": "replay", "events": events}, websocket)
+
+    # ------------------------------------------------------------------
+    # Heartbeat
+    # ------------------------------------------------------------------
+
+    def touch(self, websocket: WebSocket):
+        """Record that the client sent something (keeps the socket from being reaped)."""
+        writer = self.writers.get(id(websocket))
+        if writer is not None:
+            writer.last_seen = time.monotonic()
+
+    async def handle_heartbeat(self, websocket: WebSocket, message: Dict[str, Any]) -> bool:
+        """
+        Mark the socket alive and handle heartbeat frames.
+
+        Call for every message received. Answers a client ``ping`` and absorbs
+        a ``pong``; returns True if ``message`` was one of those.
+        """
+        self.touch(websocket)
+        message_type = message.get("type")
+        if message_type in ("ping", "pong"):
+            writer = self.writers.get(id(websocket))
+            if writer is not None:
+                writer.heartbeats = True
+        if message_type == "ping":
+            await self.send_personal_message({"type": "pong"}, websocket)
+            return True
+        return message_type == "pong"
+
+    def reap_idle(self) -> int:
+        """
+        Close and unregister every heartbeating socket silent for longer than
+        the heartbeat timeout. Sockets that never sent a ping/pong are skipped.
+        """
+        timeout = settings.WEBSOCKET_HEARTBEAT_TIMEOUT
+        if not timeout:
+            return 0
+        cutoff = time.monotonic() - timeout
+        dead = [
+            socket_key for socket_key, writer in self.writers.items()
+            if writer.heartbeats and writer.last_seen < cutoff
+        ]
+        for socket_key in dead:
+            writer = self.writers.get(socket_key)
+            if writer is not None:
+                writer.close(HEARTBEAT_TIMEOUT_CLOSE_CODE)
+                self._remove_socket(socket_key)
+        if dead:
+            self.reaped += len(dead)
+            logger.info(f"Reaped {len(dead)} idle WebSocket connections")
+        return len(dead)
+
+    async def _heartbeat_loop(self):
+        """Single scheduler for every socket's server heartbeat and the idle reaper."""
+        interval = settings.WEBSOCKET_HEARTBEAT_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reap_idle()
+                if self.writers:
+                    frame = dumps({"type": "ping", "ts": time.time()})
+                    for writer in list(self.writers.values()):
+                        writer.enqueue(frame)
+            except Exception as e:
+                logger.warning(f"WebSocket heartbeat failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection, topic and queue counters for this worker, plus bus counters."""
+        writers = list(self.writers.values())
+        # Only heartbeating sockets refresh last_seen. Stale: missed at least one
+        # heartbeat round but not yet reaped
+        heartbeating = [writer for writer in writers if writer.heartbeats]
+        stale_before = time.monotonic() - settings.WEBSOCKET_HEARTBEAT_INTERVAL
+        topics_by_kind: Dict[str, int] = {}
+        for name in self.topics:
+            kind = name.split(":", 1)[0]
+            topics_by_kind[kind] = topics_by_kind.get(kind, 0) + 1
+        return {
+            "connections": len(writers),
+            "live": sum(1 for writer in heartbeating if writer.last_seen >= stale_before),
+            "stale": sum(1 for writer in heartbeating if writer.last_seen < stale_before),
+            # Receive-only sockets, left to the protocol-level ping/pong
+            "no_heartbeat": len(writers) - len(heartbeating),
+            "reaped": self.reaped,
+            "topics": topics_by_kind,
+            "queued": sum(writer.queued for writer in writers),
+            "sent": self._closed_totals["sent"] + sum(writer.sent for writer in writers),
+            "dropped": self._closed_totals["dropped"] + sum(writer.dropped for writer in writers),
+            "coalescer": self.coalescer.stats(),
+            "events": self.events.stats(),
+            "tasks": self.tasks.stats(),
+            "bus": self.bus.stats() if self.bus is not None else None,
+        }
+
+
+# Create global instance
+gateway = RealtimeGateway()
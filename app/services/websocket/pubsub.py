@@ -0,0 +1,216 @@
+"""Redis pub/sub bus that fans WebSocket broadcasts out across worker processes.
+
+Each gunicorn worker only holds its own sockets, so a broadcast made on one
+worker must reach the others. Every worker subscribes to the channels
+(``<prefix>:topic:<topic>``) of topics it has local subscribers for, plus
+``<prefix>:all``. A broadcast is delivered to local sockets directly and
+published once; subscribers skip messages that originated from themselves.
+
+Publishing goes through a bounded queue drained by a background task, so a
+slow or unavailable Redis never stalls the request that triggered the
+broadcast: when the queue is full the oldest pending message is dropped.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import uuid
+
+import orjson
+import redis.asyncio as redis
+
+from app.config.settings import settings
+from app.services.websocket.writer import dumps
+
+logger = logging.getLogger(__name__)
+
+# (topic or None for "all", message)
+DeliverCallback = Callable[[Optional[str], Dict[str, Any]], Awaitable[None]]
+
+
+class RedisBroadcastBus:
+    """Cross-process broadcast bus on Redis pub/sub."""
+
+    def __init__(
+        self,
+        redis_url: str,
+        channel_prefix: str = "ws",
+        queue_size: int = 1000,
+        publish_timeout: float = 1.0,
+    ):
+        self.redis_url = redis_url
+        self.channel_prefix = channel_prefix
+        self.publish_timeout = publish_timeout
+        self.origin = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._redis: Optional[redis.Redis] = None
+        self._pubsub = None
+        self._deliver: Optional[DeliverCallback] = None
+        self._queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue(maxsize=queue_size)
+        self._channels: Set[str] = set()
+        self._tasks = []
+        self._subscribed = asyncio.Event()
+        self._counters = {
+            "published": 0,
+            "received": 0,
+            "dropped": 0,
+            "publish_errors": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def topic_channel(self, topic: str) -> str:
+        return f"{self.channel_prefix}:topic:{topic}"
+
+    @property
+    def all_channel(self) -> str:
+        return f"{self.channel_prefix}:all"
+
+    async def start(self, deliver: DeliverCallback) -> None:
+        """Connect to Redis and start the publisher and listener tasks."""
+        if self.running:
+            return
+        self._deliver = deliver
+        self._redis = redis.from_url(self.redis_url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._channels.add(self.all_channel)
+        await self._pubsub.subscribe(*self._channels)
+        self._subscribed.set()
+
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._publish_loop()),
+            loop.create_task(self._listen_loop()),
+        ]
+        logger.info(f"WebSocket broadcast bus connected ({self.origin})")
+
+    async def stop(self) -> None:
+        """Cancel background tasks and close the Redis connection."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        self._subscribed.clear()
+
+        try:
+            if self._pubsub is not None:
+                await self._pubsub.close()
+            if self._redis is not None:
+                await self._redis.close()
+        except Exception as e:
+            logger.warning(f"Error closing WebSocket broadcast bus: {e}")
+        self._pubsub = None
+        self._redis = None
+
+    async def subscribe_topic(self, topic: str) -> None:
+        """Start receiving broadcasts for a topic this worker now has subscribers for."""
+        channel = self.topic_channel(topic)
+        if channel in self._channels:
+            return
+        self._channels.add(channel)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.subscribe(channel)
+            except Exception as e:
+                logger.warning(f"Could not subscribe to {channel}: {e}")
+
+    async def unsubscribe_topic(self, topic: str) -> None:
+        """Stop receiving broadcasts for a topic with no local subscribers left."""
+        channel = self.topic_channel(topic)
+        if channel not in self._channels:
+            return
+        self._channels.discard(channel)
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(channel)
+            except Exception as e:
+                logger.warning(f"Could not unsubscribe from {channel}: {e}")
+
+    def publish(self, topic: Optional[str], message: Dict[str, Any]) -> None:
+        """
+        Queue a broadcast for the other workers (``topic=None`` means all).
+
+        Never blocks: if Redis is falling behind, the oldest queued message is
+        dropped to make room.
+        """
+        if not self.running:
+            return
+
+        channel = self.all_channel if topic is None else self.topic_channel(topic)
+        payload = dumps({"origin": self.origin, "message": message})
+
+        if self._queue.full():
+            try:
+                self._queue.get_nowait()
+                self._counters["dropped"] += 1
+            except asyncio.QueueEmpty:
+                pass
+        self._queue.put_nowait((channel, payload))
+
+    async def _publish_loop(self) -> None:
+        while True:
+            channel, payload = await self._queue.get()
+            try:
+                await asyncio.wait_for(self._redis.publish(channel, payload), self.publish_timeout)
+                self._counters["published"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._counters["publish_errors"] += 1
+                logger.warning(f"WebSocket broadcast publish to {channel} failed: {e}")
+
+    async def _listen_loop(self) -> None:
+        topic_prefix = f"{self.channel_prefix}:topic:"
+        while True:
+            try:
+                await self._subscribed.wait()
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket broadcast listener error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+
+            if not message or message.get("type") != "message":
+                continue
+
+            try:
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                envelope = orjson.loads(message["data"])
+                if envelope.get("origin") == self.origin:
+                    continue
+
+                self._counters["received"] += 1
+                topic = channel[len(topic_prefix):] if channel.startswith(topic_prefix) else None
+                await self._deliver(topic, envelope["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Dropping malformed WebSocket broadcast: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._counters)
+        stats["running"] = self.running
+        stats["queued"] = self._queue.qsize()
+        stats["channels"] = len(self._channels)
+        return stats
+
+
+def create_broadcast_bus() -> Optional[RedisBroadcastBus]:
+    """Broadcast bus from settings, or None when cross-worker fan-out is disabled."""
+    if not settings.WEBSOCKET_PUBSUB_ENABLED or not settings.REDIS_URL:
+        return None
+    return RedisBroadcastBus(
+        settings.REDIS_URL,
+        channel_prefix=settings.WEBSOCKET_PUBSUB_CHANNEL_PREFIX,
+        queue_size=settings.WEBSOCKET_PUBSUB_QUEUE_SIZE,
+    )
@@ -0,0 +1,103 @@
+"""Bounded pool for long-running work started from a WebSocket message.
+
+Handling an AI chat message inline in a socket's receive loop meant that
+socket answered nothing else (heartbeats, dashboard actions) until the LLM
+finished. Such work is submitted here instead and runs as its own task:
+
+- at most ``max_concurrency`` jobs run at once per worker; the rest wait
+- a socket may have at most ``max_per_socket`` jobs queued or running
+- a job can be cancelled by id, and a socket's jobs are cancelled when it
+  disconnects
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SocketTaskPool:
+    """Concurrency-limited background jobs owned by sockets."""
+
+    def __init__(self, max_concurrency: int = 8, max_per_socket: int = 2):
+        self.max_concurrency = max_concurrency
+        self.max_per_socket = max_per_socket
+
+        # socket key -> job id -> task
+        self._jobs: Dict[int, Dict[str, asyncio.Task]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self._counters = {"submitted": 0, "rejected": 0, "cancelled": 0, "failed": 0}
+
+    def submit(
+        self,
+        socket_key: int,
+        job_id: str,
+        job: Callable[[], Awaitable[Any]],
+        on_cancel: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> bool:
+        """
+        Run ``job()`` in the background for a socket.
+
+        Returns False (and starts nothing) if the socket already has
+        ``max_per_socket`` jobs or one with the same id. ``on_cancel`` runs if
+        the job is cancelled.
+        """
+        jobs = self._jobs.setdefault(socket_key, {})
+        if len(jobs) >= self.max_per_socket or job_id in jobs:
+            self._counters["rejected"] += 1
+            return False
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        task = asyncio.get_running_loop().create_task(self._run(job, on_cancel))
+        jobs[job_id] = task
+        task.add_done_callback(lambda _: self._forget(socket_key, job_id, task))
+        self._counters["submitted"] += 1
+        return True
+
+    async def _run(self, job, on_cancel) -> None:
+        try:
+            async with self._semaphore:
+                self.running += 1
+                try:
+                    await job()
+                finally:
+                    self.running -= 1
+        except asyncio.CancelledError:
+            self._counters["cancelled"] += 1
+            if on_cancel is not None:
+                try:
+                    await on_cancel()
+                except Exception:
+                    pass
+            raise
+        except Exception as e:
+            self._counters["failed"] += 1
+            logger.error(f"WebSocket background job failed: {e}")
+
+    def _forget(self, socket_key: int, job_id: str, task: asyncio.Task) -> None:
+        jobs = self._jobs.get(socket_key)
+        if jobs is not None and jobs.get(job_id) is task:
+            del jobs[job_id]
+            if not jobs:
+                del self._jobs[socket_key]
+
+    def cancel(self, socket_key: int, job_id: str) -> bool:
+        """Cancel one job; returns False if it is not queued or running."""
+        task = self._jobs.get(socket_key, {}).get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def cancel_socket(self, socket_key: int) -> None:
+        """Cancel every job of a socket that went away."""
+        for task in list(self._jobs.pop(socket_key, {}).values()):
+            task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self._counters)
+        stats["running"] = self.running
+        stats["pending"] = max(0, sum(len(jobs) for jobs in self._jobs.values()) - self.running)
+        return stats
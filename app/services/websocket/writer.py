@@ -0,0 +1,125 @@
+"""Per-socket outbound queues for WebSocket broadcasts.
+
+Broadcasting used to ``await websocket.send_json`` on each subscriber in
+turn, so one slow tablet delayed everyone behind it and a single send error
+aborted the loop. Now every connection gets a ``ConnectionWriter``: a bounded
+queue drained by its own task. Broadcasts serialize the message once and
+enqueue the same text frame to every subscriber without waiting on any of
+them.
+
+When a consumer cannot keep up, ``WEBSOCKET_SLOW_CONSUMER_POLICY`` decides:
+
+- ``"drop_oldest"``: discard the oldest queued frame to make room
+- ``"disconnect"``: close the socket (code 1013) so the client reconnects
+"""
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+import orjson
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Close code for "try again later" (RFC 6455 / IANA registry)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def dumps(message: Any) -> str:
+    """Serialize a message to a JSON text frame (datetimes, UUIDs, numpy handled)."""
+    return orjson.dumps(
+        message,
+        default=str,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    ).decode()
+
+
+class ConnectionWriter:
+    """Bounded outbound queue plus writer task for one WebSocket."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_queue: int = 256,
+        policy: str = DROP_OLDEST,
+        on_close: Optional[Callable[["ConnectionWriter"], None]] = None,
+    ):
+        self.websocket = websocket
+        self.policy = policy
+        self.on_close = on_close
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        # Monotonic time of the last frame received from the client
+        self.last_seen = time.monotonic()
+        # Whether the client has sent a heartbeat (ping/pong) frame, i.e. can be reaped when silent
+        self.heartbeats = False
+
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def enqueue(self, frame: str) -> bool:
+        """
+        Queue a serialized frame without blocking.
+
+        Returns False if the frame was not queued (writer closed, or the
+        consumer was disconnected for being too slow).
+        """
+        if self.closed:
+            return False
+
+        if self._queue.full():
+            if self.policy == DISCONNECT:
+                logger.warning("Disconnecting slow WebSocket consumer (send queue full)")
+                self.close(SLOW_CONSUMER_CLOSE_CODE)
+                return False
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+
+        self._queue.put_nowait(frame)
+        return True
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                frame = await self._queue.get()
+                await self.websocket.send_text(frame)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket send failed, closing connection: {e}")
+            self.close()
+
+    def close(self, code: Optional[int] = None) -> None:
+        """Stop the writer; optionally close the socket with ``code``."""
+        if self.closed:
+            return
+        self.closed = True
+
+        if asyncio.current_task() is not self._task:
+            self._task.cancel()
+        if code is not None:
+            asyncio.get_running_loop().create_task(self._close_socket(code))
+        if self.on_close is not None:
+            self.on_close(self)
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self.queued, "sent": self.sent, "dropped": self.dropped}
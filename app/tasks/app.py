@@ -9,7 +9,7 @@ from app.config import celery_config as cfg
 
 
 def create_celery_app() -> Celery:
-    app = Celery("x_sevenai")
+    app = Celery("x_sevenai", include=["app.tasks.embedding_tasks"])
 
     # Core broker/backend
     app.conf.broker_url = getattr(settings, "CELERY_BROKER_URL", None) or cfg.broker_url
@@ -0,0 +1,129 @@
+"""Background tasks that keep the RAG vector index in sync with catalogue rows.
+
+Catalogue writes (menu endpoints, MenuService, business registration and
+config updates) call the ``schedule_*`` helpers, which enqueue re-embedding of
+only the affected rows on the dedicated ``embeddings`` queue. Search embeds
+rows missing from the index itself (a bounded number per request) until
+these tasks catch up.
+
+The index is a set of files in ``VECTOR_INDEX_DIR`` on the local disk, so the
+worker consuming this queue must run on the same host as the API (start.sh).
+"""
+from functools import partial
+from typing import Iterable, List, Optional
+import asyncio
+import logging
+import threading
+import time
+
+from app.config.database import get_db_executor, get_supabase_client
+from app.tasks.app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# Searches that hit unindexed rows queue them at most once per window
+_REQUEUE_AFTER_SECONDS = 60.0
+_recently_queued = {}
+_recently_queued_lock = threading.Lock()
+
+
+def _get_rag_search():
+    from app.services.ai.rag_search import RAGSearch
+    return RAGSearch(get_supabase_client())
+
+
+@celery_app.task
+def reindex_businesses(business_ids: List[str]) -> int:
+    """
+    Re-embed the given businesses and upsert them into the business index.
+    Inactive or deleted businesses are removed from the index.
+    """
+    try:
+        count = _get_rag_search().refresh_business_embeddings(business_ids)
+        logger.info(f"Re-indexed {count} of {len(business_ids)} businesses")
+        return count
+    except Exception as e:
+        logger.error(f"Error re-indexing businesses {business_ids}: {e}")
+        raise
+
+
+@celery_app.task
+def reindex_menu_items(menu_item_ids: List[str]) -> int:
+    """
+    Re-embed the given menu items and upsert them into the menu item index.
+    Unavailable or deleted items are removed from the index.
+    """
+    try:
+        count = _get_rag_search().refresh_menu_item_embeddings(menu_item_ids)
+        logger.info(f"Re-indexed {count} of {len(menu_item_ids)} menu items")
+        return count
+    except Exception as e:
+        logger.error(f"Error re-indexing menu items {menu_item_ids}: {e}")
+        raise
+
+
+@celery_app.task
+def rebuild_vector_index() -> dict:
+    """Rebuild both vector indexes from scratch (periodic drift correction)."""
+    counts = _get_rag_search().build_vector_index()
+    logger.info(f"Rebuilt vector indexes: {counts}")
+    return counts
+
+
+def _schedule(task, index_name: str, ids: Iterable, dedupe: bool) -> Optional[str]:
+    pending = list(dict.fromkeys(str(item_id) for item_id in ids if item_id is not None))
+
+    if dedupe:
+        now = time.monotonic()
+        with _recently_queued_lock:
+            fresh = []
+            for item_id in pending:
+                key = (index_name, item_id)
+                if now - _recently_queued.get(key, float("-inf")) >= _REQUEUE_AFTER_SECONDS:
+                    _recently_queued[key] = now
+                    fresh.append(item_id)
+            if len(_recently_queued) > 10000:
+                cutoff = now - _REQUEUE_AFTER_SECONDS
+                for key in [key for key, queued_at in _recently_queued.items() if queued_at < cutoff]:
+                    del _recently_queued[key]
+        pending = fresh
+
+    if not pending:
+        return None
+
+    try:
+        result = task.apply_async(args=[pending], retry=False)
+        return result.id
+    except Exception as e:
+        # Indexing is best-effort; the periodic rebuild picks up anything missed
+        logger.warning(f"Could not queue {index_name} re-index for {len(pending)} rows: {e}")
+        with _recently_queued_lock:
+            for item_id in pending:
+                _recently_queued.pop((index_name, item_id), None)
+        return None
+
+
+def schedule_business_reindex(business_ids: Iterable, dedupe: bool = False) -> Optional[str]:
+    """Queue re-embedding of changed businesses. Returns the task id, if queued."""
+    return _schedule(reindex_businesses, "businesses", business_ids, dedupe)
+
+
+def schedule_menu_item_reindex(menu_item_ids: Iterable, dedupe: bool = False) -> Optional[str]:
+    """Queue re-embedding of changed menu items. Returns the task id, if queued."""
+    return _schedule(reindex_menu_items, "menu_items", menu_item_ids, dedupe)
+
+
+async def _schedule_async(task, index_name: str, ids: Iterable, dedupe: bool) -> Optional[str]:
+    # Publishing to the broker is a blocking round trip; keep it off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(_schedule, task, index_name, list(ids), dedupe))
+
+
+async def schedule_business_reindex_async(business_ids: Iterable, dedupe: bool = False) -> Optional[str]:
+    """``schedule_business_reindex`` for async code."""
+    return await _schedule_async(reindex_businesses, "businesses", business_ids, dedupe)
+
+
+async def schedule_menu_item_reindex_async(menu_item_ids: Iterable, dedupe: bool = False) -> Optional[str]:
+    """``schedule_menu_item_reindex`` for async code."""
+    return await _schedule_async(reindex_menu_items, "menu_items", menu_item_ids, dedupe)
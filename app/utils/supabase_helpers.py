@@ -2,6 +2,8 @@
 from fastapi import HTTPException
 import logging
 
+from app.config.database import execute_async
+
 
 async def safe_supabase_select(supabase, table_name: str, select_fields: str = "*", filter_field: str = None, filter_value=None):
     """Safely select data from Supabase with error handling."""
@@ -11,7 +13,7 @@ async def safe_supabase_select(supabase, table_name: str, select_fields: str = "
         if filter_field and filter_value is not None:
             query = query.eq(filter_field, filter_value)
             
-        response = query.execute()
+        response = await execute_async(query)
         
         if not response.data:
             raise HTTPException(
@@ -34,7 +36,7 @@ async def safe_supabase_select(supabase, table_name: str, select_fields: str = "
 async def safe_supabase_insert(supabase, table_name: str, data: dict):
     """Safely insert data into Supabase."""
     try:
-        response = supabase.table(table_name).insert(data).execute()
+        response = await execute_async(supabase.table(table_name).insert(data))
         
         if not response.data:
             raise HTTPException(
@@ -55,7 +57,7 @@ async def safe_supabase_insert(supabase, table_name: str, data: dict):
 async def safe_supabase_update(supabase, table_name: str, data: dict, filter_field: str, filter_value):
     """Safely update data in Supabase."""
     try:
-        response = supabase.table(table_name).update(data).eq(filter_field, filter_value).execute()
+        response = await execute_async(supabase.table(table_name).update(data).eq(filter_field, filter_value))
         
         if not response.data:
             raise HTTPException(
@@ -76,7 +78,7 @@ async def safe_supabase_update(supabase, table_name: str, data: dict, filter_fie
 async def safe_supabase_delete(supabase, table_name: str, filter_field: str, filter_value):
     """Safely delete data from Supabase."""
     try:
-        response = supabase.table(table_name).delete().eq(filter_field, filter_value).execute()
+        response = await execute_async(supabase.table(table_name).delete().eq(filter_field, filter_value))
         
         if not response.data:
             raise HTTPException(
@@ -0,0 +1,194 @@
+-- Migration: Add dashboard analytics RPC functions
+-- Date: 2026-10-16
+-- Description: Aggregates for the dashboard stats endpoints, computed in Postgres and called
+-- through Supabase RPC (supabase.rpc(...)) so the API only receives the aggregate rows instead
+-- of every order and message in the window (app/services/analytics_service.py).
+-- Requires add_order_rollups.sql: order figures come from order_rollups_hourly for the whole
+-- hours of a window and from orders for the partial hours at its edges, so windows are exact.
+-- Business ids are declared with %TYPE so the functions follow the column types of this database.
+
+-- Index the per-business time windows the functions scan
+CREATE INDEX IF NOT EXISTS ix_orders_business_created ON orders (business_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_messages_business_created ON messages (business_id, created_at);
+
+-- Order counts and revenue per UTC hour x status for [p_start, p_end)
+CREATE OR REPLACE FUNCTION analytics_order_window(
+    p_business_id orders.business_id%TYPE,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (bucket_start TIMESTAMP WITH TIME ZONE, status TEXT, order_count BIGINT, revenue NUMERIC)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH bounds AS (
+        -- Whole hours inside the window; empty when the window lies within one hour
+        SELECT
+            CASE WHEN date_trunc('hour', p_start, 'UTC') < p_start
+                THEN date_trunc('hour', p_start, 'UTC') + INTERVAL '1 hour'
+                ELSE p_start
+            END AS full_start,
+            date_trunc('hour', p_end, 'UTC') AS full_end
+    )
+    SELECT rollup.bucket_start, rollup.status, rollup.order_count::BIGINT, rollup.revenue
+    FROM order_rollups_hourly rollup, bounds
+    WHERE rollup.business_id = p_business_id::TEXT
+      AND rollup.bucket_start >= bounds.full_start
+      AND rollup.bucket_start < bounds.full_end
+    UNION ALL
+    SELECT
+        date_trunc('hour', o.created_at, 'UTC'),
+        COALESCE(o.status::TEXT, 'unknown'),
+        COUNT(*),
+        COALESCE(SUM(o.total_amount), 0)
+    FROM orders o, bounds
+    WHERE o.business_id = p_business_id
+      AND o.created_at >= p_start
+      AND o.created_at < p_end
+      AND (o.created_at < bounds.full_start OR o.created_at >= bounds.full_end)
+    GROUP BY 1, 2
+$$;
+
+-- Orders and revenue per UTC day, optionally for one status
+CREATE OR REPLACE FUNCTION analytics_order_revenue_by_day(
+    p_business_id orders.business_id%TYPE,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE,
+    p_status TEXT DEFAULT NULL
+)
+RETURNS TABLE (day DATE, order_count BIGINT, revenue NUMERIC)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT (w.bucket_start AT TIME ZONE 'UTC')::DATE, SUM(w.order_count)::BIGINT, SUM(w.revenue)
+    FROM analytics_order_window(p_business_id, p_start, p_end) w
+    WHERE p_status IS NULL OR w.status = p_status
+    GROUP BY 1
+    HAVING SUM(w.order_count) <> 0
+    ORDER BY 1
+$$;
+
+-- Orders and revenue per status
+CREATE OR REPLACE FUNCTION analytics_order_status_distribution(
+    p_business_id orders.business_id%TYPE,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE,
+    p_status TEXT DEFAULT NULL
+)
+RETURNS TABLE (status TEXT, order_count BIGINT, revenue NUMERIC)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT w.status, SUM(w.order_count)::BIGINT, SUM(w.revenue)
+    FROM analytics_order_window(p_business_id, p_start, p_end) w
+    WHERE p_status IS NULL OR w.status = p_status
+    GROUP BY 1
+    HAVING SUM(w.order_count) <> 0
+    ORDER BY 2 DESC
+$$;
+
+-- Message totals and messages per UTC day, optionally for one session.
+-- The row with day = NULL carries the totals over the whole window.
+CREATE OR REPLACE FUNCTION analytics_message_stats(
+    p_business_id messages.business_id%TYPE,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE,
+    p_session_id TEXT DEFAULT NULL
+)
+RETURNS TABLE (day DATE, message_count BIGINT, session_count BIGINT, average_duration_minutes DOUBLE PRECISION)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH window_messages AS (
+        SELECT m.session_id::TEXT AS session_id, m.created_at
+        FROM messages m
+        WHERE m.business_id = p_business_id
+          AND m.created_at >= p_start
+          AND m.created_at < p_end
+          AND (p_session_id IS NULL OR m.session_id::TEXT = p_session_id)
+    ),
+    sessions AS (
+        SELECT session_id, EXTRACT(EPOCH FROM MAX(created_at) - MIN(created_at)) / 60 AS duration_minutes
+        FROM window_messages
+        WHERE session_id IS NOT NULL
+        GROUP BY session_id
+    )
+    SELECT
+        NULL::DATE,
+        (SELECT COUNT(*) FROM window_messages),
+        (SELECT COUNT(*) FROM sessions),
+        (SELECT COALESCE(AVG(duration_minutes), 0)::DOUBLE PRECISION FROM sessions)
+    UNION ALL
+    SELECT (created_at AT TIME ZONE 'UTC')::DATE, COUNT(*), COUNT(DISTINCT session_id), NULL
+    FROM window_messages
+    GROUP BY 1
+$$;
+
+-- Per-session statistics, most recently active first (paged with p_limit / p_offset)
+CREATE OR REPLACE FUNCTION analytics_session_stats(
+    p_business_id messages.business_id%TYPE,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE,
+    p_session_id TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    session_id TEXT,
+    message_count BIGINT,
+    first_message TIMESTAMP WITH TIME ZONE,
+    last_message TIMESTAMP WITH TIME ZONE,
+    duration_minutes DOUBLE PRECISION
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        m.session_id::TEXT,
+        COUNT(*),
+        MIN(m.created_at),
+        MAX(m.created_at),
+        (EXTRACT(EPOCH FROM MAX(m.created_at) - MIN(m.created_at)) / 60)::DOUBLE PRECISION
+    FROM messages m
+    WHERE m.business_id = p_business_id
+      AND m.created_at >= p_start
+      AND m.created_at < p_end
+      AND m.session_id IS NOT NULL
+      AND (p_session_id IS NULL OR m.session_id::TEXT = p_session_id)
+    GROUP BY m.session_id
+    ORDER BY MAX(m.created_at) DESC, m.session_id::TEXT
+    LIMIT p_limit OFFSET p_offset
+$$;
+
+-- Conversations with a message since p_since, most recently active first
+CREATE OR REPLACE FUNCTION analytics_active_conversations(
+    p_business_id messages.business_id%TYPE,
+    p_since TIMESTAMP WITH TIME ZONE,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (session_id TEXT, message_count BIGINT, last_message TIMESTAMP WITH TIME ZONE, last_content TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH recent AS (
+        SELECT m.session_id::TEXT AS session_id, m.created_at, m.content::TEXT AS content
+        FROM messages m
+        WHERE m.business_id = p_business_id
+          AND m.created_at >= p_since
+          AND m.session_id IS NOT NULL
+    ),
+    latest AS (
+        SELECT DISTINCT ON (session_id) session_id, created_at, content
+        FROM recent
+        ORDER BY session_id, created_at DESC
+    )
+    SELECT latest.session_id, counts.message_count, latest.created_at, latest.content
+    FROM latest
+    JOIN (SELECT session_id, COUNT(*) AS message_count FROM recent GROUP BY session_id) counts
+        USING (session_id)
+    ORDER BY latest.created_at DESC, latest.session_id
+    LIMIT p_limit
+$$;
+
+-- Let PostgREST pick up the new functions
+NOTIFY pgrst, 'reload schema';
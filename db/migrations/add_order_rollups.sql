@@ -0,0 +1,131 @@
+-- Migration: Add hourly order rollups
+-- Date: 2026-10-16
+-- Description: Pre-aggregated orders per business x UTC hour x status x payment method,
+-- maintained by a trigger on orders, so analytics read O(buckets) instead of O(orders).
+-- Unique customers are kept as HyperLogLog sketches (1024 one-byte registers); the
+-- application merges sketches across buckets and estimates the count
+-- (app/services/business/order_rollups.py uses the same register layout).
+
+CREATE TABLE IF NOT EXISTS order_rollups_hourly (
+    business_id TEXT NOT NULL,
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    status TEXT NOT NULL,
+    payment_method TEXT NOT NULL DEFAULT '',
+    order_count INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    tax NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    customer_sketch BYTEA NOT NULL DEFAULT decode(repeat('00', 1024), 'hex'),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (business_id, bucket_start, status, payment_method)
+);
+
+-- Window scans per business
+CREATE INDEX IF NOT EXISTS ix_order_rollups_hourly_business_bucket
+    ON order_rollups_hourly (business_id, bucket_start);
+
+-- Add one customer to a sketch: register = low 10 bits of the hash,
+-- value = position of the first set bit in the next 53 bits (max kept per register)
+CREATE OR REPLACE FUNCTION order_rollup_sketch_add(sketch BYTEA, customer TEXT)
+RETURNS BYTEA
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+    hash BIGINT;
+    register INTEGER;
+    remaining BIGINT;
+    bit_length INTEGER := 0;
+    rank INTEGER;
+BEGIN
+    IF customer IS NULL OR customer = '' THEN
+        RETURN sketch;
+    END IF;
+
+    hash := hashtextextended(customer, 0);
+    register := (hash & 1023)::INTEGER;
+    remaining := (hash >> 10) & ((1::BIGINT << 53) - 1);
+    WHILE remaining > 0 LOOP
+        remaining := remaining >> 1;
+        bit_length := bit_length + 1;
+    END LOOP;
+    rank := 53 - bit_length + 1;
+
+    IF get_byte(sketch, register) < rank THEN
+        sketch := set_byte(sketch, register, rank);
+    END IF;
+    RETURN sketch;
+END;
+$$;
+
+-- Add (direction = 1) or remove (direction = -1) one order from its bucket.
+-- Sketches only grow: removing an order leaves its customer in the sketch.
+CREATE OR REPLACE FUNCTION order_rollup_apply(order_row orders, direction INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    row_json JSONB := to_jsonb(order_row);
+    customer TEXT := COALESCE(row_json ->> 'customer_id', row_json ->> 'customer_session_id');
+    bucket TIMESTAMP WITH TIME ZONE := date_trunc('hour', COALESCE(order_row.created_at, NOW()), 'UTC');
+    order_status TEXT := COALESCE(order_row.status::TEXT, 'unknown');
+    order_payment TEXT := COALESCE(order_row.payment_method::TEXT, '');
+    order_revenue NUMERIC := COALESCE(order_row.total_amount, 0);
+    order_tax NUMERIC := COALESCE(order_row.tax_amount, 0);
+BEGIN
+    INSERT INTO order_rollups_hourly AS rollup (
+        business_id, bucket_start, status, payment_method, order_count, revenue, tax, customer_sketch
+    )
+    VALUES (
+        order_row.business_id::TEXT, bucket, order_status, order_payment,
+        direction, direction * order_revenue, direction * order_tax,
+        CASE WHEN direction > 0
+            THEN order_rollup_sketch_add(decode(repeat('00', 1024), 'hex'), customer)
+            ELSE decode(repeat('00', 1024), 'hex')
+        END
+    )
+    ON CONFLICT (business_id, bucket_start, status, payment_method) DO UPDATE SET
+        order_count = rollup.order_count + EXCLUDED.order_count,
+        revenue = rollup.revenue + EXCLUDED.revenue,
+        tax = rollup.tax + EXCLUDED.tax,
+        customer_sketch = CASE WHEN direction > 0
+            THEN order_rollup_sketch_add(rollup.customer_sketch, customer)
+            ELSE rollup.customer_sketch
+        END,
+        updated_at = NOW();
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION order_rollups_sync()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF TG_OP = 'UPDATE'
+            AND OLD.business_id IS NOT DISTINCT FROM NEW.business_id
+            AND OLD.created_at IS NOT DISTINCT FROM NEW.created_at
+            AND OLD.status IS NOT DISTINCT FROM NEW.status
+            AND OLD.payment_method IS NOT DISTINCT FROM NEW.payment_method
+            AND OLD.total_amount IS NOT DISTINCT FROM NEW.total_amount
+            AND OLD.tax_amount IS NOT DISTINCT FROM NEW.tax_amount
+        THEN
+            -- Nothing the rollups track changed
+            RETURN NULL;
+        END IF;
+        PERFORM order_rollup_apply(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM order_rollup_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_order_rollups_sync ON orders;
+CREATE TRIGGER trg_order_rollups_sync
+    AFTER INSERT OR UPDATE OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION order_rollups_sync();
+
+-- Backfill from existing orders (run once, with the trigger already in place)
+TRUNCATE order_rollups_hourly;
+SELECT order_rollup_apply(o, 1) FROM orders o;
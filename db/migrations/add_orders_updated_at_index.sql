@@ -0,0 +1,7 @@
+-- Migration: Index orders by business and updated_at
+-- Date: 2026-10-16
+-- Description: Live order feed cursors are timestamps shared by every API worker. A worker whose
+-- in-memory view does not reach back to a client's cursor reads the orders changed since then
+-- (app/services/business/live_orders.py), which this index keeps to a range scan.
+
+CREATE INDEX IF NOT EXISTS ix_orders_business_updated ON orders (business_id, updated_at);
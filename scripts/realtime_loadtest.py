@@ -0,0 +1,375 @@
+"""
+Load test for the realtime WebSocket gateway.
+
+Runs the dashboard and kitchen WebSocket routers in a child process with
+in-process stand-ins for Supabase (and for Redis, via fakeredis, when it is
+installed), opens N sockets against
+
+    /api/v1/food/dashboard/ws/{business_id}
+    /api/v1/food/kitchen/ws/kitchen/ws/{business_id}
+
+drives order events through the same socket actions the frontend uses, and
+reports fan-out latency (p50/p99), server memory per connection and dropped
+frames.
+
+Usage (from the repository root):
+
+    python scripts/realtime_loadtest.py --connections 2000 --businesses 20 --rate 100 --duration 20
+
+Requires uvicorn and websockets (both part of uvicorn[standard]); fakeredis is
+optional (``--redis none`` runs without the cross-worker bus).
+"""
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DASHBOARD_PATH = "/api/v1/food/dashboard/ws/{business_id}"
+KITCHEN_PATH = "/api/v1/food/kitchen/ws/kitchen/ws/{business_id}"
+
+# Broadcasts produced by the dashboard and kitchen actions the load test sends
+ORDER_EVENT_TYPES = ("order_update", "order_queue_update")
+
+
+def raise_fd_limit() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is a peak, in KiB on Linux and bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+# ----------------------------------------------------------------------
+# Server side (child process)
+# ----------------------------------------------------------------------
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST query builder."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.filters: Dict[str, Any] = {}
+        self.values: Dict[str, Any] = {}
+        self.is_single = False
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def update(self, values):
+        self.values = dict(values)
+        return self
+
+    def single(self):
+        self.is_single = True
+        return self
+
+    def __getattr__(self, name):
+        # select, order, limit, in_, ... do not change the fake result
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        row = {"id": self.filters.get("id", 1), "business_id": self.filters.get("business_id", self.filters.get("id", 1))}
+        if self.table == "businesses":
+            row["name"] = f"Load test business {row['id']}"
+        elif self.table == "orders":
+            row.update({"status": "pending", "updated_at": time.time()})
+        row.update(self.values)
+        return SimpleNamespace(data=row if self.is_single else [row])
+
+
+class FakeSupabase:
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(name)
+
+
+def serve(port: int, redis_mode: str) -> None:
+    """Run the WebSocket routers on ``port`` with stand-ins for external services."""
+    raise_fd_limit()
+    sys.path.insert(0, ROOT)
+
+    if redis_mode == "fake":
+        import fakeredis
+        import redis.asyncio
+
+        server = fakeredis.FakeServer()
+        redis.asyncio.from_url = lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server)
+        os.environ["REDIS_URL"] = "redis://loadtest"
+    else:
+        os.environ["WEBSOCKET_PUBSUB_ENABLED"] = "false"
+        os.environ["WEBSOCKET_EVENT_LOG_REDIS"] = "false"
+
+    import uvicorn
+    from fastapi import FastAPI
+
+    from app.api.v1.endpoints.food.websocket import dashboard_websocket, kitchen_websocket
+    from app.services.websocket.gateway import gateway
+
+    supabase = FakeSupabase()
+
+    async def verify_token(token: str) -> Dict[str, Any]:
+        # Tokens are the business id in the load test
+        return {"business_id": token}
+
+    dashboard_websocket.get_supabase_client = lambda: supabase
+    dashboard_websocket.verify_supabase_token = verify_token
+    kitchen_websocket.get_supabase_client = lambda: supabase
+
+    app = FastAPI()
+    app.include_router(dashboard_websocket.router, prefix="/api/v1/food")
+    app.include_router(kitchen_websocket.router, prefix="/api/v1/food/kitchen/ws")
+
+    @app.on_event("startup")
+    async def startup():
+        await gateway.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        await gateway.stop()
+
+    @app.get("/loadtest/stats")
+    async def stats():
+        return {"rss": rss_bytes(), "websocket": gateway.stats()}
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", ws="websockets")
+
+
+# ----------------------------------------------------------------------
+# Client side
+# ----------------------------------------------------------------------
+
+class LoadClient:
+    """One WebSocket that records the latency of every order event it receives."""
+
+    def __init__(self, kind: str, business_id: int, url: str, results: "Results"):
+        self.kind = kind
+        self.business_id = business_id
+        self.url = url
+        self.results = results
+        self.websocket = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self, compression: Optional[str]) -> None:
+        import websockets
+
+        self.websocket = await websockets.connect(self.url, compression=compression, max_size=None, open_timeout=30)
+        self._reader = asyncio.get_running_loop().create_task(self._read())
+
+    async def _read(self) -> None:
+        try:
+            async for frame in self.websocket:
+                received_at = time.time()
+                message = json.loads(frame)
+                if message.get("type") == "ping":
+                    await self.websocket.send('{"type": "pong"}')
+                    continue
+                self.results.frames += 1
+                messages = message["messages"] if message.get("type") == "batch" else [message]
+                for item in messages:
+                    if item.get("type") in ORDER_EVENT_TYPES and isinstance(item.get("timestamp"), float):
+                        self.results.latencies.append(received_at - item["timestamp"])
+        except Exception:
+            self.results.disconnects += 1
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        await self.websocket.send(json.dumps(message))
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self.websocket is not None:
+            await self.websocket.close()
+
+
+class Results:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.frames = 0
+        self.disconnects = 0
+        self.expected = 0
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def fetch_stats(port: int) -> Dict[str, Any]:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/loadtest/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+async def wait_for_server(port: int, process: subprocess.Popen, timeout: float = 30.0) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError("load test server exited during startup")
+        try:
+            return await asyncio.to_thread(fetch_stats, port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    raise_fd_limit()
+    command = [sys.executable, os.path.abspath(__file__), "--serve", str(args.port), "--redis", args.redis]
+    python_path = os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))
+    server = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, PYTHONPATH=python_path))
+    clients: List[LoadClient] = []
+    try:
+        baseline = await wait_for_server(args.port, server)
+        results = Results()
+        compression = "deflate" if args.deflate else None
+
+        # Spread sockets over businesses; kitchen_share of them are kitchen displays
+        kitchen_every = max(1, round(1 / args.kitchen_share)) if args.kitchen_share > 0 else 0
+        for index in range(args.connections):
+            business_id = index % args.businesses + 1
+            if kitchen_every and index // args.businesses % kitchen_every == 0:
+                url = f"ws://127.0.0.1:{args.port}" + KITCHEN_PATH.format(business_id=business_id)
+                clients.append(LoadClient("kitchen", business_id, url, results))
+            else:
+                url = f"ws://127.0.0.1:{args.port}" + DASHBOARD_PATH.format(business_id=business_id) + f"?token={business_id}"
+                clients.append(LoadClient("dashboard", business_id, url, results))
+
+        started = time.monotonic()
+        limit = asyncio.Semaphore(args.connect_concurrency)
+
+        async def connect(client: LoadClient) -> bool:
+            async with limit:
+                try:
+                    await client.connect(compression)
+                    return True
+                except Exception:
+                    return False
+
+        connected = await asyncio.gather(*(connect(client) for client in clients))
+        clients_ok = [client for client, ok in zip(clients, connected) if ok]
+        connect_seconds = time.monotonic() - started
+        await asyncio.sleep(1.0)
+        loaded = await asyncio.to_thread(fetch_stats, args.port)
+
+        # One driver of each kind per business sends the actions
+        drivers: Dict[tuple, LoadClient] = {}
+        audience: Dict[tuple, int] = {}
+        for client in clients_ok:
+            key = (client.kind, client.business_id)
+            drivers.setdefault(key, client)
+            audience[key] = audience.get(key, 0) + 1
+        keys = sorted(drivers)
+
+        order_ids = itertools.count(1)
+        interval = 1.0 / args.rate
+        deadline = time.monotonic() + args.duration
+        sent = 0
+        for key in itertools.cycle(keys):
+            if time.monotonic() >= deadline or not keys:
+                break
+            kind, business_id = key
+            order_id = next(order_ids)
+            if kind == "dashboard":
+                message = {"type": "dashboard_action", "action": "order_status_update", "order_id": order_id, "status": "preparing"}
+            else:
+                message = {"type": "kitchen_action", "action": "order_queue_update", "order_id": order_id, "status": "ready"}
+            # The server echoes "timestamp" into the broadcast: it carries the send time
+            message["timestamp"] = time.time()
+            try:
+                await drivers[key].send(message)
+            except Exception:
+                continue
+            results.expected += audience[key]
+            sent += 1
+            await asyncio.sleep(interval)
+
+        await asyncio.sleep(args.settle)
+        final = await asyncio.to_thread(fetch_stats, args.port)
+    finally:
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+        server.terminate()
+        server.wait(timeout=10)
+
+    received = len(results.latencies)
+    return {
+        "connections": {
+            "requested": args.connections,
+            "connected": len(clients_ok),
+            "failed": args.connections - len(clients_ok),
+            "connect_seconds": round(connect_seconds, 2),
+            "disconnected_during_run": results.disconnects,
+        },
+        "memory": {
+            "server_rss_baseline_mb": round(baseline["rss"] / 2**20, 1),
+            "server_rss_loaded_mb": round(loaded["rss"] / 2**20, 1),
+            "bytes_per_connection": round((loaded["rss"] - baseline["rss"]) / max(1, len(clients_ok))),
+        },
+        "events": {
+            "sent": sent,
+            "deliveries_expected": results.expected,
+            "deliveries_received": received,
+            "deliveries_missing": results.expected - received,
+            "frames_received": results.frames,
+        },
+        "latency_ms": {
+            "p50": round(percentile(results.latencies, 0.50) * 1000, 2),
+            "p99": round(percentile(results.latencies, 0.99) * 1000, 2),
+            "max": round(max(results.latencies, default=float("nan")) * 1000, 2),
+        },
+        "server": final["websocket"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=1000, help="sockets to open")
+    parser.add_argument("--businesses", type=int, default=10, help="businesses the sockets are spread over")
+    parser.add_argument("--kitchen-share", type=float, default=0.25, help="fraction of sockets that are kitchen displays")
+    parser.add_argument("--rate", type=float, default=50.0, help="order events per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to drive events")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait for in-flight frames")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight while connecting")
+    parser.add_argument("--deflate", action="store_true", help="offer permessage-deflate from the clients")
+    parser.add_argument("--redis", choices=["fake", "none"], default="fake", help="fakeredis stand-in or no bus")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.redis)
+        return
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for section, values in report.items():
+        print(f"{section}:")
+        for name, value in values.items():
+            print(f"  {name:<28} {value}")
+
+
+if __name__ == "__main__":
+    main()
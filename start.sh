@@ -9,10 +9,17 @@ cd /opt/render/project/src
 # Run database migrations (if needed)
 # alembic upgrade head
 
+# The RAG vector index lives on this host's disk (VECTOR_INDEX_DIR), so the
+# worker that keeps it current runs here too, consuming only the embeddings queue
+celery -A app.tasks.app:celery_app worker \
+    --queues embeddings \
+    --concurrency 1 \
+    --loglevel info &
+
 # Start the FastAPI application with Gunicorn
 exec gunicorn app.main:app \
     --workers 4 \
-    --worker-class uvicorn.workers.UvicornWorker \
+    --worker-class app.config.uvicorn_worker.RealtimeUvicornWorker \
     --bind 0.0.0.0:$PORT \
     --timeout 120 \
     --keep-alive 10 \